@@ -0,0 +1,33 @@
+""" pytest hook shared by the benchmark suites of the python packages.
+
+Each `benchmarks/pytest.ini` compares a run against the last saved one
+and fails on regressions. With nothing saved yet there is nothing to
+compare with, so the first run is saved as the baseline instead of
+failing. A relative storage path is read from the rootdir, the
+directory of that `pytest.ini`, so the baselines stay in one place
+whichever directory pytest is run from. A suite's conftest imports
+`pytest_configure` from here; the `pythonpath` of its `pytest.ini` puts
+this directory on the path.
+"""
+import pathlib
+
+import pytest
+
+__all__ = ["pytest_configure"]
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """ Save the first run as the baseline instead of failing to compare."""
+    storage = config.getoption("benchmark_storage", None)
+    if storage is None or "://" in storage.removeprefix("file://"):
+        return
+    path = pathlib.Path(storage.removeprefix("file://"))
+    if not path.is_absolute():
+        path = config.rootpath / path
+        config.option.benchmark_storage = f"file://{path}"
+    if not any(path.glob("*/*.json")):
+        config.option.benchmark_compare = False
+        config.option.benchmark_compare_fail = None
+        config.option.benchmark_save = config.option.benchmark_save or \
+            "baseline"
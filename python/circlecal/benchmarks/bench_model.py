@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import numpy as np
+
+from circle_cal.model import (CalendarElement, CalendarPeriod, Year,
+                              elements_to_datetime64)
+from circle_cal.period import Period
+from circle_cal.yeartable import year_table
+
+
+def test_element_construction(benchmark):
+    benchmark(CalendarElement, year=2024, month=2, day=29, hour=12)
+
+
+def test_element_iteration(benchmark):
+    month = CalendarElement(year=2024, month=1)
+    assert len(benchmark(list, month)) == 31
+
+
+def test_element_duration(benchmark):
+    day = CalendarElement(year=2024, month=2, day=29)
+    benchmark(lambda: day.duration)
+
+
+def test_element_add(benchmark):
+    minute = CalendarElement(year=2024, month=1, day=1, hour=0, minute=0)
+    later = benchmark(lambda: minute + 10_000)
+    assert later.datetime() == datetime(2024, 1, 7, 22, 40)
+
+
+def test_element_shift(benchmark):
+    day = CalendarElement(year=2024, month=1, day=1)
+    offsets = np.arange(100_000)
+    assert len(benchmark(day.shift, offsets)) == 100_000
+
+
+def test_elements_to_datetime64(benchmark):
+    days = list(CalendarElement(year=2024).subunit_generator("day"))
+    assert len(benchmark(elements_to_datetime64, days)) == 366
+
+
+def test_subunit_generator_days(benchmark):
+    year = CalendarElement(year=2024)
+    days = benchmark(lambda: sum(1 for _ in year.subunit_generator("day")))
+    assert days == 366
+
+
+def test_decade_days(benchmark):
+    decade = CalendarPeriod(datetime(2000, 1, 1), datetime(2009, 12, 31))
+    days = benchmark(lambda: sum(1 for _ in decade.as_unit("days")))
+    assert days == 3653
+
+
+def test_year_to_theta(benchmark, dates_2024):
+    year = Year(2024)
+    benchmark(lambda: [year.to_theta(d) for d in dates_2024])
+
+
+def test_year_table_theta(benchmark, dates_2024):
+    table = year_table(2024)
+    theta = benchmark(table.theta, dates_2024)
+    assert len(theta) == 366
+
+
+def test_year_date_to_day(benchmark, dates_2024):
+    year = Year(2024)
+    days = benchmark(lambda: [year.date_to_day(d) for d in dates_2024])
+    assert days[-1] == 365
+
+
+def test_spiral_decade_polar(benchmark):
+    decade = Period.years(2000, 10)
+    values = np.arange(np.datetime64("2000-01-01"),
+                       np.datetime64("2010-01-01"), np.timedelta64(1, "h"))
+    theta, r = benchmark(decade.polar, values)
+    assert len(theta) == len(r) == 87672
+
+
+def test_spiral_decade_days(benchmark):
+    benchmark(lambda: Period.years(2000, 10).days)
@@ -0,0 +1,20 @@
+import plotly.graph_objects as go
+
+from circle_cal.plot import events_to_dataframe, events_to_trace
+from circle_cal.utils import events_to_polar
+
+
+def test_events_to_dataframe(benchmark, events_1k):
+    df = benchmark(events_to_dataframe, events_1k)
+    assert len(df) == len(events_1k)
+
+
+def test_events_to_polar(benchmark, day_pairs):
+    theta, width = benchmark(events_to_polar, day_pairs)
+    assert len(theta) == len(day_pairs)
+
+
+def test_events_to_trace_json(benchmark, events_1k):
+    df = events_to_dataframe(events_1k)
+    fig = benchmark(lambda: go.Figure(events_to_trace(df)).to_json())
+    assert '"type":"scatterpolar"' in fig
@@ -0,0 +1,52 @@
+""" Synthetic calendar data for the benchmarks. Nothing here goes online."""
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from gcsa.event import Event
+
+try:
+    from benchmark_baseline import pytest_configure  # noqa: F401
+except ImportError:
+    # A plain test run collects this conftest too, without the
+    # pythonpath of benchmarks/pytest.ini. It runs no benchmarks.
+    pass
+
+
+def synthetic_events(n, year=2024, seed=0):
+    """ Return `n` gcsa Events in `year`, about a quarter of them all day."""
+    rng = random.Random(seed)
+    start = datetime(year, 1, 1)
+    events = []
+    for i in range(n):
+        offset = timedelta(minutes=rng.randrange(365 * 24 * 60))
+        if rng.random() < .25:
+            day = (start + offset).date()
+            events.append(Event(f"all day {i}", start=day,
+                                end=day + timedelta(days=rng.randint(1, 3))))
+        else:
+            begin = start + offset
+            events.append(Event(f"event {i}", start=begin,
+                                end=begin + timedelta(
+                                    minutes=rng.choice([15, 30, 60, 90])),
+                                timezone="America/New_York"))
+    return events
+
+
+@pytest.fixture(scope="session")
+def events_1k():
+    return synthetic_events(1000)
+
+
+@pytest.fixture(scope="session")
+def day_pairs():
+    """ A (start, stop) array of day numbers, as `events_to_polar` takes."""
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 365, 10_000)
+    return np.column_stack([starts, starts + rng.uniform(0, 5, 10_000)])
+
+
+@pytest.fixture(scope="session")
+def dates_2024():
+    return [date(2024, 1, 1) + timedelta(days=i) for i in range(366)]
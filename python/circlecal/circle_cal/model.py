@@ -1,14 +1,22 @@
 import calendar
+import operator
+import os
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta, date, time
+from functools import wraps
+from time import perf_counter
 from dateutil.parser import parse
-from dateutil.relativedelta import relativedelta
 from calendar import monthrange, month_name, day_name
 from collections import namedtuple
+from collections.abc import Sequence
+import numpy as np
 from workalendar.usa import UnitedStates, Indiana
-from pytz import timezone
+from .tz import get_zone, localize_any, zone_cache_info
+from .yeartable import year_table
 
 
-ETZ = timezone("America/New_York")
+ETZ = get_zone("America/New_York")
 
 try:
     from skyfield.api import load
@@ -17,7 +25,10 @@ try:
 except ImportError:
     skyfield = False
 
-__all__ = ["CalendarPeriod", "TimeDigit"]
+__all__ = ["CalendarPeriod", "PeriodView", "TimeDigit", "classify",
+           "elements_to_datetime64", "instrumented",
+           "instrument_report", "enable_instrumentation",
+           "disable_instrumentation", "reset_instrumentation"]
 
 try:
     import pandas as pd
@@ -507,6 +518,108 @@ def _delunitattr(obj, name):
         object.__delattr__(obj, name)
 
 
+# What `datetime(1, 1, 1) + relativedelta(...)` keeps for unset units.
+_DT_DEFAULTS = (1, 1, 1, 0, 0, 0, 0)
+
+
+def _digit_values(digits):
+    """ Return the value of every unit in `digits`, None where unset."""
+    values = []
+    for u in UNITS:
+        d = digits.get(u)
+        values.append(None if d is None else d.value)
+    return tuple(values)
+
+
+def _values_to_datetime(values):
+    """ Return the datetime for `_digit_values`, unset units at their start.
+
+    Gives what `datetime(1, 1, 1) + relativedelta(**values)` gives,
+    without building the relativedelta.
+    """
+    year, month, day, hour, minute, second, microsecond = (
+        default if v is None else v for v, default in zip(values,
+                                                          _DT_DEFAULTS))
+    if day > 28:
+        # relativedelta clamps a day past the end of the month.
+        day = min(day, monthrange(year, month)[1])
+    return datetime(year, month, day, hour, minute, second, microsecond)
+
+
+def _element_datetime(ce):
+    # The cache is keyed by the digit values, so a changed digit misses
+    # however it was changed, including through a shared TimeDigit.
+    values = _digit_values(ce.digits)
+    cached = ce.__dict__.get("_datetime")
+    if cached is not None and cached[0] == values:
+        return cached[1]
+    dt = _values_to_datetime(values)
+    ce.__dict__["_datetime"] = (values, dt)
+    return dt
+
+
+def elements_to_datetime64(elements):
+    """ Return the `datetime` of each CalendarElement as datetime64[us]."""
+    rows = [[default if v is None else v
+             for v, default in zip(_digit_values(e.digits), _DT_DEFAULTS)]
+            for e in elements]
+    values = np.array(rows, dtype=np.int64).reshape(-1, len(UNITS))
+    month = ((values[:, 0] - 1970) * 12 + values[:, 1] - 1).astype(
+        "datetime64[M]")
+    first = month.astype("datetime64[D]")
+    month_len = ((month + 1).astype("datetime64[D]") - first).astype(np.int64)
+    days = first + (np.minimum(values[:, 2], month_len) - 1)
+    us = ((values[:, 3] * 60 + values[:, 4]) * 60 + values[:, 5]) * \
+        1_000_000 + values[:, 6]
+    return days.astype("datetime64[us]") + us.astype("timedelta64[us]")
+
+
+# numpy datetime64 unit code of each unit.
+_NP_UNITS = {"year": "Y", "month": "M", "day": "D", "hour": "h",
+             "minute": "m", "second": "s", "microsecond": "us"}
+
+
+def _unit_index(dt, unit):
+    """ Return the number of whole `unit`s from 0001-01-01 to `dt`."""
+    if unit == "year":
+        return dt.year
+    if unit == "month":
+        return dt.year * 12 + dt.month - 1
+    i = dt.toordinal()
+    if unit == "day":
+        return i
+    i = i * 24 + dt.hour
+    if unit == "hour":
+        return i
+    i = i * 60 + dt.minute
+    if unit == "minute":
+        return i
+    i = i * 60 + dt.second
+    if unit == "second":
+        return i
+    return i * 1000000 + dt.microsecond
+
+
+def _from_unit_index(i, unit):
+    """ Return the datetime starting unit number `i` of `_unit_index`."""
+    if unit == "year":
+        return datetime(i, 1, 1)
+    if unit == "month":
+        year, month = divmod(i, 12)
+        return datetime(year, month + 1, 1)
+    values = []
+    for u, n in [("microsecond", 1000000), ("second", 60), ("minute", 60),
+                 ("hour", 24)]:
+        if UNITS.index(u) <= UNITS.index(unit):
+            i, v = divmod(i, n)
+            values.append(v)
+        else:
+            values.append(0)
+    microsecond, second, minute, hour = values
+    return datetime.combine(date.fromordinal(i),
+                            time(hour, minute, second, microsecond))
+
+
 class TimeRegister:
     __getattr__ = _getunitattr
     __setattr__ = _setunitattr
@@ -531,9 +644,12 @@ class TimeRegister:
         return self.digits[u]
 
     def datetime(self):
-        rd = relativedelta(**self.as_dict())
-        d = date(1, 1, 1)
-        return d + rd
+        """ Return a date, or a datetime if any time unit is set."""
+        values = _digit_values(self.digits)
+        dt = _values_to_datetime(values)
+        if all(v is None for v in values[3:]):
+            return dt.date()
+        return dt
 
     def __iter__(self):
         return self
@@ -724,13 +840,8 @@ class CalendarElement:
                 continue
 
     def as_dict(self):
-        d = {}
-        for u in UNITS:
-            try:
-                d[u] = getattr(self, u).value
-            except AttributeError:
-                pass
-        return d
+        return {u: v for u, v in zip(UNITS, _digit_values(self.digits))
+                if v is not None}
 
     def gen_sub_digit(self, value=None):
         # Creating on a copy so that we don't assign this digit
@@ -785,9 +896,11 @@ class CalendarElement:
             return result[0]
 
     def datetime(self):
-        rd = relativedelta(**self.as_dict())
-        d = datetime(1, 1, 1)
-        return d + rd
+        """ Return the start of the element, unset units at their start.
+
+        The result is kept on the instance until a digit changes.
+        """
+        return _element_datetime(self)
 
     def __len__(self):
         try:
@@ -829,9 +942,7 @@ class CalendarElement:
 
     @ property
     def stop(self):
-        tr = TimeRegister(**self.as_dict())
-        tr = next(tr)
-        return CalendarElement(**tr.as_dict())
+        return self + 1
 
     def __repr__(self):
         d = self.as_dict()
@@ -876,6 +987,54 @@ class CalendarElement:
         except AttributeError:
             return self.datetime() == other
 
+    def __add__(self, n):
+        """ Return the element `n` units of this element later.
+
+        Computed in closed form, carrying into months and years.
+        """
+        try:
+            n = operator.index(n)
+        except TypeError:
+            return NotImplemented
+        unit = self.unit
+        if unit is None:
+            raise TypeError(f"{self} has no unit to add.")
+        dt = _from_unit_index(_unit_index(self.datetime(), unit) + n, unit)
+        return CalendarElement(**{u: getattr(dt, u)
+                                  for u in UNITS[:UNITS.index(unit) + 1]})
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        """ Subtract a number of units, or count the units of this
+        element's size from the start of `other` to the start of this.
+        """
+        if isinstance(other, CalendarElement):
+            unit = self.unit
+            if unit is None or other.unit is None:
+                raise TypeError(f"{self} and {other} need units to count "
+                                f"between.")
+            return (_unit_index(self.datetime(), unit) -
+                    _unit_index(other.datetime(), unit))
+        try:
+            return self + -operator.index(other)
+        except TypeError:
+            return NotImplemented
+
+    def shift(self, n):
+        """ Return the starts of the elements `n` units later.
+
+        Parameters:
+            n: int or array of ints.
+
+        Returns:
+            datetime64[us] array with the shape of `n`.
+        """
+        code = _NP_UNITS[self.unit]
+        start = np.datetime64(self.datetime(), code)
+        return (start + np.asarray(n, dtype=np.int64)).astype(
+            "datetime64[us]")
+
     def __contains__(self, other):
         # If we have no subunits, then we don't know about smaller units.
         if self.subunit is None:
@@ -1094,7 +1253,13 @@ def test_quacks_like_a_date():
     assert not _quacks_like_a_date("2020-01-01")
 
 
-def _chrono_kind(obj):
+# Chrono kind by exact type. Filled in as new types are seen; None means
+# the type is not a chrono type.
+_KIND_BY_TYPE = {date: "date", datetime: "dt", time: "time"}
+
+
+def _probe_kind(obj):
+    """ Classify `obj` by the attributes it has, or return None."""
     if _quacks_like_a_date(obj):
         return "date"
 
@@ -1104,8 +1269,73 @@ def _chrono_kind(obj):
     if _quacks_like_a_time(obj):
         return "time"
 
-    raise TypeError(
-        f"{obj} is used as a chrono type but does not quack like one.")
+    return None
+
+
+def _kind_of_type(obj):
+    t = type(obj)
+    try:
+        return _KIND_BY_TYPE[t]
+    except KeyError:
+        pass
+    # Subclasses (pandas.Timestamp, ...) go by their base class without
+    # probing. Anything else is probed once for its type.
+    if isinstance(obj, datetime):
+        kind = "dt"
+    elif isinstance(obj, date):
+        kind = "date"
+    elif isinstance(obj, time):
+        kind = "time"
+    else:
+        kind = _probe_kind(obj)
+    _KIND_BY_TYPE[t] = kind
+    return kind
+
+
+def _chrono_kind(obj):
+    kind = _kind_of_type(obj)
+    if kind is None:
+        raise TypeError(
+            f"{obj} is used as a chrono type but does not quack like one.")
+    return kind
+
+
+def classify(values):
+    """ Return the chrono kind of every value as an array of strings.
+
+    Kinds are "date" (all day), "dt" (timed) and "time". Values that are
+    not chrono types, like None, get "". Each distinct type is looked up
+    once, so a column of starts costs one dict lookup per value.
+    datetime64 arrays and Series are labelled from their unit: "date"
+    for day units and coarser, "dt" otherwise.
+
+    Converting dates to times loses their kind: an all day start becomes
+    a timed midnight. Classify the original values, e.g. the starts of
+    the event objects, as `plot.events_to_dataframe` does for its "kind"
+    column; its datetime "start" column is "dt" throughout.
+
+        >>> all_day = classify(starts) == "date"
+    """
+    try:
+        if values.dtype.kind == "M":
+            try:
+                day = np.datetime_data(values.dtype)[0] in ("Y", "M", "W", "D")
+            except TypeError:
+                # Zone-aware pandas dtypes are always timed.
+                day = False
+            return np.full(len(values), "date" if day else "dt", dtype="<U4")
+    except AttributeError:
+        pass
+    kinds = {}
+    out = []
+    for v in values:
+        t = type(v)
+        try:
+            kind = kinds[t]
+        except KeyError:
+            kind = kinds[t] = _kind_of_type(v) or ""
+        out.append(kind)
+    return np.array(out, dtype="<U4")
 
 
 def test_chrono_kind():
@@ -1240,17 +1470,6 @@ def year_to_sunburst(year):
 yd = year_to_sunburst(2024)
 
 
-def localize_any(obj, tz):
-    try:
-        return tz.localize(obj)
-    except ValueError:
-        if obj.tzinfo:
-            return obj
-    except AttributeError:
-        return tz.localize(datetime.combine(obj, time(0, 0)))
-    return obj
-
-
 def weekday(datelike):
     return list(calendar.day_name)[calendar.weekday(datelike.year,
                                                     datelike.month,
@@ -1458,6 +1677,38 @@ def test_datelike_to_end():
     assert datelike_to_end(dt) == datetime(2000, 12, 1, 23, 59, 59, 999999)
 
 
+class PeriodView(Sequence):
+    """ Lazy sequence of the items of a CalendarPeriod.
+
+    Items are built only when they are indexed or reached by iteration.
+    Slices give views over a `range` of item numbers, so `len`, indexing
+    and slicing cost the same at any size.
+    """
+
+    def __init__(self, period, items=None):
+        self.period = period
+        if items is None:
+            items = range(period._layout()[1])
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PeriodView(self.period, self.items[i])
+        return self.period._item(self.items[i])
+
+    def __iter__(self):
+        item = self.period._item
+        for j in self.items:
+            yield item(j)
+
+    def __repr__(self):
+        return (f"PeriodView({self.period}, {self.period.item_unit()} "
+                f"{self.items.start}:{self.items.stop}:{self.items.step})")
+
+
 class CalendarPeriod:
     """ A period of time as a collection of units of time.
 
@@ -1497,17 +1748,43 @@ class CalendarPeriod:
             return self[-1]
 
     whole_unit = whole_unit
-    item_unit = item_unit
+
+    def _layout(self):
+        """ Return `(item unit, number of items)`, cached until the bounds
+        change.
+        """
+        bounds = (self.start, self.last)
+        cached = self.__dict__.get("_layout_cache")
+        if cached is not None and cached[0] == bounds:
+            return cached[1]
+        unit = item_unit(self)
+        start, last = bounds
+        if unit == "years":
+            n = last.year - start.year + 1
+        elif unit == "months":
+            n = (last.year - start.year) * 12 + last.month - start.month + 1
+        else:
+            # A period that does not end on a unit boundary, e.g. one
+            # starting at 06:00 and ending at 06:59 days later, has a
+            # last, partial item.
+            n, rest = divmod(self.duration, timedelta(**{unit: 1}))
+            n += bool(rest)
+        self._layout_cache = (bounds, (unit, n))
+        return unit, n
+
+    def item_unit(self):
+        return self._layout()[0]
 
     def __len__(self):
-        result = _n_u(self, u=self.item_unit())
-        # len() refuses to round a float to an integer.
-        # If there is a remainder let that error happen. If not
-        # convert to int to avoid it.
-        if isinstance(result, float):
-            if result % 1 == 0:
-                result = int(result)
-        return result
+        return self._layout()[1]
+
+    @property
+    def items(self):
+        """ A lazy `PeriodView` of the periods this one divides into."""
+        return PeriodView(self)
+
+    def __iter__(self):
+        return iter(self.items)
 
     def __init__(self, start, last=None, end=None, duration=None, name=None):
         """
@@ -1549,62 +1826,29 @@ class CalendarPeriod:
             self.name = name
 
     def __getitem__(self, i):
-        try:
-            start = i.start
-        except AttributeError:
-            start = i
-
-        try:
-            if i.stop is None:
-                stop = start
-            else:
-                stop = i.stop
-        except AttributeError:
-            stop = start + 1
-
-        try:
-            if i.step is None:
-                step = 1
-            else:
-                step = i.step
-        except AttributeError:
-            step = 1
+        """ Return item `i`, or a `PeriodView` for a slice."""
+        return self.items[i]
 
+    def _item(self, j):
+        """ Build item number `j`, counted from the first."""
         iu = self.item_unit()
-
-        items = []
-        for j in range(start, stop, step):
-            if iu == "years":
-                year = self.start.year + j
-                start_date = datetime(year, 1, 1)
-                last_date = datetime(year, 12, 31)
-                name = str(year)
-
-            elif iu == "months":
-                start_date = _inc_months(self.start, j)
-                d = datelike_to_dict(self.last)
-                d.update({"year": start_date.year,
-                          "month": start_date.month,
-                          "day": monthrange(start_date.year,
-                                            start_date.month)[1]})
-                last_date = self.last.__class__(**d)
-                name = month_name[start_date.month]
-            else:
-                start_date = self.start + timedelta(**{iu: j})
-                last_date = self.start + timedelta(**{iu: j + 1})
-                name = None
-
-            if start_date > self.last:
-                raise IndexError
-
-            items.append(CalendarPeriod(start_date, last_date, name=name))
-
-        # If we ask for items that are beyond 'last' that is an IndexError.
-
-        # Iteration asking for a single item should not get a list.
-        if stop == start + step:
-            return items[0]
-        return items
+        if iu == "years":
+            year = self.start.year + j
+            return CalendarPeriod(datetime(year, 1, 1), datetime(year, 12, 31),
+                                  name=str(year))
+        if iu == "months":
+            start_date = _inc_months(self.start, j)
+            d = datelike_to_dict(self.last)
+            d.update({"year": start_date.year,
+                      "month": start_date.month,
+                      "day": monthrange(start_date.year,
+                                        start_date.month)[1]})
+            return CalendarPeriod(start_date, self.last.__class__(**d),
+                                  name=month_name[start_date.month])
+        start_date = self.start + timedelta(**{iu: j})
+        # `last` is the start of the last unit, so a one unit item
+        # ends where it starts.
+        return CalendarPeriod(start_date, start_date)
 
     def len_by_days(self):
         return self.duration / timedelta(days=1)
@@ -1627,7 +1871,7 @@ class CalendarPeriod:
                     if sub.whole_unit() == units:
                         yield sub
                     else:
-                        yield from sub
+                        yield from sub.subunit_generator(unit)
 
     def __repr__(self):
         uts = self.whole_unit()
@@ -1641,17 +1885,15 @@ def test_unit_pl(unit):
     assert _unit_pl("months") == ("month", "months")
 
 
-def _inc_months(dt, i):
-    month = dt.month + i % 12
-    year = dt.year + i // 12
-    if month > 12:
-        month += month % 12
-        year += month // 12
+def _inc_months(dt, i=1):
+    year, month = divmod(dt.year * 12 + dt.month - 1 + i, 12)
+    month += 1
 
+    last = monthrange(year, month)[1]
     if dt.day == monthrange(dt.year, dt.month)[1]:
-        day = monthrange(year, month)[1]
+        day = last
     else:
-        day = dt.day
+        day = min(dt.day, last)
 
     d = datelike_to_dict(dt)
     d.update(dict(day=day, month=month, year=year))
@@ -1664,6 +1906,9 @@ def test_inc_months():
     assert _inc_months(datetime(2000, 12, 1)) == datetime(2001, 1, 1)
     assert _inc_months(datetime(2000, 2, 28)) == datetime(2000, 3, 28)
     assert _inc_months(datetime(2000, 2, 29)) == datetime(2000, 3, 31)
+    assert _inc_months(datetime(2000, 11, 15), 14) == datetime(2002, 1, 15)
+    assert _inc_months(datetime(2000, 1, 30), 1) == datetime(2000, 2, 29)
+    assert _inc_months(datetime(2000, 3, 31), -13) == datetime(1999, 2, 28)
 
 
 class Year(CalendarPeriod):
@@ -1676,9 +1921,20 @@ class Year(CalendarPeriod):
         self.cal = NotreDame()
         self.THETA_PER_DAY = 360 / self.len_by_days()
 
+    @property
+    def table(self):
+        """ The shared `yeartable.YearTable` of this year."""
+        return year_table(self.year)
+
     def date_to_day(self, obj):
-        return list(self.as_unit("days")).index(
-            CalendarPeriod(start=obj, last=timedelta(days=1)))
+        """ Return the 0-based day of the year of a date or datetime."""
+        try:
+            day = (obj.date() - self.start.date()).days
+        except AttributeError:
+            day = (obj - self.start.date()).days
+        if not 0 <= day < self.len_by_days():
+            raise ValueError(f"{obj} is not in {self.year}.")
+        return day
 
     def day_to_date(self, i):
         ce = self[i]
@@ -1728,3 +1984,190 @@ def test_td_is_zero():
     assert not td_is_zero(td)
     td = timedelta(microseconds=0)
     assert not td_is_zero(td)
+
+
+# Instrumentation.
+#
+# Counting is switched on by patching counting and timing wrappers over
+# the model's classes and helpers, and switched off by putting the
+# originals back. Nothing is checked or counted while it is off.
+
+INSTRUMENT_ENV = "CIRCLECAL_INSTRUMENT"
+# Classes whose constructions are counted, subclasses included.
+_COUNTED = [TimeDigit, TimeRegister, CalendarElement, CalendarPeriod]
+# (owner, attribute) pairs whose calls are counted and timed.
+_TIMED = [(TimeRegister, "datetime"),
+          (CalendarElement, "datetime"),
+          (CalendarElement, "start"),
+          (CalendarElement, "stop")]
+# Cache name to a function returning (hits, misses) so far.
+_CACHES = {"tz.get_zone": lambda: zone_cache_info()[:2],
+           "yeartable": lambda: year_table.cache_info()[:2],
+           "chrono_kind": lambda: (_counts["chrono_kind.hit"],
+                                   _counts["chrono_kind.miss"]),
+           "CalendarElement.datetime": lambda: (_counts["datetime.hit"],
+                                                _counts["datetime.miss"])}
+
+_counts = Counter()
+_seconds = Counter()
+_instrument = {"depth": 0, "saved": [], "base": {}}
+
+
+def _counting_init(owner, init):
+    @wraps(init)
+    def wrapper(self, *args, **kwargs):
+        cls = type(self)
+        # Count once per instance, in the nearest counted class's
+        # __init__, under the instance's own class name.
+        if owner is next(c for c in cls.__mro__ if c in _COUNTED):
+            _counts["new." + cls.__name__] += 1
+        init(self, *args, **kwargs)
+    return wrapper
+
+
+def _timed(name, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _seconds[name] += perf_counter() - t0
+            _counts["call." + name] += 1
+    return wrapper
+
+
+def _counted_kind_of_type(obj):
+    hit = type(obj) in _KIND_BY_TYPE
+    _counts["chrono_kind.hit" if hit else "chrono_kind.miss"] += 1
+    return _plain_kind_of_type(obj)
+
+
+_plain_kind_of_type = _kind_of_type
+
+
+def _counted_element_datetime(ce):
+    cached = ce.__dict__.get("_datetime")
+    hit = cached is not None and cached[0] == _digit_values(ce.digits)
+    _counts["datetime.hit" if hit else "datetime.miss"] += 1
+    return _plain_element_datetime(ce)
+
+
+_plain_element_datetime = _element_datetime
+
+
+def _patch(owner, name, value):
+    _instrument["saved"].append((owner, name, owner.__dict__.get(name)))
+    setattr(owner, name, value)
+
+
+def _patch_global(name, value):
+    _instrument["saved"].append((None, name, globals()[name]))
+    globals()[name] = value
+
+
+def enable_instrumentation():
+    """ Start counting. Calls nest; each needs a `disable_instrumentation`."""
+    _instrument["depth"] += 1
+    if _instrument["depth"] > 1:
+        return
+    for cls in _COUNTED:
+        _patch(cls, "__init__", _counting_init(cls, cls.__init__))
+    for owner, name in _TIMED:
+        label = f"{owner.__name__}.{name}"
+        attr = owner.__dict__[name]
+        if isinstance(attr, property):
+            _patch(owner, name, property(_timed(label, attr.fget)))
+        else:
+            _patch(owner, name, _timed(label, attr))
+    _patch_global("_kind_of_type", _counted_kind_of_type)
+    _patch_global("_element_datetime", _counted_element_datetime)
+    _instrument["base"] = {k: f() for k, f in _CACHES.items()}
+
+
+def disable_instrumentation():
+    """ Stop counting and restore the plain classes and functions."""
+    if _instrument["depth"] == 0:
+        return
+    _instrument["depth"] -= 1
+    if _instrument["depth"] > 0:
+        return
+    saved = _instrument["saved"]
+    while saved:
+        owner, name, value = saved.pop()
+        if owner is None:
+            globals()[name] = value
+        elif value is None:
+            delattr(owner, name)
+        else:
+            setattr(owner, name, value)
+
+
+def instrumentation_enabled():
+    return _instrument["depth"] > 0
+
+
+def instrument_report(reset=False):
+    """ Return the counts since instrumentation was enabled or reset.
+
+    Returns:
+        dict with
+        "constructions": instances made, by class name;
+        "calls": calls, by function or "Class.method" name;
+        "seconds": time spent in the timed calls, by the same names;
+        "caches": {"hits", "misses", "hit_rate"} by cache name.
+    """
+    report = {"constructions": {}, "calls": {}, "seconds": dict(_seconds),
+              "caches": {}}
+    for key, n in _counts.items():
+        kind, _, name = key.partition(".")
+        if kind == "new":
+            report["constructions"][name] = n
+        elif kind == "call":
+            report["calls"][name] = n
+    for name, info in _CACHES.items():
+        hits, misses = info()
+        base_hits, base_misses = _instrument["base"].get(name, (0, 0))
+        hits, misses = hits - base_hits, misses - base_misses
+        report["caches"][name] = {
+            "hits": hits, "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None}
+    if reset:
+        reset_instrumentation()
+    return report
+
+
+def reset_instrumentation():
+    _counts.clear()
+    _seconds.clear()
+    _instrument["base"] = {k: f() for k, f in _CACHES.items()}
+
+
+@contextmanager
+def instrumented():
+    """ Count what the model does inside a `with` block.
+
+    Yields a dict that is filled with `instrument_report` of the block
+    when it exits.
+
+        >>> with instrumented() as report:
+        ...     list(Year(2024).as_unit("days"))
+        >>> report["constructions"]["CalendarElement"]
+    """
+    outer = (Counter(_counts), Counter(_seconds), _instrument["base"])
+    enable_instrumentation()
+    reset_instrumentation()
+    report = {}
+    try:
+        yield report
+    finally:
+        report.update(instrument_report())
+        disable_instrumentation()
+        # Counts from the block also belong to an enclosing run.
+        _counts.update(outer[0])
+        _seconds.update(outer[1])
+        _instrument["base"] = outer[2]
+
+
+if os.environ.get(INSTRUMENT_ENV):
+    enable_instrumentation()
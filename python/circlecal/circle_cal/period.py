@@ -0,0 +1,186 @@
+""" Circle and spiral geometry for any window of days.
+
+`Year.to_theta` puts Jan 1 at 0 degrees and Dec 31 at the end of the
+circle. A `Period` does the same for any window from `start` up to
+`stop`:
+
+- "circle": the whole window is one turn, starting at 0 degrees.
+- "spiral": one turn per calendar year, so a date has the same angle
+  in every year. The radius grows from 0 at the start of the window to
+  1 at its end.
+
+Conversions take dates, datetimes or datetime64 arrays and return
+arrays. Boundaries and the per-day table are worked out once per
+window and kept on it.
+
+    >>> window = Period.rolling(months=12)
+    >>> theta, r = window.polar(df["start"].dt.tz_localize(None))
+    >>> five = Period.years(2020, 5)
+    >>> five.bounds("months")
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from .model import CalendarPeriod, _inc_months
+from .yeartable import DAY_DTYPE, calendar_fields, _naive
+
+__all__ = ["Period", "SHAPES", "WINDOW_DTYPE"]
+
+
+SHAPES = ("circle", "spiral")
+# DAY_DTYPE with the date and the radius of each day.
+WINDOW_DTYPE = np.dtype([("date", "datetime64[D]")] + DAY_DTYPE.descr +
+                        [("r_start", "f8"), ("r_mid", "f8"),
+                         ("r_end", "f8")])
+# numpy datetime64 unit of each boundary.
+_BOUND_UNITS = {"years": "Y", "months": "M", "weeks": "W", "days": "D"}
+
+
+def _as_day(value):
+    if isinstance(value, datetime):
+        value = value.date()
+    return datetime.combine(value, time())
+
+
+class Period(CalendarPeriod):
+    """ A window of whole days and where its moments fall on the plot.
+
+    Parameters:
+        start: first day of the window.
+        stop: day after the last day of the window.
+        shape: "circle" or "spiral".
+        name: optional name.
+    """
+
+    def __init__(self, start, stop, shape="circle", name=None):
+        if shape not in SHAPES:
+            raise ValueError(f"shape must be one of {SHAPES}, not {shape}.")
+        start, stop = _as_day(start), _as_day(stop)
+        if stop <= start:
+            raise ValueError(f"{stop} is not after {start}.")
+        super().__init__(start, last=stop - timedelta(days=1), name=name)
+        self.shape = shape
+        self._start64 = np.datetime64(start, "us")
+        self._stop64 = np.datetime64(stop, "us")
+        self._tables = {}
+
+    @classmethod
+    def rolling(cls, months=12, end=None, shape="circle"):
+        """ The `months` up to and including the day `end`, default today."""
+        if end is None:
+            end = date.today()
+        stop = _as_day(end) + timedelta(days=1)
+        return cls(_inc_months(stop, -months), stop, shape=shape,
+                   name=f"{months} months to {end:%Y-%m-%d}")
+
+    @classmethod
+    def years(cls, first, n=1, shape=None):
+        """ `n` calendar years from `first`, a spiral if more than one."""
+        if shape is None:
+            shape = "spiral" if n > 1 else "circle"
+        name = str(first) if n == 1 else f"{first}-{first + n - 1}"
+        return cls(datetime(first, 1, 1), datetime(first + n, 1, 1),
+                   shape=shape, name=name)
+
+    def turns(self, values):
+        """ Return the position of moments in turns of the plot.
+
+        On a circle the window is one turn from 0. On a spiral the whole
+        part counts calendar years from the start year and the fraction
+        is the part of the year gone.
+        """
+        v = _naive(values)
+        if self.shape == "circle":
+            return (v - self._start64) / (self._stop64 - self._start64)
+        years = v.astype("datetime64[Y]")
+        first = years.astype("datetime64[us]")
+        length = (years + 1).astype("datetime64[us]") - first
+        return (years.astype(np.int64) + 1970 - self.start.year +
+                (v - first) / length)
+
+    def _turn_span(self):
+        try:
+            return self._tables["span"]
+        except KeyError:
+            span = self._tables["span"] = tuple(self.turns(
+                [self._start64, self._stop64]))
+            return span
+
+    def _unscalar(self, values, result):
+        return result if np.ndim(values) else float(result)
+
+    def theta(self, values):
+        """ Return the angle of moments in degrees.
+
+        Moments must fall in the window, or on the midnight that closes
+        it.
+        """
+        v = _naive(values)
+        if np.any((v < self._start64) | (v > self._stop64)):
+            raise ValueError(f"{values} is not in {self}.")
+        turns = self.turns(v)
+        if self.shape == "circle":
+            return self._unscalar(values, turns * 360)
+        return self._unscalar(values, turns % 1 * 360)
+
+    def radius(self, values):
+        """ Return the radius of moments, 0 at the start and 1 at the end
+        of a spiral, and 1 everywhere on a circle.
+        """
+        if self.shape == "circle":
+            return self._unscalar(values, np.ones(np.shape(values)))
+        low, high = self._turn_span()
+        return self._unscalar(values, (self.turns(values) - low) /
+                              (high - low))
+
+    def polar(self, values):
+        """ Return `(theta, r)` of moments."""
+        return self.theta(values), self.radius(values)
+
+    def bounds(self, unit):
+        """ Return the starts of the years, months, ISO weeks or days in
+        the window as datetime64[D], the window start first.
+        """
+        try:
+            return self._tables[unit]
+        except KeyError:
+            pass
+        code = _BOUND_UNITS[unit]
+        start = self._start64.astype("datetime64[D]")
+        stop = self._stop64.astype("datetime64[D]")
+        if code == "W":
+            # numpy weeks start on Thursdays, the epoch's weekday.
+            monday = start - (start.astype(np.int64) + 3) % 7
+            starts = np.arange(monday, stop, 7)
+        else:
+            starts = np.arange(start.astype(f"datetime64[{code}]"),
+                               stop.astype(f"datetime64[{code}]") + 1).astype(
+                                   "datetime64[D]")
+        starts = starts[(starts > start) & (starts < stop)]
+        starts = np.append(start, starts)
+        starts.flags.writeable = False
+        self._tables[unit] = starts
+        return starts
+
+    @property
+    def days(self):
+        """ The `WINDOW_DTYPE` row of every day in the window."""
+        try:
+            return self._tables["days"]
+        except KeyError:
+            pass
+        dates = self.bounds("days")
+        days = calendar_fields(np.empty(len(dates), dtype=WINDOW_DTYPE),
+                               dates)
+        days["date"] = dates
+        for edge, offset in [("start", 0), ("mid", 12), ("end", 24)]:
+            moments = dates + np.timedelta64(offset, "h")
+            days[f"theta_{edge}"] = self.theta(moments)
+            days[f"r_{edge}"] = self.radius(moments)
+        # A spiral day ending at a new year ends at 360, not 0.
+        end = days["theta_end"]
+        end[end <= days["theta_start"]] += 360
+        days.flags.writeable = False
+        self._tables["days"] = days
+        return days
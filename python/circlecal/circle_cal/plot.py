@@ -1,5 +1,10 @@
 from datetime import datetime, time, date, timedelta
-from .model import CalendarElement, TimeDigit, TimeRegister, Year, EventWrap, ETZ as TZ
+from .model import (CalendarElement, TimeDigit, TimeRegister, Year, EventWrap,
+                    classify)
+from .tz import get_zone, to_utc_ns, from_utc_ns
+from .recurrence import expand_events, occurrences_to_dataframe
+from .yeartable import year_table
+from .period import Period
 import plotly.graph_objects as go
 import calendar
 import numpy as np
@@ -20,28 +25,24 @@ RSPACING = 0
 DR = (1 - POLAR_CORE - RSPACING * (NGROUPS - 1)) / NGROUPS
 
 
-def localize_any(obj, tz):
-    try:
-        return tz.localize(obj)
-    except ValueError:
-        if obj.tzinfo:
-            return obj
-    except AttributeError:
-        return tz.localize(datetime.combine(obj, time(0, 0)))
-    return obj
-
-
 def to_theta(datevalue, year=None):
-    try:
-        year = Year(year)
-    except TypeError:
-        pass
-
-    return year.to_theta(datevalue)
-
-
-def events_to_dataframe(events):
-    """ Extract calendar specific details from events into a dataframe."""
+    if isinstance(year, Period):
+        return year.theta(datevalue)
+    if isinstance(year, Year):
+        return year.to_theta(datevalue)
+    if year is None:
+        year = datevalue.year
+    return year_table(year).theta(datevalue)
+
+
+def events_to_dataframe(events, tz=None):
+    """ Extract calendar specific details from events into a dataframe.
+
+    Dates and naive times are read in `tz` and every time is shown in
+    it. Default is the display zone of `circle_cal.tz`. The "kind" column
+    is `classify` of the original starts, "date" for all day events,
+    which the converted "start" column can no longer tell apart.
+    """
     df = pd.DataFrame(data=events, columns=["Event_obj"])
 
     try:
@@ -50,19 +51,24 @@ def events_to_dataframe(events):
         df["Event_obj"] = df["Event_obj"].apply(lambda eve: EventWrap(eve))
         df["duration"] = df["Event_obj"].apply(lambda ev: ev.duration)
 
-    df["mid"] = pd.to_datetime(df["Event_obj"].apply(
-        lambda ev: localize_any(ev.mid, TZ)), utc=True).dt.tz_convert(TZ)
-    df["start"] = pd.to_datetime(df["Event_obj"].apply(
-        lambda ev: localize_any(ev.start, TZ)), utc=True).dt.tz_convert(TZ)
-    df["end"] = pd.to_datetime(df["Event_obj"].apply(
-        lambda ev: localize_any(ev.end, TZ)), utc=True).dt.tz_convert(TZ)
+    df["kind"] = classify([ev.start for ev in df["Event_obj"]])
+    zone = get_zone(tz)
+    for col in ["mid", "start", "end"]:
+        ns = to_utc_ns([getattr(ev, col) for ev in df["Event_obj"]], zone)
+        df[col] = from_utc_ns(ns, zone)
 
     df["summary"] = df["Event_obj"].apply(lambda ev: ev.summary)
     return df
 
 
-def selected_cals_to_dataframe(gcal, selcal, year):
-    """Return a dataframe for plotly from a collection of calendars."""
+def selected_cals_to_dataframe(gcal, selcal, year, tz=None,
+                               expand_locally=False):
+    """Return a dataframe for plotly from a collection of calendars.
+
+    With `expand_locally` recurring events are fetched once per series
+    and expanded here by `recurrence.expand_events`, instead of the
+    server sending every occurrence.
+    """
     try:
         year = Year(year.year)
     except AttributeError:
@@ -72,10 +78,14 @@ def selected_cals_to_dataframe(gcal, selcal, year):
     for cal in selcal:
         events = gcal.get_events(year.start,
                                  year.end,
-                                 single_events=True,
+                                 single_events=not expand_locally,
                                  calendar_id=cal.calendar_id,
                                  )
-        df = events_to_dataframe(events)
+        if expand_locally:
+            df = occurrences_to_dataframe(
+                *expand_events(events, year.start, year.end, tz=tz), tz=tz)
+        else:
+            df = events_to_dataframe(events, tz=tz)
         dfs.append(df)
         df["color"] = cal.background_color
         df["calendar_id"] = cal.calendar_id
@@ -90,3 +100,77 @@ def polar_to_cart(r, theta):
     x = r * np.sin(theta)
     y = r * np.cos(theta)
     return (x, y)
+
+
+# Point traces with more marks than this render with WebGL. None keeps
+# them SVG.
+_render = {"webgl_threshold": 1000}
+
+
+def set_webgl_threshold(n):
+    """ Set the number of marks above which point traces use WebGL."""
+    _render["webgl_threshold"] = n
+
+
+def use_webgl(n, webgl=None):
+    """ Return whether a trace of `n` marks renders with WebGL.
+
+    `webgl` True or False forces the choice, None leaves it to the
+    threshold.
+    """
+    if webgl is not None:
+        return webgl
+    threshold = _render["webgl_threshold"]
+    return threshold is not None and n > threshold
+
+
+def scatterpolar(theta, r, webgl=None, **kwargs):
+    """ Return a `Scatterpolar`, or `Scatterpolargl` for many marks.
+
+    `theta` and `r` are passed as float64 arrays, which plotly sends
+    binary encoded instead of as JSON lists. Other keywords go to the
+    trace.
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    r = np.broadcast_to(np.asarray(r, dtype=np.float64), theta.shape)
+    trace = go.Scatterpolargl if use_webgl(len(theta), webgl) else \
+        go.Scatterpolar
+    return trace(theta=theta, r=np.ascontiguousarray(r), **kwargs)
+
+
+def _wall_times(col):
+    if getattr(col.dt, "tz", None) is not None:
+        col = col.dt.tz_localize(None)
+    return col.to_numpy(dtype="datetime64[us]")
+
+
+def _thetas(values, year=None):
+    if isinstance(year, Period):
+        return year.theta(values)
+    if year is None:
+        # Each moment on the circle of its own year.
+        years = values.astype("datetime64[Y]").astype(np.int64) + 1970
+        first = int(years.min())
+        return Period.years(first, int(years.max()) - first + 1,
+                            shape="spiral").theta(values)
+    return year_table(getattr(year, "year", year)).theta(values)
+
+
+def events_to_trace(df, year=None, r=.5, webgl=None, **kwargs):
+    """ Return a point trace of the events in a frame at their middles.
+
+    Parameters:
+        df: frame from `events_to_dataframe` or `selected_cals_to_dataframe`.
+        year: int, `Year` or `Period` to place the events by; their
+            middles must fall in it. Default puts each event on the
+            circle of its own year.
+        r: radius of the points, one for all or one per event.
+        webgl: force WebGL on or off, default by `use_webgl`.
+        kwargs: passed to the trace.
+    """
+    mid = _wall_times(df["mid"])
+    theta = _thetas(mid, year) if len(mid) else np.array([])
+    kwargs.setdefault("mode", "markers")
+    kwargs.setdefault("hovertext", (df["mid"].astype(str) + " " +
+                                    df["summary"].astype(str)).to_numpy())
+    return scatterpolar(theta, r, webgl=webgl, **kwargs)
@@ -0,0 +1,173 @@
+""" Expand recurring events locally.
+
+Asking Google Calendar for `single_events=True` makes the server send a
+full event payload for every occurrence of every recurrence. Fetching
+with `single_events=False` instead returns each recurring series once,
+with its RRULE/EXRULE/RDATE/EXDATE lines. `expand_events` expands the
+series here with `dateutil.rrule`, only over the requested window,
+straight into NumPy arrays of UTC nanoseconds.
+
+Parsed rule sets are cached by rule text and first start, and
+expansions by rule, first start and window. The same series seen again,
+e.g. in next year's plot, is not parsed twice.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from dateutil.rrule import rrulestr
+from gcsa.serializers.event_serializer import EventSerializer
+
+from .tz import get_zone, to_utc_ns, from_utc_ns
+
+__all__ = ["expand_rule", "expand_events", "occurrences_to_dataframe"]
+
+
+@lru_cache(maxsize=256)
+def _ruleset(rule, dtstart):
+    return rrulestr(rule, dtstart=dtstart, forceset=True)
+
+
+@lru_cache(maxsize=1024)
+def _between(rule, dtstart, window_start, window_stop):
+    starts = _ruleset(rule, dtstart).between(window_start, window_stop,
+                                             inc=True)
+    return tuple(starts)
+
+
+def _window_like(moment, dtstart, tz=None):
+    """ Give a window bound the same awareness as `dtstart`."""
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, time())
+    if dtstart.tzinfo is None:
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(get_zone(tz)).replace(tzinfo=None)
+    elif moment.tzinfo is None:
+        moment = moment.replace(tzinfo=get_zone(tz))
+    return moment
+
+
+def expand_rule(recurrence, dtstart, window_start, window_stop, tz=None):
+    """ Return the occurrence starts of one recurrence within a window.
+
+    Parameters:
+        recurrence: list of RRULE/EXRULE/RDATE/EXDATE lines, as on a
+            gcsa `Event` or an API event.
+        dtstart: start of the first occurrence. A date is taken as
+            midnight and gives naive starts.
+        window_start, window_stop: bounds of the window, inclusive.
+        tz: zone of naive bounds when `dtstart` is aware, and the zone
+            aware bounds are moved to when it is naive.
+
+    Returns:
+        tuple of datetimes.
+    """
+    if not isinstance(dtstart, datetime):
+        dtstart = datetime.combine(dtstart, time())
+    rule = "\n".join(recurrence)
+    return _between(rule, dtstart, _window_like(window_start, dtstart, tz),
+                    _window_like(window_stop, dtstart, tz))
+
+
+def _series_start(event):
+    start = event.start
+    if isinstance(start, datetime) and start.tzinfo is not None and \
+            event.timezone:
+        # gcsa gives fixed offsets; the rule must step in the real zone
+        # so occurrences keep their wall time across DST changes.
+        start = start.astimezone(get_zone(event.timezone))
+    return start
+
+
+def _original_start(event):
+    original = (event.other or {}).get("originalStartTime")
+    if not original:
+        return None
+    if "dateTime" in original:
+        return pd.Timestamp(original["dateTime"]).value
+    return to_utc_ns([date.fromisoformat(original["date"])])[0]
+
+
+def _cancelled(event):
+    return (event.other or {}).get("status") == "cancelled"
+
+
+def expand_events(events, window_start, window_stop, tz=None):
+    """ Expand events fetched with `single_events=False` over a window.
+
+    Parameters:
+        events: iterable of gcsa `Event` objects. Recurring series carry
+            `recurrence`. Modified occurrences carry `recurring_event_id`
+            and replace the occurrence they were moved from; cancelled
+            ones only remove it.
+        window_start, window_stop: bounds of the window.
+        tz: zone for all day events and naive times. Default is the
+            display zone.
+
+    Returns:
+        `(events, index, start, stop)`: the events as a list, the event
+        of each occurrence as an index into it, and int64 arrays of UTC
+        nanoseconds for the start and stop of each occurrence.
+    """
+    events = [e if hasattr(e, "start") else EventSerializer.to_object(e)
+              for e in events]
+    if not isinstance(window_start, datetime):
+        window_start = datetime.combine(window_start, time())
+    lo = to_utc_ns([window_start], tz)[0]
+    hi = to_utc_ns([window_stop], tz)[0]
+
+    # Occurrences moved or cancelled on their own, by series id.
+    replaced = {}
+    for e in events:
+        if getattr(e, "recurring_event_id", None):
+            original = _original_start(e)
+            if original is not None:
+                replaced.setdefault(e.recurring_event_id, set()).add(original)
+
+    index, starts, stops = [], [], []
+    for i, e in enumerate(events):
+        # Cancelled occurrences only remove their slot from the series,
+        # and may come without a start.
+        if e.start is None or _cancelled(e):
+            continue
+        first = to_utc_ns([e.start], tz)[0]
+        length = to_utc_ns([e.end or e.start], tz)[0] - first
+        if not e.recurrence:
+            if first <= hi and first + length >= lo:
+                index.append(np.array([i]))
+                starts.append(np.array([first]))
+                stops.append(np.array([first + length]))
+            continue
+        # Reach back one event length for occurrences that started
+        # before the window but are still going.
+        earliest = window_start - timedelta(microseconds=int(length // 1000))
+        occurrences = expand_rule(e.recurrence, _series_start(e), earliest,
+                                  window_stop, tz)
+        # All day occurrences are naive midnights, read in `tz`.
+        ns = to_utc_ns(occurrences, tz)
+        moved = replaced.get(e.id)
+        if moved:
+            ns = ns[~np.isin(ns, list(moved))]
+        index.append(np.full(len(ns), i))
+        starts.append(ns)
+        stops.append(ns + length)
+
+    if not starts:
+        empty = np.array([], dtype=np.int64)
+        return events, empty, empty, empty
+    return (events, np.concatenate(index).astype(np.int64),
+            np.concatenate(starts), np.concatenate(stops))
+
+
+def occurrences_to_dataframe(events, index, start, stop, tz=None):
+    """ Return the frame `plot.events_to_dataframe` makes, from arrays."""
+    objs = np.empty(len(events), dtype=object)
+    objs[:] = events
+    df = pd.DataFrame({"Event_obj": objs[index]})
+    df["duration"] = pd.to_timedelta(stop - start, unit="ns")
+    df["mid"] = from_utc_ns(start + (stop - start) // 2, tz)
+    df["start"] = from_utc_ns(start, tz)
+    df["end"] = from_utc_ns(stop, tz)
+    df["summary"] = [e.summary for e in df["Event_obj"]]
+    return df
@@ -1,6 +1,10 @@
 import pytest
-from datetime import datetime
-from .model import CalendarElement, TimeDigit, UNITS
+import numpy as np
+import pandas as pd
+from datetime import datetime, date, time
+from dateutil.relativedelta import relativedelta
+from .model import CalendarElement, TimeDigit, UNITS, classify, _chrono_kind
+from . import model
 
 
 class Test_CalendarElement:
@@ -54,3 +58,176 @@ class Test_CalendarElement:
         assert ce.unit == "day"
         ce.day = None
         assert ce.unit == "month"
+
+    def test_datetime(self):
+        for kwargs in [{"year": 2024}, {"year": 2024, "month": 2, "day": 29},
+                       {"year": 2023, "month": 12, "day": 31, "hour": 23,
+                        "minute": 59, "second": 59,
+                        "microsecond": 999999},
+                       {"year": 2024, "hour": 5}]:
+            ce = CalendarElement(**kwargs)
+            assert ce.datetime() == datetime(1, 1, 1) + relativedelta(
+                **ce.as_dict())
+        assert ce.stop.datetime() == datetime(2024, 1, 1, 6)
+
+    def test_datetime_cache(self):
+        ce = CalendarElement(year=2024, month=1, day=31)
+        assert ce.datetime() is ce.datetime()
+        # A change to the digit is seen however it was made.
+        ce.digit.value = 30
+        assert ce.datetime() == datetime(2024, 1, 30)
+        # Days past the end of the month are clamped, as relativedelta did.
+        ce.month.value = 2
+        assert ce.datetime() == datetime(2024, 2, 29)
+
+    def test_elements_to_datetime64(self):
+        elements = list(CalendarElement(year=2024, month=2)) + [
+            CalendarElement(year=1, month=12, day=31, hour=1,
+                            microsecond=5)]
+        expected = [e.datetime() for e in elements]
+        assert list(model.elements_to_datetime64(elements).astype(
+            object)) == expected
+        assert model.elements_to_datetime64([]).dtype == "datetime64[us]"
+
+    def test_add(self):
+        ce = CalendarElement(year=2023, month=12, day=31, hour=23,
+                             minute=59)
+        assert (ce + 1).datetime() == datetime(2024, 1, 1)
+        assert (ce + 1).unit == "minute"
+        assert (ce + 10_000).datetime() == datetime(2024, 1, 7, 22, 39)
+        assert (1 + ce).datetime() == (ce + 1).datetime()
+        assert (CalendarElement(year=2024, month=2, day=28) + 1
+                ).datetime() == datetime(2024, 2, 29)
+        assert (CalendarElement(year=2023, month=2, day=28) + 1
+                ).datetime() == datetime(2023, 3, 1)
+        month = CalendarElement(year=2024, month=11)
+        assert (month + 14).as_dict() == {"year": 2026, "month": 1}
+        assert (month - 11).as_dict() == {"year": 2023, "month": 12}
+        assert (CalendarElement(year=2024) + 3).as_dict() == {"year": 2027}
+        assert CalendarElement(year=2024, month=12).stop.as_dict() == {
+            "year": 2025, "month": 1}
+
+    def test_sub(self):
+        a = CalendarElement(year=2025, month=3)
+        b = CalendarElement(year=2024, month=11)
+        assert a - b == 4
+        assert b - a == -4
+        day = CalendarElement(year=2024, month=3, day=1)
+        assert day - CalendarElement(year=2024, month=2, day=1) == 29
+        assert day - (day - 366) == 366
+        # Without a unit there is nothing to count in.
+        no_unit = CalendarElement(year=None)
+        assert no_unit.unit is None
+        with pytest.raises(TypeError):
+            no_unit - day
+        with pytest.raises(TypeError):
+            day - no_unit
+        with pytest.raises(TypeError):
+            no_unit - 1
+
+    def test_shift(self):
+        day = CalendarElement(year=2024, month=2, day=28)
+        shifted = day.shift(np.array([0, 1, 2, 366]))
+        assert shifted.dtype == "datetime64[us]"
+        assert list(shifted.astype(object)) == [
+            datetime(2024, 2, 28), datetime(2024, 2, 29),
+            datetime(2024, 3, 1), datetime(2025, 2, 28)]
+        month = CalendarElement(year=2024, month=11)
+        assert list(month.shift([2, -11]).astype(object)) == [
+            datetime(2025, 1, 1), datetime(2023, 12, 1)]
+
+
+class Test_CalendarPeriod:
+    def test_len_and_index(self):
+        year = model.Year(2024)
+        assert len(year) == 12
+        assert year.item_unit() == "months"
+        assert year[-1].start == datetime(2024, 12, 1)
+        with pytest.raises(IndexError):
+            year[12]
+        assert len(year[1]) == 29
+        assert len(year[0][0]) == 24
+        span = model.CalendarPeriod(datetime(2023, 1, 1),
+                                    datetime(2024, 6, 30))
+        assert len(span) == 18
+        assert span[12].start == datetime(2024, 1, 1)
+
+    def test_slices_are_views(self):
+        year = model.Year(2024)
+        view = year[1:12:2]
+        assert isinstance(view, model.PeriodView)
+        assert len(view) == 6
+        assert view[-1].start == datetime(2024, 12, 1)
+        assert [p.name for p in view[:2]] == ["February", "April"]
+
+    def test_subunit_generator(self):
+        decade = model.CalendarPeriod(datetime(2000, 1, 1),
+                                      datetime(2009, 12, 31))
+        assert len(decade) == 10
+        days = decade.as_unit("days")
+        assert next(days).start == datetime(2000, 1, 1)
+        assert sum(1 for _ in days) + 1 == 3653
+
+    def test_partial_last_item(self):
+        # Whole days from 06:00, but the last one ends at 06:59.
+        span = model.CalendarPeriod(datetime(2024, 1, 1, 6),
+                                    datetime(2024, 1, 3, 6))
+        assert span.item_unit() == "days"
+        assert len(span) == 3
+        assert [p.start for p in span] == [datetime(2024, 1, d, 6)
+                                           for d in (1, 2, 3)]
+        assert span[-1].start == datetime(2024, 1, 3, 6)
+        assert len(span[1:]) == 2
+
+
+class Test_classify:
+    def test_chrono_kind(self):
+        assert _chrono_kind(date(2020, 1, 1)) == "date"
+        assert _chrono_kind(datetime(2020, 1, 1)) == "dt"
+        assert _chrono_kind(pd.Timestamp("2020-01-01")) == "dt"
+        assert _chrono_kind(time(1, 0)) == "time"
+        with pytest.raises(TypeError):
+            _chrono_kind("2020-01-01")
+        # Cached types answer the same way twice.
+        with pytest.raises(TypeError):
+            _chrono_kind("2020-01-01")
+
+    def test_classify(self):
+        starts = [date(2020, 1, 1), datetime(2020, 1, 1, 9), None,
+                  pd.Timestamp("2020-01-02")]
+        assert list(classify(starts)) == ["date", "dt", "", "dt"]
+        assert list(classify(np.array(["2020-01-01"], dtype="datetime64[D]"))
+                    ) == ["date"]
+        assert list(classify(pd.Series(pd.to_datetime(["2020-01-01"])))
+                    ) == ["dt"]
+
+
+class Test_instrumented:
+    def test_report(self):
+        with model.instrumented() as report:
+            CalendarElement(year=2024, month=2).start.datetime()
+            model.Year(2024)
+            classify([date(2020, 1, 1)] * 3)
+        assert report["constructions"]["CalendarElement"] >= 2
+        # A Year is counted once, under its own class.
+        assert report["constructions"]["Year"] == 1
+        assert "CalendarPeriod" not in report["constructions"]
+        assert report["calls"]["CalendarElement.datetime"] == 1
+        assert report["caches"]["CalendarElement.datetime"]["misses"] == 1
+        assert report["seconds"]["CalendarElement.start"] > 0
+        assert report["caches"]["chrono_kind"]["hit_rate"] == 1.0
+
+    def test_restored(self):
+        init = TimeDigit.__init__
+        start = CalendarElement.__dict__["start"]
+        with model.instrumented():
+            with model.instrumented() as inner:
+                TimeDigit("year", 2024)
+            assert TimeDigit.__init__ is not init
+            TimeDigit("year", 2024)
+            assert model.instrument_report()["constructions"][
+                "TimeDigit"] == 2
+        assert inner["constructions"] == {"TimeDigit": 1}
+        assert TimeDigit.__init__ is init
+        assert CalendarElement.__dict__["start"] is start
+        assert not model.instrumentation_enabled()
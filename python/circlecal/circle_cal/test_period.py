@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+from .model import Year
+from .period import Period
+from .plot import to_theta
+
+
+class Test_Period:
+    def test_window(self):
+        p = Period(date(2024, 3, 15), date(2025, 3, 15))
+        assert p.start == datetime(2024, 3, 15)
+        assert p.last == datetime(2025, 3, 14)
+        assert p.shape == "circle"
+        with pytest.raises(ValueError):
+            Period(date(2024, 3, 15), date(2024, 3, 15))
+        with pytest.raises(ValueError):
+            Period(date(2024, 1, 1), date(2025, 1, 1), shape="helix")
+
+    def test_rolling(self):
+        p = Period.rolling(months=12, end=date(2024, 2, 29))
+        assert p.start == datetime(2023, 3, 1)
+        assert p.last == datetime(2024, 2, 29)
+
+    def test_circle_matches_year(self):
+        p = Period.years(2024)
+        assert p.shape == "circle"
+        year = Year(2024)
+        for dt in [datetime(2024, 1, 1), datetime(2024, 7, 4, 18),
+                   datetime(2024, 12, 31, 23)]:
+            assert p.theta(dt) == pytest.approx(year.to_theta(dt))
+            assert to_theta(dt, p) == pytest.approx(year.to_theta(dt))
+        assert p.radius(datetime(2024, 5, 1)) == 1
+
+    def test_spiral(self):
+        p = Period.years(2020, 4)
+        assert p.shape == "spiral"
+        values = np.array(["2020-01-01", "2021-07-02T12", "2023-01-01",
+                           "2024-01-01"], dtype="datetime64[us]")
+        theta, r = p.polar(values)
+        assert theta == pytest.approx([0, 180, 0, 0])
+        assert r == pytest.approx([0, 1.5 / 4, .75, 1])
+        # A date keeps its angle from year to year.
+        assert p.theta(date(2021, 3, 1)) == pytest.approx(
+            Year(2021).to_theta(date(2021, 3, 1)))
+
+    def test_bounds(self):
+        p = Period(date(2023, 12, 20), date(2024, 2, 10))
+        months = p.bounds("months")
+        assert list(months.astype(str)) == ["2023-12-20", "2024-01-01",
+                                             "2024-02-01"]
+        assert p.bounds("months") is months
+        assert list(p.bounds("years").astype(str)) == ["2023-12-20",
+                                                       "2024-01-01"]
+        weeks = p.bounds("weeks")
+        assert weeks[0] == np.datetime64("2023-12-20")
+        assert all(d.weekday() == 0 for d in weeks[1:].tolist())
+        assert len(p.bounds("days")) == 52
+
+    def test_days(self):
+        p = Period.years(2023, 2)
+        days = p.days
+        assert len(days) == 365 + 366
+        assert days is p.days
+        d = date(2024, 2, 29)
+        row = days[days["date"] == np.datetime64(d)][0]
+        assert (row["month"], row["day"]) == (2, 29)
+        assert row["weekday"] == d.weekday()
+        assert row["r_start"] < row["r_mid"] < row["r_end"]
+        # The last day of each year ends the turn rather than wrapping.
+        assert days["theta_end"][364] == pytest.approx(360)
+        assert np.all(days["theta_end"] > days["theta_start"])
+        with pytest.raises(ValueError):
+            days["r_mid"][0] = 1
+
+    def test_timedelta_values(self):
+        p = Period(date(2024, 1, 1), date(2024, 1, 11))
+        assert p.theta(datetime(2024, 1, 1) + timedelta(days=5)) == 180
+
+    @pytest.mark.parametrize("shape", ["circle", "spiral"])
+    def test_theta_range(self, shape):
+        p = Period(date(2024, 1, 1), date(2024, 1, 11), shape=shape)
+        assert p.theta(date(2024, 1, 11)) == pytest.approx(
+            360 if shape == "circle" else 10 / 366 * 360)
+        with pytest.raises(ValueError):
+            p.theta(datetime(2023, 12, 31, 23))
+        with pytest.raises(ValueError):
+            p.theta(datetime(2024, 1, 11, 0, 1))
+        with pytest.raises(ValueError):
+            p.theta(np.array(["2024-01-05", "2024-02-01"],
+                             dtype="datetime64[D]"))
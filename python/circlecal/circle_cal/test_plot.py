@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from datetime import date, datetime
+from gcsa.event import Event
+from .model import Year, classify
+from .period import Period
+from . import plot
+
+
+@pytest.fixture
+def threshold():
+    saved = plot._render["webgl_threshold"]
+    yield
+    plot.set_webgl_threshold(saved)
+
+
+def _frame(mids):
+    mids = pd.to_datetime(mids).tz_localize("America/New_York")
+    return pd.DataFrame({"mid": mids,
+                         "summary": [f"event {i}" for i in range(len(mids))]})
+
+
+class Test_webgl:
+    def test_use_webgl(self, threshold):
+        plot.set_webgl_threshold(10)
+        assert not plot.use_webgl(10)
+        assert plot.use_webgl(11)
+        assert not plot.use_webgl(11, webgl=False)
+        assert plot.use_webgl(1, webgl=True)
+        plot.set_webgl_threshold(None)
+        assert not plot.use_webgl(10 ** 6)
+
+    def test_scatterpolar(self, threshold):
+        plot.set_webgl_threshold(2)
+        small = plot.scatterpolar([0, 90], .5)
+        assert type(small) is go.Scatterpolar
+        big = plot.scatterpolar([0, 90, 180], [1, 2, 3], mode="markers")
+        assert type(big) is go.Scatterpolargl
+        assert big.mode == "markers"
+        assert big.theta.dtype == np.float64
+        assert list(big.r) == [1, 2, 3]
+
+
+class Test_events_to_trace:
+    def test_theta(self):
+        mids = ["2024-03-01 12:00", "2025-03-01 12:00"]
+        trace = plot.events_to_trace(_frame(mids))
+        expected = [Year(2024).to_theta(datetime(2024, 3, 1, 12)),
+                    Year(2025).to_theta(datetime(2025, 3, 1, 12))]
+        assert trace.theta == pytest.approx(expected)
+        assert list(trace.r) == [.5, .5]
+        assert trace.hovertext[0].endswith("event 0")
+
+    def test_year_and_period(self):
+        df = _frame(["2024-07-01"])
+        year = Year(2024)
+        expected = year.to_theta(datetime(2024, 7, 1))
+        assert plot.events_to_trace(df, year).theta == pytest.approx(
+            [expected])
+        assert plot.events_to_trace(df, 2024).theta == pytest.approx(
+            [expected])
+        window = Period(datetime(2024, 6, 1), datetime(2024, 8, 1))
+        assert plot.events_to_trace(df, window).theta == pytest.approx(
+            [360 * 30 / 61])
+
+    def test_dense(self, threshold):
+        plot.set_webgl_threshold(100)
+        mids = pd.date_range("2024-01-01", periods=500, freq="h")
+        trace = plot.events_to_trace(_frame(mids))
+        assert type(trace) is go.Scatterpolargl
+        assert len(plot.events_to_trace(_frame(mids[:0])).theta) == 0
+
+
+class Test_events_to_dataframe:
+    def test_kind(self):
+        events = [Event("all day", start=date(2024, 5, 1),
+                        end=date(2024, 5, 2)),
+                  Event("timed", start=datetime(2024, 5, 1, 9),
+                        end=datetime(2024, 5, 1, 10),
+                        timezone="America/New_York"),
+                  Event("midnight", start=datetime(2024, 5, 2),
+                        end=datetime(2024, 5, 2, 1),
+                        timezone="America/New_York")]
+        df = plot.events_to_dataframe(events, tz="America/New_York")
+        assert list(df["kind"]) == ["date", "dt", "dt"]
+        assert list(df.loc[df["kind"] == "date", "summary"]) == ["all day"]
+        # The converted column no longer knows which starts were dates.
+        assert str(df["start"].iloc[0]) == "2024-05-01 00:00:00-04:00"
+        assert list(classify(df["start"])) == ["dt", "dt", "dt"]
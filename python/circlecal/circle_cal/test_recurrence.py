@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from gcsa.serializers.event_serializer import EventSerializer
+from .recurrence import (expand_rule, expand_events, occurrences_to_dataframe,
+                         _between, _ruleset)
+
+
+NY = ZoneInfo("America/New_York")
+UTC = ZoneInfo("UTC")
+
+
+def event(**kwargs):
+    return EventSerializer.to_object({"summary": "e", **kwargs})
+
+
+def test_expand_rule_window():
+    starts = expand_rule(["RRULE:FREQ=DAILY"], date(2024, 1, 1),
+                         date(2024, 1, 10), date(2024, 1, 12))
+    assert starts == (datetime(2024, 1, 10), datetime(2024, 1, 11),
+                      datetime(2024, 1, 12))
+
+
+def test_expand_events_keeps_wall_time_and_exceptions():
+    series = event(id="s",
+                   start={"dateTime": "2024-03-08T09:00:00-05:00",
+                          "timeZone": "America/New_York"},
+                   end={"dateTime": "2024-03-08T09:30:00-05:00",
+                        "timeZone": "America/New_York"},
+                   recurrence=["RRULE:FREQ=DAILY;COUNT=4",
+                               "EXDATE;TZID=America/New_York:20240309T090000"])
+    moved = event(id="s_1",
+                  start={"dateTime": "2024-03-10T11:00:00-04:00",
+                         "timeZone": "America/New_York"},
+                  end={"dateTime": "2024-03-10T11:30:00-04:00",
+                       "timeZone": "America/New_York"},
+                  recurringEventId="s",
+                  originalStartTime={"dateTime": "2024-03-10T09:00:00-04:00"})
+    df = occurrences_to_dataframe(
+        *expand_events([series, moved], date(2024, 3, 1), date(2024, 4, 1),
+                       tz=NY), tz=NY)
+    got = sorted((r.start.day, r.start.hour) for r in df.itertuples())
+    # The 9th is excluded, the 10th moved to 11:00, the 11th is after DST.
+    assert got == [(8, 9), (10, 11), (11, 9)]
+    assert (df["end"] - df["start"]).dt.total_seconds().eq(1800).all()
+
+
+def _daily():
+    return event(id="d", start={"dateTime": "2024-05-01T09:00:00+00:00",
+                                "timeZone": "UTC"},
+                 end={"dateTime": "2024-05-01T10:00:00+00:00",
+                      "timeZone": "UTC"},
+                 recurrence=["RRULE:FREQ=DAILY;COUNT=3"])
+
+
+def test_cancelled_exception():
+    # As sent with single_events=False: no start, only the slot it frees.
+    cancelled = EventSerializer.to_object({
+        "id": "d_2", "status": "cancelled", "recurringEventId": "d",
+        "originalStartTime": {"dateTime": "2024-05-02T09:00:00+00:00"}})
+    with_start = event(id="d_3", status="cancelled", recurringEventId="d",
+                       start={"dateTime": "2024-05-03T09:00:00+00:00"},
+                       end={"dateTime": "2024-05-03T10:00:00+00:00"},
+                       originalStartTime={
+                           "dateTime": "2024-05-03T09:00:00+00:00"})
+    events, index, start, stop = expand_events(
+        [_daily(), cancelled, with_start], date(2024, 5, 1), date(2024, 6, 1),
+        tz=UTC)
+    assert index.tolist() == [0]
+    df = occurrences_to_dataframe(events, index, start, stop, tz=UTC)
+    assert df["start"].dt.day.tolist() == [1]
+
+
+def test_moved_exception():
+    moved = event(id="d_2", recurringEventId="d", summary="late",
+                  start={"dateTime": "2024-05-02T15:00:00+00:00"},
+                  end={"dateTime": "2024-05-02T17:00:00+00:00"},
+                  originalStartTime={
+                      "dateTime": "2024-05-02T09:00:00+00:00"})
+    df = occurrences_to_dataframe(
+        *expand_events([_daily(), moved], date(2024, 5, 1), date(2024, 6, 1),
+                       tz=UTC), tz=UTC)
+    got = sorted((r.start.day, r.start.hour, r.duration.seconds, r.summary)
+                 for r in df.itertuples())
+    assert got == [(1, 9, 3600, "e"), (2, 15, 7200, "late"),
+                   (3, 9, 3600, "e")]
+
+
+def test_cache_hits():
+    _between.cache_clear()
+    _ruleset.cache_clear()
+    for _ in range(3):
+        expand_events([_daily()], date(2024, 5, 1), date(2024, 6, 1), tz=UTC)
+    assert _between.cache_info().hits == 2
+    assert _between.cache_info().misses == 1
+    # A new window expands again, from the parsed rule.
+    expand_events([_daily()], date(2024, 5, 2), date(2024, 6, 1), tz=UTC)
+    assert _between.cache_info().misses == 2
+    assert _ruleset.cache_info().misses == 1
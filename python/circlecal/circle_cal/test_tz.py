@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+from .tz import (NAT, to_utc_ns, from_utc_ns, localize_any, get_zone,
+                 zone_cache_info)
+
+
+NY = ZoneInfo("America/New_York")
+
+
+class Test_to_utc_ns:
+    def test_mixed(self):
+        values = [date(2024, 1, 1),
+                  datetime(2024, 7, 1, 12),
+                  datetime(2024, 7, 1, 12, tzinfo=timezone.utc),
+                  None]
+        ns = to_utc_ns(values, "America/New_York")
+        expected = [datetime(2024, 1, 1, tzinfo=NY),
+                    datetime(2024, 7, 1, 12, tzinfo=NY),
+                    datetime(2024, 7, 1, 12, tzinfo=timezone.utc)]
+        for got, want in zip(ns[:3], expected):
+            assert got == int(want.timestamp()) * 10**9
+        assert ns[3] == NAT
+
+    def test_array_and_series(self):
+        naive = np.array(["2024-03-01T00:00"], dtype="datetime64[m]")
+        assert to_utc_ns(naive, "UTC")[0] == \
+            int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp()) * 10**9
+        aware = pd.Series(pd.to_datetime(["2024-03-01 05:00"])).dt.tz_localize(
+            "UTC")
+        assert to_utc_ns(aware)[0] == to_utc_ns(naive, "UTC")[0] + 5 * 3600 * 10**9
+
+    def test_ambiguous_takes_standard_time(self):
+        ns = to_utc_ns([datetime(2024, 11, 3, 1, 30)], "America/New_York")
+        assert from_utc_ns(ns, "UTC")[0].hour == 6
+
+
+def test_round_trip():
+    ns = to_utc_ns([datetime(2024, 5, 5, 8, 15)])
+    shown = from_utc_ns(ns, "America/New_York")[0]
+    assert (shown.hour, shown.minute) == (8, 15)
+
+
+def test_localize_any():
+    aware = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert localize_any(aware, "America/New_York") is aware
+    d = localize_any(date(2024, 1, 1), "America/New_York")
+    assert d == datetime(2024, 1, 1, tzinfo=NY)
+    assert get_zone("America/New_York") is get_zone("America/New_York")
+
+
+def test_zone_cache_info():
+    before = zone_cache_info()
+    assert get_zone("Europe/Oslo") is get_zone("Europe/Oslo")
+    after = zone_cache_info()
+    assert after.hits - before.hits >= 1
+    assert after.currsize >= 1
@@ -0,0 +1,89 @@
+import calendar
+import pickle
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+from .model import Year
+from .utils import date_to_theta
+from .yeartable import year_table, build_days
+
+
+class Test_build_days:
+    def test_fields(self):
+        days = build_days(2024)
+        assert len(days) == 366
+        for i in [0, 59, 200, 365]:
+            d = date(2024, 1, 1) + timedelta(days=i)
+            assert days["month"][i] == d.month
+            assert days["day"][i] == d.day
+            assert days["weekday"][i] == d.weekday()
+            assert days["week"][i] == d.isocalendar().week
+            assert days["weekend"][i] == (d.weekday() >= 5)
+        assert days["theta_end"][-1] == 360
+
+    def test_bounds(self):
+        table = year_table(2023)
+        starts = [date(2023, m, 1).timetuple().tm_yday - 1
+                  for m in range(1, 13)]
+        assert list(table.month_bounds) == starts + [365]
+        weeks = table.week_bounds
+        # 2023 starts on a Sunday, so the first week is one day long.
+        assert list(weeks[:3]) == [0, 1, 8]
+        assert weeks[-1] == 365
+        assert table.days["weekend"].sum() == sum(
+            calendar.weekday(2023, m, d) >= 5
+            for m in range(1, 13)
+            for d in range(1, calendar.monthrange(2023, m)[1] + 1))
+
+
+class Test_year_table:
+    def test_theta(self):
+        table = year_table(2024)
+        year = Year(2024)
+        for value in [date(2024, 3, 1), datetime(2024, 7, 4, 18),
+                      timedelta(days=2)]:
+            assert np.isclose(table.theta(value), year.to_theta(value))
+        values = np.array(["2024-01-01", "2024-12-31T12"],
+                          dtype="datetime64[us]")
+        assert np.allclose(table.theta(values),
+                           [0, 365.5 * 360 / 366])
+        assert date_to_theta(date(2024, 1, 2)) == 360 / 366
+        assert year_table(2024) is table
+
+    def test_memmap(self, tmp_path):
+        table = year_table(2025, str(tmp_path))
+        assert isinstance(table.days, np.memmap)
+        assert (tmp_path / "year-2025.npy").exists()
+        assert np.array_equal(table.days, build_days(2025))
+        copy = pickle.loads(pickle.dumps(table))
+        assert copy is table
+
+    def test_theta_out_of_year(self):
+        table = year_table(2024)
+        with pytest.raises(ValueError):
+            table.theta(datetime(2025, 3, 1))
+        with pytest.raises(ValueError):
+            table.theta(np.array(["2024-06-01", "2023-12-31"],
+                                 dtype="datetime64[D]"))
+        # The midnight closing the year is the end of the circle.
+        assert table.theta(date(2025, 1, 1)) == 360
+        assert table.theta(timedelta(days=400)) > 360
+
+
+class Test_date_to_theta:
+    def test_array(self):
+        values = np.array(["2024-01-02", "2024-12-31T18"],
+                          dtype="datetime64[us]")
+        assert np.allclose(date_to_theta(values), [360 / 366, 365 * 360 / 366])
+        assert np.allclose(date_to_theta(values, 2024),
+                           date_to_theta(values))
+
+    def test_array_of_years(self):
+        values = np.array(["2023-01-02", "2024-01-02"],
+                          dtype="datetime64[D]")
+        assert np.allclose(date_to_theta(values), [360 / 365, 360 / 366])
+        assert date_to_theta(values[0]) == 360 / 365
+
+    def test_dates(self):
+        assert date_to_theta([date(2023, 1, 2)]) == [360 / 365]
+        assert date_to_theta(date(2024, 1, 2), Year(2024)) == 360 / 366
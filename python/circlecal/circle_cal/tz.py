@@ -0,0 +1,134 @@
+""" Timezone normalization for event times.
+
+Events arrive as dates (all day), naive datetimes and aware datetimes,
+often mixed in one calendar. `to_utc_ns` turns a whole column of them
+into UTC nanoseconds since the epoch in a few array operations. Dates
+and naive datetimes are read in a zone, the display zone unless another
+is given. `from_utc_ns` turns the numbers back into aware times in the
+display zone for plotting.
+
+Zones are `zoneinfo.ZoneInfo` objects cached by name. Any tzinfo, pytz
+zones included, is accepted where a zone is expected.
+"""
+from datetime import date, datetime, time, tzinfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["NAT", "get_zone", "zone_cache_info", "display_zone",
+           "set_display_zone", "localize_any", "to_utc_ns", "from_utc_ns"]
+
+# Integer value numpy and pandas use for NaT.
+NAT = np.iinfo(np.int64).min
+
+_display = {"zone": "America/New_York"}
+
+
+@lru_cache(maxsize=None)
+def _zone_by_name(name):
+    return ZoneInfo(name)
+
+
+def get_zone(tz=None):
+    """ Return a tzinfo for a zone name or tzinfo, or the display zone."""
+    if tz is None:
+        tz = _display["zone"]
+    if isinstance(tz, tzinfo):
+        return tz
+    return _zone_by_name(tz)
+
+
+def zone_cache_info():
+    """ Return the `lru_cache` statistics of the zones `get_zone` built."""
+    return _zone_by_name.cache_info()
+
+
+def display_zone():
+    return get_zone()
+
+
+def set_display_zone(tz):
+    """ Set the zone that dates and naive times are read and shown in."""
+    get_zone(tz)  # Fail early on unknown names.
+    _display["zone"] = tz
+
+
+def _localize(naive, zone):
+    """ Return UTC ns for a datetime64[us] array of wall times in `zone`."""
+    index = pd.DatetimeIndex(naive.astype("datetime64[ns]"))
+    # Ambiguous wall times take standard time, as pytz's localize did.
+    index = index.tz_localize(zone,
+                              ambiguous=np.zeros(len(index), dtype=bool),
+                              nonexistent="shift_forward")
+    return index.asi8
+
+
+def to_utc_ns(values, tz=None):
+    """ Return an int64 array of UTC nanoseconds for mixed time values.
+
+    Parameters:
+        values: sequence of dates, naive or aware datetimes, or None, or
+            a numpy datetime64 array (read as naive), or a pandas
+            Series/Index of datetimes.
+        tz: zone for dates and naive datetimes. Default is the display
+            zone. Dates are taken at midnight.
+
+    Missing values come back as `NAT`.
+    """
+    zone = get_zone(tz)
+    if isinstance(values, (pd.Series, pd.Index)):
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            return pd.DatetimeIndex(values).tz_convert("UTC") \
+                .as_unit("ns").asi8
+        if values.dtype.kind == "M":
+            values = values.to_numpy()
+        else:
+            values = values.tolist()
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return _localize(values.astype("datetime64[us]"), zone)
+
+    values = list(values)
+    n = len(values)
+    out = np.full(n, NAT, dtype=np.int64)
+    naive_rows, naive = [], []
+    aware_rows, aware = [], []
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        if isinstance(v, datetime):
+            if v.tzinfo is not None and v.utcoffset() is not None:
+                aware_rows.append(i)
+                aware.append(v)
+            else:
+                naive_rows.append(i)
+                naive.append(v)
+        elif isinstance(v, date):
+            naive_rows.append(i)
+            naive.append(datetime.combine(v, time()))
+        else:
+            raise TypeError(f"{v!r} is not a date or datetime.")
+    if naive:
+        out[naive_rows] = _localize(np.array(naive, dtype="datetime64[us]"),
+                                    zone)
+    if aware:
+        out[aware_rows] = pd.to_datetime(aware, utc=True).as_unit("ns").asi8
+    return out
+
+
+def from_utc_ns(ns, tz=None):
+    """ Return a tz-aware `DatetimeIndex` in `tz` (default display zone)."""
+    return pd.DatetimeIndex(np.asarray(ns, dtype=np.int64).view(
+        "datetime64[ns]")).tz_localize("UTC").tz_convert(get_zone(tz))
+
+
+def localize_any(obj, tz=None):
+    """ Return a date or datetime as an aware datetime.
+
+    Aware datetimes are returned as they are. Dates and naive datetimes
+    are read in `tz`, default the display zone.
+    """
+    if isinstance(obj, datetime) and obj.tzinfo is not None:
+        return obj
+    return from_utc_ns(to_utc_ns([obj], tz), tz)[0].to_pydatetime()
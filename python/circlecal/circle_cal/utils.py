@@ -1,21 +1,33 @@
 from datetime import datetime, date, timedelta
+
+import numpy as np
+
 from .model import TimeDigit, CalendarElement
+from .yeartable import _naive, year_table
 
 __all__ = ['date_to_theta', 'events_to_dur',
            'events_to_mid', 'events_to_polar']
 
 
 def date_to_theta(d, year=None):
-    try:
-        day_to_theta = 360 / (year.stop.datetime() -
-                              year.start.datetime()).days
-    except TypeError:
-        year = Year_Data(datetime.now().year)
-
-    d2th = 360 / ((year.start.date() - year.end) / timedelta(days=1))
-    day = year.int_from_date(d)
-
-    return day * day_to_theta
+    """ Return the angle of the start of the day of `d`.
+
+    `d` may be a date-like or an array of them. `year` is an int or a
+    `Year`, default the year of `d`, taken per element for arrays.
+    """
+    if year is None and not hasattr(d, "year"):
+        days = _naive(d).astype("datetime64[D]")
+        years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+        theta = np.empty(days.shape)
+        for y in np.unique(years):
+            table = year_table(int(y))
+            mask = years == y
+            theta[mask] = table.days["theta_start"][table.day_of(days[mask])]
+        return theta if np.ndim(theta) else float(theta)
+    if year is None:
+        year = d.year
+    table = year_table(getattr(year, "year", year))
+    return table.days["theta_start"][table.day_of(d)]
 
 
 def events_to_dur(events):
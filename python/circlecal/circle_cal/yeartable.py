@@ -0,0 +1,168 @@
+""" Precomputed day and angle tables for a year.
+
+The circle of a year is cut into one wedge per day. Every renderer needs
+the same numbers for it: the angle of each day, where months and weeks
+start, which days are weekends. `year_table` works them out once per
+year with array arithmetic and keeps them in a `YearTable`.
+
+A table is memoized in the process. Given a `cache_dir` it is also saved
+as a `.npy` file and opened memory mapped, so a pool of renderer
+processes shares one read-only copy. A memory mapped table pickles as
+its year and directory and is mapped again on the other side, not copied.
+"""
+import os
+import tempfile
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+
+__all__ = ["DAY_DTYPE", "YearTable", "year_table", "build_days",
+           "calendar_fields"]
+
+
+# One row per day of the year.
+DAY_DTYPE = np.dtype([("month", "u1"),          # 1-12
+                      ("day", "u1"),            # day of the month
+                      ("weekday", "u1"),        # Monday is 0
+                      ("week", "u1"),           # ISO week number
+                      ("weekend", "?"),
+                      ("theta_start", "f8"),    # degrees
+                      ("theta_mid", "f8"),
+                      ("theta_end", "f8")])
+
+
+def calendar_fields(days, dates):
+    """ Fill the calendar fields of `days` for datetime64[D] `dates`."""
+    months = dates.astype("datetime64[M]")
+    # 1970-01-01 was a Thursday.
+    weekday = (dates.astype(np.int64) + 3) % 7
+    # An ISO week belongs to the year its Thursday falls in.
+    thursday = dates - weekday + 3
+    week = (thursday - thursday.astype("datetime64[Y]").astype(
+        "datetime64[D]")).astype(np.int64) // 7 + 1
+    days["month"] = months.astype(np.int64) % 12 + 1
+    days["day"] = (dates - months.astype("datetime64[D]")).astype(
+        np.int64) + 1
+    days["weekday"] = weekday
+    days["week"] = week
+    days["weekend"] = weekday >= 5
+    return days
+
+
+def build_days(year):
+    """ Return the `DAY_DTYPE` array of `year`."""
+    dates = np.arange(np.datetime64(f"{year:04d}-01-01"),
+                      np.datetime64(f"{year + 1:04d}-01-01"),
+                      dtype="datetime64[D]")
+    n = len(dates)
+    theta_per_day = 360 / n
+
+    days = calendar_fields(np.empty(n, dtype=DAY_DTYPE), dates)
+    index = np.arange(n)
+    days["theta_start"] = index * theta_per_day
+    days["theta_mid"] = (index + .5) * theta_per_day
+    days["theta_end"] = (index + 1) * theta_per_day
+    return days
+
+
+def _naive(values):
+    """ Return an array of datetime64[us] wall times for date-likes."""
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[us]")
+    flat = [v.replace(tzinfo=None) if getattr(v, "tzinfo", None) else v
+            for v in arr.ravel()]
+    return np.array(flat, dtype="datetime64[us]").reshape(arr.shape)
+
+
+class YearTable:
+    """ The days of one year and their angles on the circle.
+
+    Attributes:
+        year: the year.
+        days: `DAY_DTYPE` array, one row per day, maybe memory mapped.
+        path: file the days are mapped from, or None.
+    """
+
+    def __init__(self, year, days, path=None):
+        self.year = year
+        self.days = days
+        self.path = path
+        self.theta_per_day = 360 / len(days)
+        self._start = np.datetime64(f"{year:04d}-01-01", "us")
+
+    def __len__(self):
+        return len(self.days)
+
+    def __reduce__(self):
+        if self.path is not None:
+            return (year_table, (self.year, os.path.dirname(self.path)))
+        return (YearTable, (self.year, np.asarray(self.days)))
+
+    @property
+    def month_bounds(self):
+        """ First day of each month and the length of the year, 13 ints."""
+        return np.append(np.flatnonzero(self.days["day"] == 1), len(self))
+
+    @property
+    def week_bounds(self):
+        """ First day of each week, Monday or Jan 1, and the year length."""
+        starts = np.flatnonzero(self.days["weekday"] == 0)
+        if len(starts) == 0 or starts[0] != 0:
+            starts = np.insert(starts, 0, 0)
+        return np.append(starts, len(self))
+
+    def day_of(self, values):
+        """ Return the 0-based day of the year of date-likes."""
+        days = (_naive(values).astype("datetime64[D]") -
+                self._start.astype("datetime64[D]")).astype(np.int64)
+        if np.any((days < 0) | (days >= len(self))):
+            raise ValueError(f"{values} is not in {self.year}.")
+        return days if np.ndim(days) else int(days)
+
+    def theta(self, values):
+        """ Return the angle of date-likes, or of timedeltas as spans.
+
+        Dates are taken at midnight. Times within a day give angles
+        within its wedge, as `Year.to_theta` does. Moments must fall in
+        the year, or on the midnight that closes it, which is 360.
+        """
+        if isinstance(values, timedelta):
+            return values / timedelta(days=1) * self.theta_per_day
+        arr = np.asarray(values)
+        if arr.dtype.kind == "m":
+            days = arr / np.timedelta64(1, "D")
+        else:
+            days = (_naive(arr) - self._start) / np.timedelta64(1, "D")
+            if np.any((days < 0) | (days > len(self))):
+                raise ValueError(f"{values} is not in {self.year}.")
+        theta = days * self.theta_per_day
+        return theta if np.ndim(theta) else float(theta)
+
+
+@lru_cache(maxsize=None)
+def year_table(year, cache_dir=None):
+    """ Return the `YearTable` of `year`, built once per process.
+
+    Parameters:
+        year: int year.
+        cache_dir: directory to keep `year-<year>.npy` in. The file is
+            written if missing and mapped read-only, so processes given
+            the same directory share it.
+    """
+    if cache_dir is None:
+        days = build_days(year)
+        # Shared by every caller in the process.
+        days.flags.writeable = False
+        return YearTable(year, days)
+    path = os.path.join(cache_dir, f"year-{year:04d}.npy")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write beside the target and rename, so a reader in another
+        # process never maps a half written file.
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, build_days(year))
+        os.replace(tmp, path)
+    return YearTable(year, np.load(path, mmap_mode="r"), path)
@@ -0,0 +1,38 @@
+import networkx as nx
+
+from tbdoist.ancestry import AncestorIndex
+from tbdoist.client import RateLimiter
+from tbdoist.modify import manage_supertask_links
+
+from conftest import FakeApi
+
+
+def test_td_iter_to_graph(benchmark, cli, workspace_2k):
+    g = benchmark(cli.td_iter_to_graph, workspace_2k)
+    assert len(g) == len(workspace_2k)
+
+
+def test_td_g_to_tree_view(benchmark, cli, workspace_2k):
+    g = cli.td_iter_to_graph(workspace_2k)
+
+    def tree_edges():
+        # The view is lazy; walking its edges runs the filter.
+        return sum(1 for _ in cli.td_g_to_tree_view(g).edges)
+
+    assert benchmark(tree_edges) == len(workspace_2k) - 10
+
+
+def test_manage_supertask_links(benchmark, workspace_2k):
+    index = AncestorIndex.from_objects(workspace_2k)
+    tasks = [o for o in workspace_2k if hasattr(o, "content")]
+    # No waiting on the rate limit; only local work is measured.
+    limiter = RateLimiter(rate=1e9, burst=1e9)
+
+    def relink():
+        api = FakeApi(tasks)
+        return manage_supertask_links(api, tasks, index=index,
+                                      limiter=limiter)
+
+    results = benchmark(relink)
+    assert len(results) == len(tasks)
+    assert any(r is not None for r in results)
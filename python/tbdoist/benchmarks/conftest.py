@@ -0,0 +1,104 @@
+""" Synthetic todoist data and a fake API for the benchmarks.
+
+Nothing here goes online. `FakeApi` answers the `TodoistAPI` calls the
+benchmarked functions make from a dict of objects.
+"""
+import random
+
+import pytest
+from todoist_api_python.models import Task, Project, Section
+
+try:
+    from benchmark_baseline import pytest_configure  # noqa: F401
+except ImportError:
+    # A plain test run collects this conftest too, without the
+    # pythonpath of benchmarks/pytest.ini. It runs no benchmarks.
+    pass
+
+
+def _project(i):
+    return Project(color="grey", comment_count=0, id=f"p{i}",
+                   is_favorite=False, is_inbox_project=False,
+                   is_shared=False, is_team_inbox=False,
+                   can_assign_tasks=False, name=f"project {i}", order=i,
+                   parent_id=None, url=f"https://todoist.com/p{i}",
+                   view_style="list")
+
+
+def _section(i, project_id):
+    return Section(id=f"s{i}", name=f"section {i}", order=i,
+                   project_id=project_id)
+
+
+def _task(i, project_id, section_id=None, parent_id=None):
+    return Task(assignee_id=None, assigner_id=None, comment_count=0,
+                is_completed=False, content=f"task {i}", created_at="",
+                creator_id="", description="", due=None, id=f"t{i}",
+                labels=[], order=i, parent_id=parent_id, priority=1,
+                project_id=project_id, section_id=section_id,
+                url=f"https://todoist.com/t{i}", duration=None,
+                sync_id=None)
+
+
+def synthetic_workspace(n_tasks, n_projects=10, seed=0):
+    """ Return `(projects, sections, tasks)` with nested subtasks.
+
+    About half the tasks are subtasks of an earlier task in the same
+    project, so trees run a few levels deep.
+    """
+    rng = random.Random(seed)
+    projects = [_project(i) for i in range(n_projects)]
+    sections = [_section(i, projects[i % n_projects].id)
+                for i in range(2 * n_projects)]
+    tasks = []
+    for i in range(n_tasks):
+        if tasks and rng.random() < .5:
+            parent = rng.choice(tasks[-50:])
+            tasks.append(_task(i, parent.project_id, parent.section_id,
+                               parent.id))
+            continue
+        if rng.random() < .5:
+            section = rng.choice(sections)
+            tasks.append(_task(i, section.project_id, section.id))
+        else:
+            tasks.append(_task(i, rng.choice(projects).id))
+    return projects, sections, tasks
+
+
+class FakeApi:
+    """ The `TodoistAPI` calls used by `modify`, served from memory."""
+
+    def __init__(self, objs):
+        self.tasks = {o.id: o for o in objs if isinstance(o, Task)}
+        self.updates = 0
+
+    def get_task(self, task_id):
+        return self.tasks[task_id]
+
+    def get_tasks(self, ids=None, project_id=None, section_id=None):
+        if ids is not None:
+            return [self.tasks[i] for i in ids]
+        return [t for t in self.tasks.values()
+                if (project_id is None or t.project_id == project_id) and
+                (section_id is None or t.section_id == section_id)]
+
+    def update_task(self, task_id, content=None):
+        self.updates += 1
+        return self.tasks[task_id]
+
+
+@pytest.fixture(scope="session")
+def workspace_2k():
+    projects, sections, tasks = synthetic_workspace(2000)
+    return projects + sections + tasks
+
+
+@pytest.fixture(scope="session")
+def cli():
+    """ The `tbdoist.tbdoist` CLI module, for benchmarks that build graphs.
+
+    Building graphs needs nxutils, so these benchmarks skip without it.
+    """
+    pytest.importorskip("nxutils")
+    from tbdoist import tbdoist
+    return tbdoist
@@ -0,0 +1,279 @@
+""" Stream todoist tasks out as Aeon Timeline CSV rows.
+
+`aeon_rows` turns tasks into dicts keyed by `AEON_COLUMNS`, the header
+of the Aeon export in `timeline/`. It normalizes due dates, durations
+and parent links as each task goes past. Only a map of id to label is
+kept, plus the children that arrive before their parent, which spill to
+a temporary file past a bound. Given task dependencies, the "Blocked by"
+and "Blocks" columns name the related rows by label. `write_aeon_csv`
+writes the rows as they are made.
+"""
+import csv
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from .ancestry import strip_header
+from .table import _getter, DURATION_UNITS
+
+
+__all__ = ["AEON_COLUMNS", "PRIORITY_NAMES", "aeon_rows", "write_aeon_csv"]
+
+
+AEON_COLUMNS = [
+    "Type", "Label", "Internal ID", "Compact Display", "Summary",
+    "Chronological Position", "Narrative Position", "Color", "Parent",
+    "Ongoing", "Start Date", "Latest Start Date", "Earliest End Date",
+    "End Date", "Duration", "Child Range", "Tags", "Blocked by", "Blocks",
+    "Constraints", "Links", "Image (Links only)", "Lead",
+    "Lead (Compact display)", "Assigned to", "Assigned to (Compact display)",
+    "Team", "Team (Compact display)", "Location",
+    "Location (Compact display)", "Relates to", "Relates to (Compact display)",
+    "Event", "Event (Compact display)", "gcal_id",
+    "gcal_id (Compact display)", "Status", "Priority"]
+
+# Todoist priority 4 is shown as p1 in the apps.
+PRIORITY_NAMES = {4: "Urgent", 3: "High", 2: "Medium", 1: ""}
+
+
+@lru_cache(maxsize=None)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def _due_start(due):
+    """ Return the due moment as a date or a datetime.
+
+    Datetimes with a timezone are given in that zone without tzinfo,
+    floating datetimes as written.
+    """
+    get = _getter(due)
+    dt = get("datetime")
+    if dt is None:
+        return date.fromisoformat(get("date"))
+    zone = get("timezone")
+    if dt.endswith("Z"):
+        dt = datetime.fromisoformat(dt[:-1]).replace(tzinfo=_zone("UTC"))
+        if zone:
+            dt = dt.astimezone(_zone(zone))
+        return dt.replace(tzinfo=None)
+    return datetime.fromisoformat(dt)
+
+
+def _duration(duration):
+    """ Return `(timedelta, text)` for a todoist duration."""
+    get = _getter(duration)
+    amount, unit = get("amount"), get("unit")
+    text = f"{amount} {unit}{'' if amount == 1 else 's'}"
+    return timedelta(minutes=amount * DURATION_UNITS[unit]), text
+
+
+def _format(moment):
+    if isinstance(moment, datetime):
+        return moment.strftime("%Y-%m-%d %H:%M")
+    return moment.isoformat()
+
+
+class _Held:
+    """ Rows waiting for their parent row.
+
+    Up to `limit` rows are kept in memory by parent id. Past that, rows
+    are appended to a temporary file and picked up by `drain` at the end.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.memory = {}
+        self.n = 0
+        self.file = None
+
+    def __bool__(self):
+        return self.n > 0 or self.file is not None
+
+    def add(self, parent_id, task_id, row):
+        if self.n < self.limit:
+            self.memory.setdefault(parent_id, []).append((task_id, row))
+            self.n += 1
+            return
+        if self.file is None:
+            self.file = tempfile.TemporaryFile("w+")
+        self.file.write(json.dumps([parent_id, task_id, row]) + "\n")
+
+    def pop(self, parent_id):
+        """ Return and forget the rows held in memory for `parent_id`."""
+        rows = self.memory.pop(parent_id, [])
+        self.n -= len(rows)
+        return rows
+
+    def drain(self):
+        """ Yield and forget every held `(parent_id, task_id, row)`.
+
+        Rows added while draining are held again, not yielded.
+        """
+        memory, f = self.memory, self.file
+        self.memory, self.n, self.file = {}, 0, None
+        for parent_id, rows in memory.items():
+            for task_id, row in rows:
+                yield parent_id, task_id, row
+        if f is not None:
+            f.seek(0)
+            for line in f:
+                yield tuple(json.loads(line))
+            f.close()
+
+
+def aeon_rows(tasks, projects=None, type_name="Task", max_waiting=10_000,
+              dependencies=()):
+    """ Yield one Aeon row dict per task.
+
+    Parameters:
+        tasks: iterable of todoist Tasks or REST API dicts.
+        projects: optional mapping of project id to Project, used for
+            the Color column.
+        type_name: value of the Type column.
+        max_waiting: number of rows kept in memory while they wait for
+            their parent. More are spilled to a temporary file.
+        dependencies: iterable of `(blocker_id, blocked_id)` pairs, as
+            given to `Schedule`, filling "Blocked by" and "Blocks".
+
+    A row is never yielded before its parent's, so the Parent column
+    always names a row Aeon has already read. A task whose parent has
+    not been seen yet is held back until the parent arrives, or until
+    the end. Tasks whose parent never arrives start a tree of their own
+    and have no Parent.
+
+    Dependencies name rows by label, one per line. A row related to a
+    task not seen yet waits, with the rows below it, until the end.
+    Tasks that never arrive are left out of the columns.
+    """
+    labels = {}
+    held = _Held(max_waiting)
+    blocked_by, blocks = {}, {}
+    for blocker, blocked in dependencies:
+        blocked_by.setdefault(blocked, []).append(blocker)
+        blocks.setdefault(blocker, []).append(blocked)
+    # Labels of the tasks named by dependencies, as soon as they are seen.
+    names = {}
+    waiting = _Held(max_waiting)
+
+    def row(get):
+        label = strip_header(get("content"))
+        if get("id") in blocked_by or get("id") in blocks:
+            names[get("id")] = label
+        r = dict.fromkeys(AEON_COLUMNS, "")
+        r.update({"Type": type_name,
+                  "Label": label,
+                  "Internal ID": get("id"),
+                  "Compact Display": label,
+                  "Summary": get("description") or "",
+                  "Ongoing": False,
+                  "Tags": "\n".join(get("labels") or ()),
+                  "Links": get("url") or "",
+                  "Status": "Completed" if get("is_completed") else "",
+                  "Priority": PRIORITY_NAMES.get(get("priority"), "")})
+        if projects is not None:
+            project = projects.get(get("project_id"))
+            r["Color"] = getattr(project, "color", "") or ""
+
+        due, duration = get("due"), get("duration")
+        if due is not None:
+            start = _due_start(due)
+            r["Start Date"] = _format(start)
+            if duration is not None:
+                delta, r["Duration"] = _duration(duration)
+                if not isinstance(start, datetime):
+                    start = datetime.combine(start, datetime.min.time())
+                r["End Date"] = _format(start + delta)
+            else:
+                r["End Date"] = r["Start Date"]
+        return r
+
+    def related(task_id, r, final):
+        # Fill the dependency columns, or return False to wait for labels.
+        refs = [(column, ids.get(task_id, ()))
+                for column, ids in [("Blocked by", blocked_by),
+                                    ("Blocks", blocks)]]
+        if not final and any(n not in names for _, ids in refs for n in ids):
+            return False
+        for column, ids in refs:
+            r[column] = "\n".join(names[n] for n in ids if n in names)
+        return True
+
+    def emit(task_id, r, parent_label, final=False):
+        # Yield the row, then the rows held in memory below it, depth
+        # first and in the order they arrived.
+        stack = [(task_id, r, parent_label)]
+        while stack:
+            task_id, r, parent_label = stack.pop()
+            if not related(task_id, r, final):
+                waiting.add(parent_label, task_id, r)
+                continue
+            r["Parent"] = parent_label or ""
+            labels[task_id] = r["Label"]
+            yield r
+            stack.extend((child, cr, r["Label"])
+                         for child, cr in reversed(held.pop(task_id)))
+
+    for task in tasks:
+        get = _getter(task)
+        parent_id = get("parent_id")
+        if parent_id is not None and parent_id not in labels:
+            held.add(parent_id, get("id"), row(get))
+            continue
+        yield from emit(get("id"), row(get), labels.get(parent_id))
+
+    # Every label there will be is known now. Rows that waited for one
+    # hang from rows already yielded.
+    for parent_label, task_id, r in waiting.drain():
+        yield from emit(task_id, r, parent_label, final=True)
+
+    # Rows spilled to disk, and rows whose parent never came. Each pass
+    # yields the rows whose parent has been yielded.
+    while held:
+        progress = False
+        for parent_id, task_id, r in held.drain():
+            if parent_id in labels:
+                progress = True
+                yield from emit(task_id, r, labels[parent_id], final=True)
+            else:
+                held.add(parent_id, task_id, r)
+        if progress:
+            continue
+        # What is left waits on parents that were not exported. Rows
+        # whose parent is not held either are the tops of those trees.
+        ids, parents = set(), set()
+        for parent_id, task_id, _ in _redrain(held):
+            ids.add(task_id)
+            parents.add(parent_id)
+        if parents <= ids:
+            # Only a parent cycle, which todoist does not allow, gets
+            # here. Cut it anywhere.
+            ids = set()
+        for parent_id, task_id, r in held.drain():
+            if parent_id in ids:
+                held.add(parent_id, task_id, r)
+            else:
+                yield from emit(task_id, r, None, final=True)
+
+
+def _redrain(held):
+    """ Yield everything `held` holds and keep holding it."""
+    for item in held.drain():
+        held.add(*item)
+        yield item
+
+
+def write_aeon_csv(tasks, file, projects=None, **kwargs):
+    """ Write `tasks` to the open text `file` as Aeon CSV.
+
+    Rows are written as they are produced. Returns the number of rows.
+    """
+    writer = csv.DictWriter(file, fieldnames=AEON_COLUMNS)
+    writer.writeheader()
+    n = 0
+    for r in aeon_rows(tasks, projects=projects, **kwargs):
+        writer.writerow(r)
+        n += 1
+    return n
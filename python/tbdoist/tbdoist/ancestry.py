@@ -0,0 +1,269 @@
+""" Ancestor index over the todoist object tree.
+
+Todoist objects only know their direct parent through `parent_id`,
+`section_id` and `project_id`. Walking up that chain through the API costs
+one request per level. `AncestorIndex` is built once from objects that are
+already loaded and answers ancestry questions without touching the API.
+"""
+import re
+from todoist_api_python.models import Task, Project, Section
+
+
+__all__ = ["AncestorIndex", "tree_parent_id", "task_link",
+           "strip_header"]
+
+
+DIVIDER = " :: "
+
+# The end of a supertask link, after its title.
+_LINK_END_RE = re.compile(r"`\]\([^)\s]*\)")
+
+
+def _header_end(content):
+    """ Return where the leading supertask link and divider end, or 0.
+
+    Titles written by `task_link` escape backticks and backslashes.
+    Older links held the parent's content as it was, header and all, so
+    links nest; they are matched by counting opening and closing marks.
+    """
+    if not content.startswith("[`"):
+        return 0
+    depth = 0
+    i = 0
+    while i < len(content):
+        if content[i] == "\\":
+            i += 2
+        elif content.startswith("[`", i):
+            depth += 1
+            i += 2
+        elif (m := _LINK_END_RE.match(content, i)) is not None:
+            depth -= 1
+            i = m.end()
+            if depth == 0:
+                if content.startswith(DIVIDER, i):
+                    return i + len(DIVIDER)
+                return 0
+        else:
+            i += 1
+    return 0
+
+
+def strip_header(content):
+    """ Return `content` without any leading supertask headers."""
+    while end := _header_end(content):
+        content = content[end:]
+    return content
+
+
+def tree_parent_id(obj):
+    """ Return the id of the object `obj` hangs from in the tree view.
+
+    This mirrors `td_g_filter_factory`: subtasks hang from their task,
+    tasks in a section hang from the section, other tasks from the project.
+    Sections hang from their project and projects from their parent project.
+    """
+    if isinstance(obj, Task):
+        if obj.parent_id is not None:
+            return obj.parent_id
+        if obj.section_id is not None:
+            return obj.section_id
+        return obj.project_id
+    if isinstance(obj, Section):
+        return obj.project_id
+    if isinstance(obj, Project):
+        return obj.parent_id
+    return getattr(obj, "parent_id", None)
+
+
+def task_link(obj):
+    """ Return the markdown link used as a supertask header for `obj`.
+
+    The task's own header is left out so breadcrumbs do not nest.
+    Returns `None` for objects that are not tasks.
+    """
+    if not isinstance(obj, Task):
+        return None
+    title = strip_header(obj.content).replace("\\", "\\\\").replace(
+        "`", "\\`")
+    return f"[`{title}`]({obj.url})"
+
+
+class AncestorIndex:
+    """ Parent pointers plus an Euler tour of a forest of ids.
+
+    Parameters:
+        parents: mapping of node id to parent id. A parent of `None`, or a
+            parent that is not itself a key, makes the node a root.
+        objs: optional mapping of node id to the todoist object.
+
+    `path_to_root` is memoized so every node's path is built from its
+    parent's. The preorder numbering makes `is_ancestor` O(1) and
+    `descendants` a slice of the preorder list.
+    """
+
+    def __init__(self, parents, objs=None):
+        self.objs = {} if objs is None else dict(objs)
+        self._parent = {}
+        self._children = {n: [] for n in parents}
+        self.roots = []
+        for n, p in parents.items():
+            if p is None or p not in self._children:
+                self._parent[n] = None
+                self.roots.append(n)
+            else:
+                self._parent[n] = p
+                self._children[p].append(n)
+
+        self._order = []
+        self._tin = {}
+        self._tout = {}
+        self._depth = {}
+        for root in self.roots:
+            self._tour(root)
+        # Anything unvisited sits on a parent cycle. Treat it as a root
+        # rather than looping forever.
+        for n in self._children:
+            if n not in self._tin:
+                self._parent[n] = None
+                self.roots.append(n)
+                self._tour(n)
+
+        self._paths = {}
+        self._heads = None
+
+    def _tour(self, root):
+        self._depth[root] = 0
+        stack = [(root, iter(self._children[root]))]
+        self._tin[root] = len(self._order)
+        self._order.append(root)
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in self._tin:
+                    continue
+                self._depth[child] = self._depth[node] + 1
+                self._tin[child] = len(self._order)
+                self._order.append(child)
+                stack.append((child, iter(self._children[child])))
+                break
+            else:
+                self._tout[node] = len(self._order)
+                stack.pop()
+
+    @classmethod
+    def from_objects(cls, objs, parent_func=tree_parent_id):
+        """ Build from an iterable of todoist objects."""
+        objs = {obj.id: obj for obj in objs}
+        parents = {n: parent_func(obj) for n, obj in objs.items()}
+        return cls(parents, objs=objs)
+
+    @classmethod
+    def from_graph(cls, g, parent_func=tree_parent_id):
+        """ Build from a graph made by `td_iter_to_graph`.
+
+        Nodes without an `"obj"` attribute are skipped.
+        """
+        objs = [d["obj"] for _, d in g.nodes(data=True) if "obj" in d]
+        return cls.from_objects(objs, parent_func=parent_func)
+
+    def __contains__(self, n):
+        return n in self._parent
+
+    def __len__(self):
+        return len(self._parent)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def parent(self, n):
+        return self._parent[n]
+
+    def children(self, n):
+        return list(self._children[n])
+
+    def depth(self, n):
+        return self._depth[n]
+
+    def path_to_root(self, n):
+        """ Return a tuple of ids from `n` up to its root, inclusive."""
+        try:
+            return self._paths[n]
+        except KeyError:
+            pass
+
+        # Climb to the nearest cached path, then fill in on the way down.
+        climb = []
+        node = n
+        while node is not None and node not in self._paths:
+            climb.append(node)
+            node = self._parent[node]
+        path = () if node is None else self._paths[node]
+        for node in reversed(climb):
+            path = (node,) + path
+            self._paths[node] = path
+        return path
+
+    def ancestors(self, n):
+        """ Return ids of the ancestors of `n`, nearest first."""
+        return self.path_to_root(n)[1:]
+
+    def is_ancestor(self, a, b):
+        """ Return True if `a` is `b` or an ancestor of `b`."""
+        return self._tin[a] <= self._tin[b] < self._tout[a]
+
+    def lca(self, a, b):
+        """ Return the lowest common ancestor of `a` and `b` or `None`."""
+        da, db = self._depth[a], self._depth[b]
+        while da > db:
+            a = self._parent[a]
+            da -= 1
+        while db > da:
+            b = self._parent[b]
+            db -= 1
+        while a != b:
+            a = self._parent[a]
+            b = self._parent[b]
+            if a is None or b is None:
+                return None
+        return a
+
+    def descendants(self, n):
+        """ Return ids of all descendants of `n` in preorder."""
+        return self._order[self._tin[n] + 1:self._tout[n]]
+
+    def headers(self, label_func=None, divider=DIVIDER):
+        """ Return a dict of node id to breadcrumb string for every node.
+
+        The breadcrumb joins the labels of the unbroken run of labelled
+        ancestors, root first. `label_func` gets the object (or the id if
+        no object is stored) and returns a string or `None`; a `None`
+        label ends the run. Nodes without a labelled parent map to `None`.
+
+        Labels are computed once per node in a single preorder pass.
+        """
+        if label_func is None:
+            label_func = task_link
+        heads = {}
+        labels = {}
+        for n in self._order:
+            p = self._parent[n]
+            if p is None:
+                heads[n] = None
+                continue
+            try:
+                lp = labels[p]
+            except KeyError:
+                lp = labels[p] = label_func(self.objs.get(p, p))
+            if lp is None:
+                heads[n] = None
+            elif heads[p] is None:
+                heads[n] = lp
+            else:
+                heads[n] = divider.join([heads[p], lp])
+        return heads
+
+    def header(self, n):
+        """ Return the default supertask header for `n`, see `headers`."""
+        if self._heads is None:
+            self._heads = self.headers()
+        return self._heads[n]
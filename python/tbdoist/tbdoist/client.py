@@ -0,0 +1,275 @@
+""" Concurrent access to the Todoist REST API.
+
+`TodoistAPI` is synchronous and every getter is its own round trip.
+`AsyncTodoistClient` runs the same calls from asyncio on a pooled
+keep-alive `requests.Session`, so independent requests overlap, and
+meters every call through one `RateLimiter` shared with any other
+code that talks to the API. `TodoistSyncClient` speaks the Sync API,
+which returns only what changed since a sync token and takes writes in
+batches of commands.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from functools import lru_cache, partial
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from todoist_api_python.api import TodoistAPI
+
+
+__all__ = ["REQUEST_LIMIT", "SYNC_URL", "RateLimiter", "shared_limiter",
+           "pooled_session", "AsyncTodoistClient", "TodoistSyncClient"]
+
+
+REQUEST_LIMIT = 450 / (15 * 60)  # 450 requests per 15 minutes.
+SYNC_URL = "https://api.todoist.com/sync/v9/sync"
+# The Sync API refuses more commands than this in one request.
+SYNC_BATCH = 100
+
+
+class RateLimiter:
+    """ Token bucket shared by threads and coroutines.
+
+    Parameters:
+        rate: tokens added per second. Default is `REQUEST_LIMIT`.
+        burst: bucket size, the number of calls allowed back to back.
+            Default is the full 15 minute budget.
+    """
+
+    def __init__(self, rate=REQUEST_LIMIT, burst=450):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """ Take a token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        time.sleep(self._reserve())
+
+    async def acquire_async(self):
+        await asyncio.sleep(self._reserve())
+
+
+@lru_cache(maxsize=None)
+def shared_limiter():
+    """ Return the process wide `RateLimiter` used when none is given.
+
+    The request limit is per account, so every client and worker pool in
+    a process draws from this one bucket unless given its own.
+    """
+    return RateLimiter()
+
+
+def pooled_session(max_connections=10, retries=3):
+    """ Return a keep-alive `requests.Session` with a connection pool.
+
+    Idempotent requests are retried with backoff on 429 and 5xx responses.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5,
+                  status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=max_connections,
+                          pool_maxsize=max_connections,
+                          max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class AsyncTodoistClient:
+    """ Awaitable versions of the `TodoistAPI` methods.
+
+    Any `TodoistAPI` method can be awaited on the client, e.g.
+    `await client.get_tasks(project_id=...)`. At most `max_connections`
+    requests are in flight at once and every request takes a token from
+    `limiter`.
+
+    Parameters:
+        token: Todoist API token.
+        max_connections: size of the connection pool and of the number
+            of concurrent requests.
+        limiter: a `RateLimiter`. Default is `shared_limiter()`.
+        session: a `requests.Session`. A pooled one is created if not given.
+        trace: a `tracing.RequestTrace` to record every API call in.
+    """
+
+    def __init__(self, token, max_connections=10, limiter=None,
+                 session=None, trace=None):
+        if session is None:
+            session = pooled_session(max_connections)
+        if limiter is None:
+            limiter = shared_limiter()
+        self.session = session
+        self.limiter = limiter
+        self.api = TodoistAPI(token, session=session)
+        if trace is not None:
+            trace.watch(session)
+            self.api = trace.wrap(self.api)
+        self.max_connections = max_connections
+        self._semaphores = {}
+
+    def _semaphore(self):
+        # Semaphores belong to one event loop and `load` starts a new one
+        # each time.
+        loop = asyncio.get_running_loop()
+        try:
+            return self._semaphores[loop]
+        except KeyError:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_connections)}
+            return self._semaphores[loop]
+
+    async def call(self, name, *args, **kwargs):
+        """ Await `TodoistAPI.<name>(*args, **kwargs)` in a worker thread."""
+        method = getattr(self.api, name)
+        async with self._semaphore():
+            await self.limiter.acquire_async()
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+    def __getattr__(self, name):
+        api = self.__dict__.get("api")
+        if name.startswith("_") or not callable(getattr(api, name, None)):
+            raise AttributeError(name)
+        return partial(self.call, name)
+
+    async def load_workspace(self, comments=False):
+        """ Fetch projects, sections, tasks and labels concurrently.
+
+        If `comments` is True, comments on every task and project with a
+        nonzero `comment_count` are fetched concurrently afterwards.
+
+        Returns:
+            dict with keys "projects", "sections", "tasks", "labels" and,
+            if requested, "comments", each a list of todoist objects.
+        """
+        projects, sections, tasks, labels = await asyncio.gather(
+            self.call("get_projects"),
+            self.call("get_sections"),
+            self.call("get_tasks"),
+            self.call("get_labels"))
+        result = {"projects": projects,
+                  "sections": sections,
+                  "tasks": tasks,
+                  "labels": labels}
+
+        if comments:
+            calls = [self.call("get_comments", task_id=t.id)
+                     for t in tasks if t.comment_count]
+            calls += [self.call("get_comments", project_id=p.id)
+                      for p in projects if p.comment_count]
+            result["comments"] = [c for batch in await asyncio.gather(*calls)
+                                  for c in batch]
+        return result
+
+    def load(self, comments=False):
+        """ Synchronous wrapper around `load_workspace`."""
+        return asyncio.run(self.load_workspace(comments=comments))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TodoistSyncClient:
+    """ Incremental reads and batched writes through the Todoist Sync API.
+
+    `pull` returns only the resources changed since the last call, so a
+    repeated pull of an unchanged workspace is one small request. `push`
+    sends commands `SYNC_BATCH` at a time.
+
+    Parameters:
+        token: Todoist API token.
+        sync_token: token from an earlier run, or "*" for a full sync.
+        url: Sync API endpoint, e.g. a local fake server in tests.
+        limiter: a `RateLimiter`. Default is `shared_limiter()`.
+        session: a `requests.Session`. A pooled one is created if not given.
+        trace: a `tracing.RequestTrace` to record every request in.
+    """
+
+    def __init__(self, token, sync_token="*", url=SYNC_URL, limiter=None,
+                 session=None, trace=None):
+        if session is None:
+            session = pooled_session()
+        if limiter is None:
+            limiter = shared_limiter()
+        if trace is not None:
+            trace.watch(session)
+        self.session = session
+        self.limiter = limiter
+        self.trace = trace
+        self.url = url
+        self.sync_token = sync_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _post(self, data, name="sync"):
+        self.limiter.acquire()
+        with nullcontext() if self.trace is None else self.trace.call(name):
+            response = self.session.post(self.url, data=data,
+                                         headers=self.headers)
+            response.raise_for_status()
+        return response.json()
+
+    def pull(self, resource_types=("items", "projects")):
+        """ Return the Sync API response for changes since `sync_token`.
+
+        The response has a list per resource type and "full_sync", True
+        when everything was sent. `sync_token` is advanced.
+        """
+        result = self._post({"sync_token": self.sync_token,
+                             "resource_types": json.dumps(
+                                 list(resource_types))}, "sync.pull")
+        self.sync_token = result["sync_token"]
+        return result
+
+    @staticmethod
+    def command(type_, args, temp_id=None):
+        """ Return a Sync API command dict with a fresh uuid."""
+        cmd = {"type": type_, "uuid": str(uuid.uuid4()), "args": args}
+        if temp_id is not None:
+            cmd["temp_id"] = temp_id
+        return cmd
+
+    def push(self, commands):
+        """ Send `commands` in batches.
+
+        Returns:
+            `(temp_id_mapping, errors)`, the real id of every created
+            object by temp id, and a dict of command uuid to the error
+            for commands the server refused.
+        """
+        mapping = {}
+        errors = {}
+        commands = list(commands)
+        for start in range(0, len(commands), SYNC_BATCH):
+            batch = commands[start:start + SYNC_BATCH]
+            result = self._post({"commands": json.dumps(batch)},
+                                "sync.push")
+            mapping.update(result.get("temp_id_mapping", {}))
+            for key, status in result.get("sync_status", {}).items():
+                if status != "ok":
+                    errors[key] = status
+        return mapping, errors
+
+    def close(self):
+        self.session.close()
@@ -1,12 +1,13 @@
 from requests.exceptions import HTTPError
-from .tbdoist import TYPE_MAP
-import pytest
+from .ancestry import AncestorIndex, DIVIDER, strip_header, task_link
+from .relink import relink_diff, apply_relinks
+from .tracing import traced
 
 
 __all__ = ["manage_supertask_links", "manage_supertask_link"]
 
 
-def manage_supertask_link(tdapi, task, update=True):
+def manage_supertask_link(tdapi, task, update=True, index=None):
     """ Add, remove, or update supertask link on task.
 
     Parameters:
@@ -16,6 +17,9 @@ def manage_supertask_link(tdapi, task, update=True):
             Default is `True`. If `False` return a dict with
             "content" key and value suitable for use in
             Todoist API.
+        index: An `AncestorIndex` holding the task. If given, the
+            header is the full supertask breadcrumb from the index and
+            no API calls are made to find parents.
 
     Returns:
         Task object if successful update or `None` if not update neede.
@@ -23,8 +27,6 @@ def manage_supertask_link(tdapi, task, update=True):
         `{id: task.id, "content": newcontent}`
 
     """
-    divider = " :: "
-
     # Allow task or task.id as parameter, get original content.
     try:
         oc = task.content
@@ -33,26 +35,28 @@ def manage_supertask_link(tdapi, task, update=True):
         oc = task.content
 
     # Set head if task has a parent.
-    try:
-        parent = tdapi.get_task(task.parent_id)
-        head = f"[`{parent.content}`]({parent.url})"
-    except (AttributeError, HTTPError):
+    parent_id = getattr(task, "parent_id", None)
+    if (index is not None and task.id in index and
+            (parent_id is None or parent_id in index)):
+        head = index.header(task.id)
+    elif parent_id is None:
         head = None
-
-    # Determine new content if task has parent.
-    if head is not None:
-        if oc.startswith(head):
-            newc = None
-        else:
-            newc = divider.join([head, oc])
-
-    # Check if header needs to be removed from oc if task
-    # no longer has a parent.
+    else:
+        try:
+            parent = tdapi.get_task(task.parent_id)
+            head = task_link(parent)
+        except (AttributeError, HTTPError):
+            head = None
+
+    # Rebuild content from the bare text so a stale or partial header
+    # is replaced rather than stacked.
+    base = strip_header(oc)
     if head is None:
-        if divider not in oc:
-            newc = None
-        else:
-            newc = oc.split(divider)[1]
+        newc = base
+    else:
+        newc = DIVIDER.join([head, base])
+    if newc == oc:
+        newc = None
 
     # Update or create result dict.
     if newc is not None:
@@ -65,17 +69,73 @@ def manage_supertask_link(tdapi, task, update=True):
     return result
 
 
-def _path_to_root(tdapi, obj):
-    # TODO: writh _path_to_root
-    raise NotImplementedError
+def _path_to_root(tdapi, obj, index=None):
+    """ Return a list of task objects from `obj` up to its root task.
+
+    With an `AncestorIndex` this costs no API calls. Without one, each
+    level is fetched with `get_task`.
+    """
+    try:
+        obj_id = obj.id
+    except AttributeError:
+        obj_id = obj
+        obj = None
+
+    if index is not None and obj_id in index:
+        path = [index.objs.get(n, n) for n in index.path_to_root(obj_id)]
+        # Stop at the first object that is not a task.
+        result = []
+        for ele in path:
+            if not hasattr(ele, "content"):
+                break
+            result.append(ele)
+        return result
+
+    if obj is None:
+        obj = tdapi.get_task(obj_id)
+    result = [obj]
+    while getattr(obj, "parent_id", None) is not None:
+        obj = tdapi.get_task(obj.parent_id)
+        result.append(obj)
+    return result
 
 
 def _obj_parents_string(tdapi, obj, g=None):
-    # TODO: Write this to buld the string from a path.
-    raise NotImplementedError
+    """ Return the supertask breadcrumb for `obj` or `None` if it has none.
+
+    `g` may be an `AncestorIndex` or a graph from `td_iter_to_graph`.
+    """
+    if g is not None and not isinstance(g, AncestorIndex):
+        g = AncestorIndex.from_graph(g)
+    path = _path_to_root(tdapi, obj, index=g)
+    if len(path) < 2:
+        return None
+    return DIVIDER.join(task_link(p) for p in reversed(path[1:]))
 
 
+@traced()
 def manage_supertask_links(tdapi, *args, **kwargs):
+    """ Add, remove, or update supertask links on many tasks.
+
+    Tasks are selected by a list of tasks or ids as the first argument or
+    `tasks` keyword, or else by `get_tasks` keyword filters.
+
+    Keywords:
+        update: If `False` return the list of results from
+            `manage_supertask_link` without changing anything.
+        index: An `AncestorIndex` to take headers from.
+        max_workers, limiter, checkpoint: passed to `apply_relinks`.
+
+    Returns:
+        A list with the result of `manage_supertask_link` per task: the
+        updated task or `None` if it needed no change, or with
+        update=False a `{id, content}` dict or `None`. Use
+        `relink_diff` and `apply_relinks` for the run summary.
+
+    Raises:
+        The first error from `update_task`, after the other changes have
+        been sent.
+    """
     # If first arg is set it may be ids or tasks.
     if len(args) > 0:
         tasksarg = args[0]
@@ -109,15 +169,29 @@ def manage_supertask_links(tdapi, *args, **kwargs):
         except IndexError:
             update = True
 
-    results = []
+    index = kwargs.pop("index", None)
+    apply_kwargs = {k: kwargs.pop(k) for k in ["max_workers", "limiter",
+                                               "checkpoint"] if k in kwargs}
+
     try:
         tasks = tdapi.get_tasks(*args, ids=ids, **kwargs)
     except NameError:
         tasks = tdapi.get_tasks(*args, **kwargs)
-    for task in tasks:
-        result = manage_supertask_link(tdapi, task, update=update)
-        results.append(result)
-    return results
+        # Subtasks share their parent's project and section, so with
+        # only those filters every parent is in this batch.
+        if index is None and not args and set(kwargs) <= {"project_id",
+                                                          "section_id"}:
+            index = AncestorIndex.from_objects(tasks)
+    if update:
+        # Work out every change first, then send them concurrently.
+        changes = relink_diff(tdapi, tasks, index=index)
+        summary = apply_relinks(tdapi, changes, **apply_kwargs)
+        if summary["failed"]:
+            raise summary["failed"][0][1]
+        return [summary["results"].get(task.id) for task in tasks]
+
+    return [manage_supertask_link(tdapi, task, update=False, index=index)
+            for task in tasks]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+""" Select rows of a `TaskTable` with vectorized predicates.
+
+A `Query` is a set of predicates that must all hold. Each predicate is
+compiled to a boolean mask over whole columns. Labels go through an
+inverted index built once per table, so classifying a large workspace
+costs a handful of array operations instead of a Python call per task.
+
+    >>> q = Query(project=["123"], priority=4, due_before="2024-06-01")
+    >>> ids = table.take(q.mask(table))
+"""
+import numpy as np
+
+
+__all__ = ["Query", "label_index"]
+
+
+def _as_list(value):
+    if isinstance(value, (str, bytes)) or not hasattr(value, "__iter__"):
+        return [value]
+    return list(value)
+
+
+def label_index(table):
+    """ Return a dict of label code to the sorted rows carrying it.
+
+    The index is cached on the table.
+    """
+    try:
+        return table.__dict__["_label_index"]
+    except KeyError:
+        pass
+    counts = np.diff(table.label_offsets)
+    rows = np.repeat(np.arange(len(table), dtype=np.int64), counts)
+    codes = table.label_codes
+    order = np.argsort(codes, kind="stable")
+    codes, rows = codes[order], rows[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) \
+        if len(codes) else np.array([], dtype=np.int64)
+    stops = np.r_[starts[1:], len(codes)]
+    index = {int(codes[a]): rows[a:b] for a, b in zip(starts, stops)}
+    table.__dict__["_label_index"] = index
+    return index
+
+
+class Query:
+    """ Conjunction of predicates over a `TaskTable`.
+
+    Keywords (all optional, a list means any of):
+        project: project id(s).
+        section: section id(s).
+        label: label name(s); a task matches if it has any of them.
+        priority: priority value(s), 1 to 4.
+        due_after, due_before: inclusive bounds on the due date, as
+            dates or ISO strings. Tasks without a due date never match.
+        completed: True or False.
+        has_parent: True for subtasks, False for top level tasks.
+    """
+
+    KEYS = ["project", "section", "label", "priority", "due_after",
+            "due_before", "completed", "has_parent"]
+
+    def __init__(self, **predicates):
+        for key in predicates:
+            if key not in self.KEYS:
+                raise TypeError(f"{key} not one of {self.KEYS}.")
+        self.predicates = {k: v for k, v in predicates.items()
+                           if v is not None}
+
+    def __and__(self, other):
+        both = dict(self.predicates)
+        for k, v in other.predicates.items():
+            if k in both:
+                raise ValueError(f"Both queries set {k}.")
+            both[k] = v
+        return Query(**both)
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={v!r}" for k, v in self.predicates.items())
+        return f"Query({args})"
+
+    def mask(self, table):
+        """ Return a boolean array, True for rows matching every predicate."""
+        mask = np.ones(len(table), dtype=bool)
+        for key, value in self.predicates.items():
+            mask &= getattr(self, f"_{key}")(table, value)
+        return mask
+
+    def rows(self, table):
+        """ Return the matching row numbers."""
+        return np.flatnonzero(self.mask(table))
+
+    def ids(self, table):
+        """ Return the matching task ids."""
+        return table.take(self.mask(table))
+
+    @staticmethod
+    def _codes(interner, values):
+        return [interner.codes[v] if v is not None else -1
+                for v in _as_list(values) if v is None or v in interner]
+
+    def _project(self, table, value):
+        return np.isin(table.project,
+                       self._codes(table.interned["project"], value))
+
+    def _section(self, table, value):
+        return np.isin(table.section,
+                       self._codes(table.interned["section"], value))
+
+    def _label(self, table, value):
+        index = label_index(table)
+        mask = np.zeros(len(table), dtype=bool)
+        for code in self._codes(table.interned["label"], value):
+            mask[index.get(code, [])] = True
+        return mask
+
+    def _priority(self, table, value):
+        return np.isin(table.priority, _as_list(value))
+
+    def _due_after(self, table, value):
+        return table.due_date >= np.datetime64(value, "D")
+
+    def _due_before(self, table, value):
+        return table.due_date <= np.datetime64(value, "D")
+
+    def _completed(self, table, value):
+        return table.is_completed == bool(value)
+
+    def _has_parent(self, table, value):
+        return table.has_parent == bool(value)
@@ -0,0 +1,150 @@
+""" Apply supertask header changes in bulk.
+
+Relinking is split in two. `relink_diff` works out every content change
+without writing anything. `apply_relinks` then sends the changes from a
+bounded pool of worker threads. Every worker takes a token from a shared
+`RateLimiter` first. Finished changes are appended to a `Checkpoint`
+file, so an interrupted run picks up where it stopped.
+"""
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import shared_limiter
+from .tracing import traced
+
+
+__all__ = ["Checkpoint", "relink_diff", "apply_relinks"]
+
+
+class Checkpoint:
+    """ Append-only record of changes that have been applied.
+
+    Each line of the file is a `{"id", "content"}` change. A change is done
+    only if both match, so a task whose target header changed since the
+    last run is updated again.
+
+    Parameters:
+        path: file to read and append to. It is created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._done = set()
+        self._lock = threading.Lock()
+        line = "\n"
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A run killed mid-write leaves a partial last line.
+                        continue
+                    self._done.add((change["id"], change["content"]))
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a")
+        if not line.endswith("\n"):
+            # Start after a partial line rather than on the end of it.
+            self._file.write("\n")
+
+    def __contains__(self, change):
+        return (change["id"], change["content"]) in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def mark(self, change):
+        line = json.dumps({"id": change["id"], "content": change["content"]})
+        with self._lock:
+            self._done.add((change["id"], change["content"]))
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def remove(self):
+        """ Close and delete the file once a run has finished."""
+        self.close()
+        os.remove(self.path)
+
+
+@traced()
+def relink_diff(tdapi, tasks, index=None):
+    """ Return the `{"id", "content"}` changes needed for `tasks`.
+
+    Nothing is written. With an `AncestorIndex` that holds every parent
+    no requests are made.
+    """
+    from .modify import manage_supertask_link
+
+    changes = []
+    for task in tasks:
+        change = manage_supertask_link(tdapi, task, update=False, index=index)
+        if change is not None:
+            changes.append(change)
+    return changes
+
+
+@traced()
+def apply_relinks(tdapi, changes, max_workers=4, limiter=None,
+                  checkpoint=None):
+    """ Send `changes` with `update_task` from a pool of threads.
+
+    Parameters:
+        tdapi: A TodoistAPI instance. Its session is shared by the workers.
+        changes: list of `{"id", "content"}` dicts from `relink_diff`.
+        max_workers: number of requests in flight at once.
+        limiter: a `RateLimiter`. Default is `client.shared_limiter()`,
+            the one the clients use.
+        checkpoint: a `Checkpoint` or a path for one. Changes already in it
+            are skipped and applied changes are added to it.
+
+    Returns:
+        dict with "total", "applied" and "skipped" counts, a list of
+        `(id, error)` tuples under "failed", and the `update_task` result
+        of every applied change by id under "results".
+    """
+    if limiter is None:
+        limiter = shared_limiter()
+    own_checkpoint = isinstance(checkpoint, (str, os.PathLike))
+    if own_checkpoint:
+        checkpoint = Checkpoint(checkpoint)
+
+    todo = [c for c in changes if checkpoint is None or c not in checkpoint]
+    summary = {"total": len(changes),
+               "applied": 0,
+               "skipped": len(changes) - len(todo),
+               "failed": [],
+               "results": {}}
+
+    def apply(change):
+        limiter.acquire()
+        result = tdapi.update_task(change["id"], content=change["content"])
+        if checkpoint is not None:
+            checkpoint.mark(change)
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Each change runs in a copy of this context, so its request is
+        # traced under the scope that called us.
+        futures = [(c, pool.submit(contextvars.copy_context().run, apply, c))
+                   for c in todo]
+        for change, future in futures:
+            try:
+                summary["results"][change["id"]] = future.result()
+            except Exception as e:
+                summary["failed"].append((change["id"], e))
+            else:
+                summary["applied"] += 1
+    finally:
+        # On interrupt drop queued changes; the checkpoint has the rest.
+        pool.shutdown(cancel_futures=True)
+        if own_checkpoint:
+            checkpoint.close()
+    return summary
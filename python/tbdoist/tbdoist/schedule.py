@@ -0,0 +1,317 @@
+""" Critical path scheduling over task dependencies.
+
+A `Schedule` holds the dependency DAG as CSR arrays of node numbers.
+Nodes are grouped into topological levels. The forward pass (earliest
+start/finish) and backward pass (latest start/finish) each make one
+vectorized sweep per level, O(V + E) overall.
+
+Changing one duration or one dependency only re-propagates through the
+nodes whose times can change, walking per-node sets of neighbours in
+topological position order. A new dependency that goes against that
+order moves only the nodes between its two ends (Pearce and Kelly's
+dynamic topological sort). The CSR arrays and levels are rebuilt from
+the edges on the next full `recompute`.
+
+Times are minutes from the start of the plan. A dependency `(a, b)`
+means `b` is blocked by `a`, like Aeon's "Blocked by" column.
+"""
+import heapq
+
+import numpy as np
+
+from .table import _getter, DURATION_UNITS
+
+
+__all__ = ["Schedule"]
+
+
+def _csr(src, dst, n):
+    """ Return `(indptr, indices)` listing `dst` for each `src`."""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(indptr, src + 1, 1)
+    return np.cumsum(indptr), dst[order]
+
+
+def _gather(indptr, indices, nodes):
+    """ Return the concatenated CSR rows of `nodes` without a Python loop."""
+    starts, lengths = indptr[nodes], indptr[nodes + 1] - indptr[nodes]
+    offsets = np.cumsum(lengths) - lengths
+    idx = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+    return indices[idx]
+
+
+class Schedule:
+    """ Earliest/latest start, slack and critical path of a task DAG.
+
+    Parameters:
+        ids: sequence of task ids.
+        durations: sequence of durations in minutes, NaN counts as 0.
+        dependencies: iterable of `(blocker_id, blocked_id)` pairs.
+
+    Attributes after construction, indexed like `ids`:
+        es, ef, ls, lf, slack: float64 arrays of minutes.
+        end: finish time of the whole plan.
+    """
+
+    def __init__(self, ids, durations, dependencies=()):
+        self.ids = list(ids)
+        self.node = {tid: i for i, tid in enumerate(self.ids)}
+        self.duration = np.nan_to_num(np.array(durations, dtype=np.float64))
+        pairs = [(self.node[a], self.node[b]) for a, b in dependencies]
+        self._edges = set(pairs)
+        self._succs = [set() for _ in self.ids]
+        self._preds = [set() for _ in self.ids]
+        for a, b in self._edges:
+            self._succs[a].add(b)
+            self._preds[b].add(a)
+        self._build()
+        self.recompute()
+
+    @classmethod
+    def from_tasks(cls, tasks, dependencies=(), default_duration=0):
+        """ Build from todoist Tasks or API dicts, using their `duration`."""
+        ids, durations = [], []
+        for task in tasks:
+            get = _getter(task)
+            ids.append(get("id"))
+            duration = get("duration")
+            if duration is None:
+                durations.append(default_duration)
+            else:
+                dget = _getter(duration)
+                durations.append(dget("amount") *
+                                 DURATION_UNITS[dget("unit")])
+        return cls(ids, durations, dependencies)
+
+    @classmethod
+    def from_table(cls, table, dependencies=(), default_duration=0):
+        """ Build from a `TaskTable`, using its `duration` column."""
+        durations = np.where(np.isnan(table.duration), default_duration,
+                             table.duration)
+        return cls(table.id, durations, dependencies)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Structure.
+
+    def _build(self):
+        n = len(self.ids)
+        if self._edges:
+            src, dst = np.array(sorted(self._edges), dtype=np.int64).T
+        else:
+            src = dst = np.array([], dtype=np.int64)
+        self.src, self.dst = src, dst
+        self.succ_ptr, self.succ = _csr(src, dst, n)
+        self.pred_ptr, self.pred = _csr(dst, src, n)
+        self._levels()
+        self._stale = False
+
+    def _levels(self):
+        """ Assign topological levels with Kahn's algorithm by whole levels."""
+        n = len(self.ids)
+        indegree = np.diff(self.pred_ptr).copy()
+        level = np.full(n, -1, dtype=np.int64)
+        current = np.flatnonzero(indegree == 0)
+        depth = 0
+        seen = 0
+        while len(current):
+            level[current] = depth
+            seen += len(current)
+            targets = _gather(self.succ_ptr, self.succ, current)
+            np.subtract.at(indegree, targets, 1)
+            current = np.unique(targets[indegree[targets] == 0])
+            depth += 1
+        if seen < n:
+            cycle = [self.ids[i] for i in np.flatnonzero(level < 0)]
+            raise ValueError(f"Dependencies contain a cycle among {cycle}.")
+        self.level = level
+        self.nlevels = depth
+        # Topological position, used to order incremental updates.
+        self.order = np.argsort(level, kind="stable")
+        self.pos = np.empty(n, dtype=np.int64)
+        self.pos[self.order] = np.arange(n)
+        # Edges grouped by the level of their target, and of their source.
+        self._in_by_level = np.split(np.argsort(level[self.dst],
+                                                kind="stable"),
+                                     np.searchsorted(
+                                         np.sort(level[self.dst]),
+                                         np.arange(1, depth)))
+        self._out_by_level = np.split(np.argsort(level[self.src],
+                                                 kind="stable"),
+                                      np.searchsorted(
+                                          np.sort(level[self.src]),
+                                          np.arange(1, depth)))
+        self._nodes_by_level = np.split(self.order,
+                                        np.searchsorted(level[self.order],
+                                                        np.arange(1, depth)))
+
+    # Full passes.
+
+    def recompute(self):
+        """ Run the forward and backward passes over every node."""
+        if self._stale:
+            self._build()
+        n = len(self.ids)
+        self.es = np.zeros(n)
+        self.ef = np.zeros(n)
+        for nodes, edges in zip(self._nodes_by_level, self._in_by_level):
+            np.maximum.at(self.es, self.dst[edges], self.ef[self.src[edges]])
+            self.ef[nodes] = self.es[nodes] + self.duration[nodes]
+        self.end = self.ef.max() if n else 0.0
+        self._backward()
+
+    def _backward(self):
+        n = len(self.ids)
+        self.lf = np.full(n, self.end)
+        self.ls = np.zeros(n)
+        for nodes, edges in zip(reversed(self._nodes_by_level),
+                                reversed(self._out_by_level)):
+            np.minimum.at(self.lf, self.src[edges], self.ls[self.dst[edges]])
+            self.ls[nodes] = self.lf[nodes] - self.duration[nodes]
+        self.slack = self.ls - self.es
+
+    # Incremental updates.
+
+    def _forward_from(self, starts):
+        """ Re-propagate earliest times downstream of `starts`."""
+        heap = [(self.pos[i], i) for i in starts]
+        heapq.heapify(heap)
+        queued = set(starts)
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            es = max((self.ef[u] for u in self._preds[v]), default=0.0)
+            ef = es + self.duration[v]
+            if es == self.es[v] and ef == self.ef[v] and v not in starts:
+                continue
+            self.es[v], self.ef[v] = es, ef
+            self.slack[v] = self.ls[v] - es
+            for w in self._succs[v]:
+                if w not in queued:
+                    queued.add(w)
+                    heapq.heappush(heap, (self.pos[w], w))
+
+    def _backward_from(self, starts):
+        """ Re-propagate latest times upstream of `starts`."""
+        heap = [(-self.pos[i], i) for i in starts]
+        heapq.heapify(heap)
+        queued = set(starts)
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            lf = min((self.ls[w] for w in self._succs[v]), default=self.end)
+            ls = lf - self.duration[v]
+            if lf == self.lf[v] and ls == self.ls[v] and v not in starts:
+                continue
+            self.lf[v], self.ls[v] = lf, ls
+            self.slack[v] = ls - self.es[v]
+            for u in self._preds[v]:
+                if u not in queued:
+                    queued.add(u)
+                    heapq.heappush(heap, (-self.pos[u], u))
+
+    def _settle(self, forward, backward):
+        self._forward_from(forward)
+        end = self.ef.max() if len(self.ids) else 0.0
+        if end != self.end:
+            # Every latest time is the plan end less a chain of
+            # durations, so they all move with it.
+            shift = end - self.end
+            self.end = end
+            self.lf += shift
+            self.ls += shift
+            self.slack += shift
+        self._backward_from(backward)
+
+    def _reach(self, start, neighbours, keep):
+        """ Return the nodes reachable from `start` through `keep` nodes."""
+        seen = {start}
+        stack = [start]
+        while stack:
+            for w in neighbours[stack.pop()]:
+                if w not in seen and keep(w):
+                    seen.add(w)
+                    stack.append(w)
+        return seen
+
+    def _reorder(self, a, b):
+        """ Fix `pos` for a new edge `a -> b`, or raise on a cycle.
+
+        Only nodes placed between `b` and `a` can be out of order. Those
+        downstream of `b` move after those upstream of `a`, reusing the
+        same positions.
+        """
+        lo, hi = self.pos[b], self.pos[a]
+        if lo > hi:
+            return
+        after = self._reach(b, self._succs, lambda v: self.pos[v] <= hi)
+        if a in after:
+            raise ValueError(f"Dependency {self.ids[a]!r} -> "
+                             f"{self.ids[b]!r} would make a cycle.")
+        before = self._reach(a, self._preds, lambda v: self.pos[v] >= lo)
+        nodes = (sorted(before, key=self.pos.__getitem__) +
+                 sorted(after, key=self.pos.__getitem__))
+        self.pos[nodes] = np.sort(self.pos[nodes])
+
+    def set_duration(self, tid, minutes):
+        """ Change one duration and update the times it affects."""
+        v = self.node[tid]
+        self.duration[v] = 0.0 if np.isnan(minutes) else minutes
+        self._settle([v], [v])
+
+    def add_dependency(self, blocker, blocked):
+        """ Make `blocked` wait for `blocker`.
+
+        Raises ValueError, and changes nothing, if that makes a cycle.
+        """
+        a, b = self.node[blocker], self.node[blocked]
+        if (a, b) in self._edges:
+            return
+        self._reorder(a, b)
+        self._edges.add((a, b))
+        self._succs[a].add(b)
+        self._preds[b].add(a)
+        self._stale = True
+        self._settle([b], [a])
+
+    def remove_dependency(self, blocker, blocked):
+        """ Drop the dependency of `blocked` on `blocker`."""
+        a, b = self.node[blocker], self.node[blocked]
+        if (a, b) not in self._edges:
+            return
+        # Any topological order stays one without the edge.
+        self._edges.discard((a, b))
+        self._succs[a].discard(b)
+        self._preds[b].discard(a)
+        self._stale = True
+        self._settle([b], [a])
+
+    # Results.
+
+    def critical(self, tol=1e-9):
+        """ Return a boolean array, True for tasks with no slack."""
+        return self.slack <= tol
+
+    def critical_path(self, tol=1e-9):
+        """ Return the ids along one longest chain, first to last."""
+        if not len(self.ids):
+            return []
+        crit = self.critical(tol)
+        v = int(np.flatnonzero(crit & (self.es <= tol))[0])
+        path = [v]
+        while True:
+            nxt = [w for w in self._succs[v]
+                   if crit[w] and abs(self.es[w] - self.ef[v]) <= tol]
+            if not nxt:
+                break
+            v = min(nxt)
+            path.append(v)
+        return [self.ids[i] for i in path]
+
+    def times(self, tid):
+        """ Return a dict of es, ef, ls, lf and slack for one task."""
+        v = self.node[tid]
+        return {k: float(getattr(self, k)[v])
+                for k in ["es", "ef", "ls", "lf", "slack"]}
@@ -0,0 +1,3 @@
+from .tree import label_column, stream_tree
+
+__all__ = ["label_column", "stream_tree"]
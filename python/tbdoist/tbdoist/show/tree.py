@@ -0,0 +1,110 @@
+""" Print a tree from a directed graph while walking it.
+
+`stream_tree` writes each line as soon as its node is reached instead
+of building a `rich.tree.Tree` first. It keeps one child iterator per
+open level, so memory grows with depth rather than with the number of
+nodes.
+"""
+import sys
+
+
+__all__ = ["label_column", "stream_tree", "GUIDES", "ASCII_GUIDES"]
+
+
+# (branch, last branch, continuing trunk, finished trunk)
+GUIDES = ("├── ", "└── ", "│   ", "    ")
+ASCII_GUIDES = ("|-- ", "`-- ", "|   ", "    ")
+
+
+def label_column(g, attrs=("content", "name"), obj_key="obj"):
+    """ Return a dict of node to label for every node of `g`.
+
+    The label is the first of `attrs` found on the node data or on the
+    object stored under `obj_key`, and otherwise the node itself.
+    """
+    labels = {}
+    for n, d in g.nodes(data=True):
+        obj = d.get(obj_key)
+        for attr in attrs:
+            value = d.get(attr)
+            if value is None:
+                value = getattr(obj, attr, None)
+            if value is not None:
+                labels[n] = str(value)
+                break
+        else:
+            labels[n] = str(n)
+    return labels
+
+
+def _lookahead(iterable):
+    """ Yield `(item, is_last)` pairs, reading one item ahead."""
+    it = iter(iterable)
+    try:
+        prev = next(it)
+    except StopIteration:
+        return
+    for item in it:
+        yield prev, False
+        prev = item
+    yield prev, True
+
+
+def stream_tree(tree, roots=None, labels=None, file=None, max_depth=None,
+                collapsed=(), guides=GUIDES, more=" …"):
+    """ Write `tree` to `file` line by line in depth first order.
+
+    Parameters:
+        tree: a directed graph whose successors are children, such as the
+            view from `td_g_to_tree_view`.
+        roots: nodes to start from. Default is every node without a parent.
+        labels: dict of node to label, see `label_column`. Built if `None`.
+        file: writable text file. Default is `sys.stdout`.
+        max_depth: deepest level to print, roots are level 0.
+        collapsed: nodes printed without their subtrees.
+        guides: four strings used to draw branches, see `GUIDES`.
+        more: marker added to nodes whose children are not shown.
+
+    Returns:
+        The number of lines written.
+    """
+    if file is None:
+        file = sys.stdout
+    if labels is None:
+        labels = label_column(tree)
+    if roots is None:
+        roots = (n for n in tree if tree.in_degree(n) == 0)
+    collapsed = set(collapsed)
+    branch, last_branch, trunk, no_trunk = guides
+
+    def hidden_children(n, depth):
+        if n not in collapsed and (max_depth is None or depth < max_depth):
+            return False
+        return next(iter(tree.successors(n)), None) is not None
+
+    count = 0
+    for root in roots:
+        mark = more if hidden_children(root, 0) else ""
+        file.write(f"{labels[root]}{mark}\n")
+        count += 1
+        if mark:
+            continue
+
+        # Each entry is (children with lookahead, prefix for those children).
+        stack = [(_lookahead(tree.successors(root)), "")]
+        while stack:
+            children, prefix = stack[-1]
+            try:
+                n, last = next(children)
+            except StopIteration:
+                stack.pop()
+                continue
+            depth = len(stack)
+            mark = more if hidden_children(n, depth) else ""
+            file.write(f"{prefix}{last_branch if last else branch}"
+                       f"{labels[n]}{mark}\n")
+            count += 1
+            if not mark:
+                stack.append((_lookahead(tree.successors(n)),
+                              prefix + (no_trunk if last else trunk)))
+    return count
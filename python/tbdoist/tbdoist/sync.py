@@ -0,0 +1,446 @@
+""" Two way sync between Todoist and Taskwarrior.
+
+Both sides are read incrementally. Todoist sends only the items changed
+since the stored sync token, and Taskwarrior exports only the tasks
+modified since the last run. Each task becomes a small record of the
+synced fields (`FIELDS`). A task whose record hashes to the value stored
+for its pair has not really changed, e.g. it is the echo of the last
+sync's own write, and is dropped before any other work. Syncing an
+unchanged workspace therefore costs one Sync API request and one empty
+`task export`.
+
+When both sides changed a pair, fields are merged three ways against the
+last agreed record. A field changed on one side only takes that side's
+value. A field changed on both sides takes the value from `prefer`.
+Writes go out as batched Sync API commands and one batched
+`task import`.
+
+Taskwarrior tasks carry the Todoist id in the `todoistid` UDA. Nested
+Todoist projects map to dotted Taskwarrior projects, and the inbox to no
+project. Due dates sync as dates or UTC datetimes; floating Todoist times
+are read as UTC.
+"""
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+
+from .ancestry import strip_header
+from .tinytd import SyncState
+from .tracing import traced
+
+try:
+    from tbtw import TaskwarriorStore
+except ImportError:  # tbtw is optional, needed only to sync.
+    TaskwarriorStore = None
+
+
+__all__ = ["FIELDS", "UDA", "Syncer", "digest", "merge", "td_record",
+           "tw_record"]
+
+
+FIELDS = ["content", "completed", "deleted", "due", "priority", "labels",
+          "project"]
+UDA = "todoistid"
+TW_DATE = "%Y%m%dT%H%M%SZ"
+# Todoist priority 4 is p1, shown as H in Taskwarrior.
+TW_PRIORITY = {4: "H", 3: "M", 2: "L"}
+TD_PRIORITY = {v: k for k, v in TW_PRIORITY.items()}
+
+
+def digest(record):
+    """ Return a stable hash of a synced record."""
+    text = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _td_due(due):
+    if not due or not due.get("date"):
+        return None
+    value = due["date"]
+    if len(value) == 10 or value.endswith("Z"):
+        return value
+    return value + "Z"
+
+
+def _tw_due(value):
+    if not value:
+        return None
+    dt = datetime.strptime(value, TW_DATE)
+    if (dt.hour, dt.minute, dt.second) == (0, 0, 0):
+        return dt.date().isoformat()
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _due_to_tw(value):
+    if value is None:
+        return None
+    if len(value) == 10:
+        return value.replace("-", "") + "T000000Z"
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").strftime(TW_DATE)
+
+
+def td_record(item, paths):
+    """ Return the synced fields of a Sync API item.
+
+    `paths` maps project ids to dotted project names.
+    """
+    return {"content": strip_header(item["content"]),
+            "completed": bool(item.get("checked")),
+            "deleted": bool(item.get("is_deleted")),
+            "due": _td_due(item.get("due")),
+            "priority": item.get("priority") or 1,
+            "labels": sorted(item.get("labels") or ()),
+            "project": paths.get(item.get("project_id"))}
+
+
+def tw_record(task):
+    """ Return the synced fields of a Taskwarrior task dict."""
+    return {"content": task.get("description", ""),
+            "completed": task.get("status") == "completed",
+            "deleted": task.get("status") == "deleted",
+            "due": _tw_due(task.get("due")),
+            "priority": TD_PRIORITY.get(task.get("priority"), 1),
+            "labels": sorted(task.get("tags") or ()),
+            "project": task.get("project") or None}
+
+
+def merge(base, td, tw, prefer="todoist"):
+    """ Merge two records field by field against their last agreed `base`.
+
+    Returns:
+        `(merged, conflicts)`, the merged record and the fields that
+        both sides changed to different values.
+    """
+    merged = {}
+    conflicts = []
+    for field in FIELDS:
+        a, b = td[field], tw[field]
+        if a == b:
+            merged[field] = a
+        elif base is not None and a == base[field]:
+            merged[field] = b
+        elif base is not None and b == base[field]:
+            merged[field] = a
+        else:
+            merged[field] = a if prefer == "todoist" else b
+            conflicts.append(field)
+    return merged, conflicts
+
+
+def _project_paths(projects):
+    """ Return a dict of project id to dotted name. The inbox maps to None."""
+    paths = {}
+
+    def path(pid):
+        if pid not in paths:
+            p = projects[pid]
+            if p["inbox"]:
+                paths[pid] = None
+            elif p["parent_id"] in projects:
+                paths[pid] = f"{path(p['parent_id'])}.{p['name']}"
+            else:
+                paths[pid] = p["name"]
+        return paths[pid]
+
+    for pid in projects:
+        path(pid)
+    return paths
+
+
+class Syncer:
+    """ Sync a Todoist account with a Taskwarrior data directory.
+
+    Parameters:
+        client: a `TodoistSyncClient`.
+        store: a `tbtw.TaskwarriorStore`.
+        state: a `SyncState`, the memory of earlier runs.
+        prefer: "todoist" or "taskwarrior", the side that wins a field
+            both sides changed.
+    """
+
+    def __init__(self, client, store, state, prefer="todoist"):
+        if prefer not in ("todoist", "taskwarrior"):
+            raise ValueError(f"prefer must be todoist or taskwarrior, "
+                             f"not {prefer}.")
+        self.client = client
+        self.store = store
+        self.state = state
+        self.prefer = prefer
+        if client.sync_token == "*":
+            client.sync_token = state.meta.get("sync_token", "*")
+        self.projects = dict(state.meta.get("projects", {}))
+
+    # Reading.
+
+    def _update_projects(self, pulled):
+        if pulled.get("full_sync"):
+            self.projects = {}
+        for p in pulled.get("projects", []):
+            if p.get("is_deleted"):
+                self.projects.pop(p["id"], None)
+            else:
+                self.projects[p["id"]] = {"name": p["name"],
+                                          "parent_id": p.get("parent_id"),
+                                          "inbox": bool(p.get("inbox_project"))}
+        self.paths = _project_paths(self.projects)
+        self.project_ids = {path: pid for pid, path in self.paths.items()}
+
+    def _td_changes(self, pulled):
+        changed = {}
+        for item in pulled.get("items", []):
+            record = td_record(item, self.paths)
+            pair = self.state.get(todoist_id=item["id"])
+            if pair is not None and digest(record) == pair["hash"]:
+                continue
+            if pair is None and (record["deleted"] or record["completed"]):
+                continue
+            changed[item["id"]] = record
+        return changed
+
+    def _tw_changes(self):
+        since = self.state.meta.get("tw_since")
+        filters = [f"modified.after:{since}"] if since else []
+        exported = self.store.iter_export(*filters)
+        retry = self.state.meta.get("retry")
+        if retry:
+            # Tasks whose Todoist write failed last time.
+            exported = chain(exported, self.store.iter_export(*retry))
+        tasks, changed = {}, {}
+        for task in exported:
+            if task.get("status") == "recurring":
+                # Templates; their instances are synced instead.
+                continue
+            record = tw_record(task)
+            pair = self.state.get(uuid=task["uuid"])
+            if pair is not None and digest(record) == pair["hash"]:
+                continue
+            if pair is None and (record["deleted"] or record["completed"]):
+                continue
+            tasks[task["uuid"]] = task
+            changed[task["uuid"]] = record
+        return tasks, changed
+
+    # Writing.
+
+    def _tw_task(self, record, base, todoist_id, now):
+        task = dict(base)
+        task["description"] = record["content"]
+        if record["deleted"]:
+            task["status"] = "deleted"
+        elif record["completed"]:
+            task["status"] = "completed"
+        elif task.get("status") != "waiting":
+            task["status"] = "pending"
+        if task["status"] in ("completed", "deleted"):
+            task.setdefault("end", now)
+        else:
+            task.pop("end", None)
+        for key, value in [("due", _due_to_tw(record["due"])),
+                           ("priority", TW_PRIORITY.get(record["priority"])),
+                           ("tags", record["labels"] or None),
+                           ("project", record["project"])]:
+            if value is None:
+                task.pop(key, None)
+            else:
+                task[key] = value
+        task[UDA] = todoist_id
+        task["modified"] = now
+        return task
+
+    def _td_commands(self, todoist_id, old, new):
+        """ Return Sync API commands taking `todoist_id` from `old` to `new`."""
+        command = self.client.command
+        if new["deleted"]:
+            return [] if old["deleted"] else [
+                command("item_delete", {"id": todoist_id})]
+        commands = []
+        args = {"id": todoist_id}
+        if new["content"] != old["content"]:
+            args["content"] = new["content"]
+        if new["due"] != old["due"]:
+            args["due"] = {"date": new["due"]} if new["due"] else None
+        if new["priority"] != old["priority"]:
+            args["priority"] = new["priority"]
+        if new["labels"] != old["labels"]:
+            args["labels"] = new["labels"]
+        if len(args) > 1:
+            commands.append(command("item_update", args))
+        if new["project"] != old["project"]:
+            commands.append(command("item_move", {
+                "id": todoist_id,
+                "project_id": self._project_id(new["project"])}))
+        if new["completed"] != old["completed"]:
+            commands.append(command("item_complete" if new["completed"]
+                                    else "item_uncomplete",
+                                    {"id": todoist_id}))
+        return commands
+
+    def _add_command(self, record, temp_id):
+        args = {"content": record["content"],
+                "priority": record["priority"],
+                "labels": record["labels"]}
+        if record["due"]:
+            args["due"] = {"date": record["due"]}
+        if record["project"] is not None:
+            args["project_id"] = self._project_id(record["project"])
+        return self.client.command("item_add", args, temp_id=temp_id)
+
+    def _project_id(self, path):
+        """ Return the id of a dotted project, creating it if need be."""
+        if path not in self.project_ids:
+            self._ensure_projects([path])
+        return self.project_ids[path]
+
+    def _ensure_projects(self, names):
+        """ Create Todoist projects for dotted names that have none."""
+        missing = set()
+        for name in names:
+            parts = name.split(".") if name else []
+            for i in range(1, len(parts) + 1):
+                path = ".".join(parts[:i])
+                if path not in self.project_ids:
+                    missing.add(path)
+        # Parents first, one level per request, so every parent id is real.
+        for depth in sorted({m.count(".") for m in missing}):
+            level = [m for m in missing if m.count(".") == depth]
+            commands = {}
+            for path in level:
+                parent, _, name = path.rpartition(".")
+                args = {"name": name}
+                if parent:
+                    args["parent_id"] = self.project_ids[parent]
+                commands[path] = self.client.command("project_add", args,
+                                                     temp_id=str(uuid.uuid4()))
+            mapping, errors = self.client.push(commands.values())
+            if errors:
+                raise RuntimeError(f"Could not create projects: {errors}")
+            for path, cmd in commands.items():
+                pid = mapping[cmd["temp_id"]]
+                parent = path.rpartition(".")[0]
+                self.projects[pid] = {
+                    "name": path.rpartition(".")[2],
+                    "parent_id": self.project_ids[parent] if parent else None,
+                    "inbox": False}
+                self.paths[pid] = path
+                self.project_ids[path] = pid
+
+    # Running.
+
+    @traced("Syncer.sync")
+    def sync(self):
+        """ Run one sync.
+
+        Returns:
+            dict with "todoist" and "taskwarrior", the number of writes
+            sent to each side, "conflicts", the number of fields both
+            sides changed, and "errors", the Sync API errors by command.
+        """
+        state = self.state
+        clock = datetime.now(timezone.utc)
+        started = clock.strftime(TW_DATE)
+        # Taskwarrior keeps whole seconds. Look back one so an edit in the
+        # same second as this run is picked up next time.
+        since = (clock - timedelta(seconds=1)).strftime(TW_DATE)
+        pulled = self.client.pull()
+        self._update_projects(pulled)
+        td_changed = self._td_changes(pulled)
+        tw_tasks, tw_changed = self._tw_changes()
+
+        # Taskwarrior tasks carrying a Todoist id but no pair, e.g. after
+        # the state file was lost, are linked instead of duplicated.
+        for tw_uuid, task in tw_tasks.items():
+            tid = task.get(UDA)
+            if tid and state.get(uuid=tw_uuid) is None and \
+                    state.get(todoist_id=tid) is None:
+                state.put(tid, tw_uuid, None, None)
+
+        # Fetch the current Taskwarrior side of pairs changed in Todoist.
+        wanted = [p["uuid"] for tid in td_changed
+                  if (p := state.get(todoist_id=tid)) is not None
+                  and p["uuid"] not in tw_tasks]
+        if wanted:
+            for task in self.store.iter_export(*wanted):
+                tw_tasks[task["uuid"]] = task
+
+        self._ensure_projects({r["project"] for r in tw_changed.values()})
+
+        now = started
+        tw_writes = []
+        td_commands = []
+        owner = {}
+        links = []
+        conflicts = 0
+
+        for tid, td in td_changed.items():
+            pair = state.get(todoist_id=tid)
+            if pair is None:
+                task = self._tw_task(td, {"uuid": str(uuid.uuid4()),
+                                          "entry": now}, tid, now)
+                tw_writes.append(task)
+                links.append((tid, task["uuid"], td))
+                continue
+            tw_uuid = pair["uuid"]
+            base = pair["record"]
+            tw = tw_changed.pop(tw_uuid, None)
+            if tw is None:
+                current = tw_tasks.get(tw_uuid)
+                # A pair linked by its UDA has no base yet, and its task
+                # may be gone; then Todoist's record stands for both.
+                tw = tw_record(current) if current else base or td
+            merged, fields = merge(base, td, tw, self.prefer)
+            conflicts += len(fields)
+            if merged != tw or tw_uuid not in tw_tasks:
+                current = tw_tasks.get(tw_uuid) or {"uuid": tw_uuid,
+                                                    "entry": now}
+                tw_writes.append(self._tw_task(merged, current, tid, now))
+            for cmd in self._td_commands(tid, td, merged):
+                owner[cmd["uuid"]] = tid
+                td_commands.append(cmd)
+            links.append((tid, tw_uuid, merged))
+
+        adds = {}
+        for tw_uuid, tw in tw_changed.items():
+            pair = state.get(uuid=tw_uuid)
+            if pair is None:
+                temp_id = str(uuid.uuid4())
+                td_commands.append(self._add_command(tw, temp_id))
+                adds[temp_id] = tw_uuid
+                continue
+            tid = pair["todoist_id"]
+            # Todoist did not change this pair, so it still holds `base`.
+            base = pair["record"] or tw
+            for cmd in self._td_commands(tid, base, tw):
+                owner[cmd["uuid"]] = tid
+                td_commands.append(cmd)
+            links.append((tid, tw_uuid, tw))
+
+        mapping, errors = self.client.push(td_commands)
+        failed = {owner[key] for key in errors if key in owner}
+        retry = [tw_uuid for tid, tw_uuid, _ in links if tid in failed]
+        for temp_id, tw_uuid in adds.items():
+            tid = mapping.get(temp_id)
+            if tid is None:
+                retry.append(tw_uuid)
+                continue
+            task = dict(tw_tasks[tw_uuid])
+            task[UDA] = tid
+            task["modified"] = now
+            tw_writes.append(task)
+            links.append((tid, tw_uuid, tw_record(task)))
+
+        self.store.import_tasks(tw_writes)
+        for tid, tw_uuid, record in links:
+            if tid in failed:
+                # Left unrecorded so the next run tries again.
+                continue
+            if record["deleted"]:
+                state.drop({"todoist_id": tid, "uuid": tw_uuid})
+            else:
+                state.put(tid, tw_uuid, record, digest(record))
+        state.set_meta(sync_token=self.client.sync_token, tw_since=since,
+                       projects=self.projects, retry=retry)
+        state.save()
+        return {"todoist": len(td_commands), "taskwarrior": len(tw_writes),
+                "conflicts": conflicts, "errors": errors}
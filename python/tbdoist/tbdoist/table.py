@@ -0,0 +1,294 @@
+""" Columnar snapshot of todoist tasks.
+
+A `TaskTable` holds one NumPy array per field of `TASK_KEYS` instead of
+one `Task` dataclass per task. Row `i` is task `i`. Ids that repeat
+(projects, sections, labels) are interned to small integer codes. The
+`due` and `duration` fields are flattened into typed columns once, when
+the table is built. Filters over the table are array masks rather than
+per-object attribute lookups.
+"""
+import numpy as np
+
+
+__all__ = ["TASK_KEYS", "PROJECT_KEYS", "Interner", "TaskTable",
+           "project_columns"]
+
+
+PROJECT_KEYS = ["color",
+                "comment_count",
+                "id",
+                "is_favorite",
+                "is_inbox_project",
+                "is_shared",
+                "is_team_inbox",
+                "name",
+                "order",
+                "parent_id",
+                "url",
+                "view_style"]
+
+TASK_KEYS = [
+    "id",
+    "content",
+    "description",
+    "comment_count",
+    "is_completed",
+    "order",
+    "priority",
+    "project_id",
+    "labels",
+    "due",
+    "section_id",
+    "parent_id",
+    "creator_id",
+    "created_at",
+    "assignee_id",
+    "assigner_id",
+    "duration",
+    "url"]
+
+# Minutes per todoist duration unit.
+DURATION_UNITS = {"minute": 1, "day": 24 * 60}
+
+
+class Interner:
+    """ Map hashable values to dense integer codes and back.
+
+    `None` is always code -1.
+    """
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for v in values:
+            self.code(v)
+
+    def code(self, value):
+        if value is None:
+            return -1
+        try:
+            return self.codes[value]
+        except KeyError:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+            return c
+
+    def __getitem__(self, code):
+        if code < 0:
+            return None
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.codes
+
+
+def _getter(obj):
+    """ Return a field getter for an API dict or a todoist dataclass."""
+    if isinstance(obj, dict):
+        return obj.get
+    return lambda key: getattr(obj, key, None)
+
+
+def _strip_zone(s):
+    # numpy refuses zone suffixes. Todoist only sends "Z" (UTC); floating
+    # times have no suffix and are kept as written.
+    if s is None:
+        return "NaT"
+    return s[:-1] if s.endswith("Z") else s
+
+
+class TaskTable:
+    """ Tasks as columns.
+
+    Columns:
+        id, content, description, url, due_string: object arrays of str.
+        project, section, creator, assignee, assigner: int32 codes into
+            the matching `Interner` in `self.interned`, -1 for none.
+        parent: int32 row of the parent task, -1 for none or unloaded.
+        has_parent: bool, True if the task has a `parent_id`.
+        priority: int8. order, comment_count: int32.
+        is_completed, due_is_recurring: bool.
+        due_date: datetime64[D]. due_datetime, created_at:
+            datetime64[s], NaT when missing. Times ending in "Z" are UTC.
+        duration: float64 minutes, NaN when missing.
+        labels: CSR layout, `label_codes[label_offsets[i]:label_offsets[i+1]]`
+            are the label codes of row `i`.
+
+    Build with `TaskTable.from_objects`.
+    """
+
+    INTERNED = {"project": "project_id",
+                "section": "section_id",
+                "creator": "creator_id",
+                "assignee": "assignee_id",
+                "assigner": "assigner_id"}
+
+    def __init__(self, columns, interned, row_of):
+        self.columns = columns
+        self.interned = interned
+        self.row_of = row_of
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    @classmethod
+    def from_objects(cls, objs, interned=None):
+        """ Build a table from todoist `Task` objects or REST API dicts.
+
+        Objects that are not tasks, such as projects and sections, are
+        skipped. Pass `interned` to share code tables between snapshots.
+        """
+        if interned is None:
+            interned = {}
+        for key in list(cls.INTERNED) + ["label"]:
+            interned.setdefault(key, Interner())
+
+        raw = {k: [] for k in ["id", "content", "description", "url",
+                               "priority", "order", "comment_count",
+                               "is_completed", "parent_id", "due_date",
+                               "due_datetime", "due_string",
+                               "due_is_recurring", "created_at", "duration"]}
+        codes = {k: [] for k in cls.INTERNED}
+        label_codes = []
+        label_offsets = [0]
+        label_interner = interned["label"]
+
+        for obj in objs:
+            get = _getter(obj)
+            if get("content") is None:
+                continue
+            for k in ["id", "content", "description", "url", "priority",
+                      "order", "comment_count", "is_completed",
+                      "parent_id"]:
+                raw[k].append(get(k))
+            for k, key in cls.INTERNED.items():
+                codes[k].append(interned[k].code(get(key)))
+            for label in get("labels") or ():
+                label_codes.append(label_interner.code(label))
+            label_offsets.append(len(label_codes))
+
+            due = get("due")
+            if due is None:
+                raw["due_date"].append("NaT")
+                raw["due_datetime"].append("NaT")
+                raw["due_string"].append(None)
+                raw["due_is_recurring"].append(False)
+            else:
+                dget = _getter(due)
+                raw["due_date"].append(dget("date") or "NaT")
+                raw["due_datetime"].append(_strip_zone(dget("datetime")))
+                raw["due_string"].append(dget("string"))
+                raw["due_is_recurring"].append(bool(dget("is_recurring")))
+            raw["created_at"].append(_strip_zone(get("created_at") or None))
+
+            duration = get("duration")
+            if duration is None:
+                raw["duration"].append(np.nan)
+            else:
+                dget = _getter(duration)
+                raw["duration"].append(dget("amount") *
+                                       DURATION_UNITS[dget("unit")])
+
+        row_of = {tid: i for i, tid in enumerate(raw["id"])}
+        n = len(raw["id"])
+
+        def objects(values):
+            arr = np.empty(n, dtype=object)
+            arr[:] = values
+            return arr
+
+        columns = {
+            "id": objects(raw["id"]),
+            "content": objects(raw["content"]),
+            "description": objects(raw["description"]),
+            "url": objects(raw["url"]),
+            "due_string": objects(raw["due_string"]),
+            "priority": np.array(raw["priority"], dtype=np.int8),
+            "order": np.array(raw["order"], dtype=np.int32),
+            "comment_count": np.array(raw["comment_count"], dtype=np.int32),
+            "is_completed": np.array(raw["is_completed"], dtype=bool),
+            "parent": np.array([row_of.get(p, -1) for p in raw["parent_id"]],
+                               dtype=np.int32),
+            "has_parent": np.array([p is not None for p in raw["parent_id"]],
+                                   dtype=bool),
+            "due_date": np.array(raw["due_date"], dtype="datetime64[D]"),
+            # Parse at microseconds, the finest todoist sends, then round.
+            "due_datetime": np.array(raw["due_datetime"],
+                                     dtype="datetime64[us]"
+                                     ).astype("datetime64[s]"),
+            "due_is_recurring": np.array(raw["due_is_recurring"], dtype=bool),
+            "created_at": np.array(raw["created_at"], dtype="datetime64[us]"
+                                   ).astype("datetime64[s]"),
+            "duration": np.array(raw["duration"], dtype=np.float64),
+            "label_codes": np.array(label_codes, dtype=np.int32),
+            "label_offsets": np.array(label_offsets, dtype=np.int64),
+        }
+        for k in cls.INTERNED:
+            columns[k] = np.array(codes[k], dtype=np.int32)
+        return cls(columns, interned, row_of)
+
+    def labels_of(self, i):
+        """ Return the label names of row `i`."""
+        start, stop = self.label_offsets[i], self.label_offsets[i + 1]
+        return [self.interned["label"][c] for c in self.label_codes[start:stop]]
+
+    def row(self, i):
+        """ Return row `i` as a dict with ids decoded."""
+        d = {}
+        for k, col in self.columns.items():
+            if k in ["label_codes", "label_offsets", "has_parent"]:
+                continue
+            v = col[i]
+            if k in self.INTERNED:
+                v = self.interned[k][v]
+            elif k == "parent":
+                v = None if v < 0 else self.columns["id"][v]
+            d[k] = v
+        d["labels"] = self.labels_of(i)
+        return d
+
+    def take(self, rows):
+        """ Return the ids of the rows selected by a mask or an index array."""
+        return self.columns["id"][rows]
+
+    def to_dataframe(self):
+        """ Return a pandas DataFrame with ids decoded and due flattened."""
+        import pandas as pd
+
+        data = {}
+        for k, col in self.columns.items():
+            if k in ["label_codes", "label_offsets", "has_parent"]:
+                continue
+            if k in self.INTERNED:
+                values = np.array(self.interned[k].values + [None],
+                                  dtype=object)
+                # Code -1 picks the trailing None.
+                data[self.INTERNED[k]] = values[col]
+            elif k == "parent":
+                ids = np.append(self.columns["id"], None)
+                data["parent_id"] = ids[col]
+            else:
+                data[k] = col
+        data["labels"] = [self.labels_of(i) for i in range(len(self))]
+        return pd.DataFrame(data)
+
+
+def project_columns(projects):
+    """ Return a dict of `PROJECT_KEYS` to arrays for `projects`."""
+    projects = list(projects)
+    cols = {}
+    for key in PROJECT_KEYS:
+        values = [_getter(p)(key) for p in projects]
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+        cols[key] = arr
+    return cols
@@ -1,28 +1,48 @@
 import os
 from networkx import DiGraph, topological_generations
 import networkx as nx
+import numpy as np
 
 from todoist_api_python.api import TodoistAPI
 from todoist_api_python.models import Task, Project, Section
-# from todoist_api.api_async import TodoistAPIAsync
 import typer
 from typing_extensions import Annotated
 from rich import print
 from rich.tree import Tree
-from modify import manage_supertask_link, manage_supertask_links
-import nxutils as nxu
+from .modify import manage_supertask_link, manage_supertask_links
+from .client import AsyncTodoistClient, TodoistSyncClient, REQUEST_LIMIT
+from .ancestry import AncestorIndex
+from .relink import relink_diff, apply_relinks
+from .show import label_column, stream_tree
+from .table import TASK_KEYS, PROJECT_KEYS, TaskTable
+from .query import Query
+from .aeon import write_aeon_csv
+from .sync import Syncer, TaskwarriorStore
+from .tinytd import SyncState
+from .tracing import traced, start_trace, stop_trace, active_trace
+
+try:
+    import nxutils as nxu
+except ImportError:  # A local path dependency, needed to build graphs.
+    nxu = None
 
 
 app = typer.Typer(chain=True)
-state = {"api": None}
+# Shared by chained commands so the workspace is loaded at most once.
+state = {"api": None,
+         "client": None,
+         "workspace": None,
+         "graph": None,
+         "index": None,
+         "labels": None,
+         "table": None,
+         "selection": None}
 
 __all__ = [  # "ThrottledApi",
-    "td_obj_to_node_and_edges", "td_iter_to_graph",
+    "td_obj_to_node_and_edges", "td_iter_to_graph", "td_graph_to_traces",
+    "build_local_graph",
     "manage_supertask_link", "manage_supertask_links",
-    "td_g_to_tree_view"]
-
-
-REQUEST_LIMIT = 450 / (15 * 60)  # 450 requests per 15 minutes.
+    "td_g_to_tree_view", "td_stream_tree"]
 
 TYPE_MAP = {Project: {"id": "project_id",
                       "getter": "get_project",
@@ -35,24 +55,97 @@ TYPE_MAP = {Project: {"id": "project_id",
                       "getser": "get_sections"},
             }
 
-# TODO: Write a tool to build smaller parts of the graph from tdapi.
+class TdCache:
+    """ Per-run cache of todoist objects and query results.
 
+    Objects are keyed by id. Query results are keyed by the getter name
+    and its filter keywords, so asking twice for a project's tasks costs
+    one request.
+    """
 
-def build_local_graph(tdapi, obj):
-    raise NotImplementedError()
+    def __init__(self):
+        self.objs = {}
+        self.queries = {}
 
-    # try:
-    #     tmap = TYPE_MAP[type(obj)]
-    # except KeyError:
-    #     raise f"Cannot build todoist_api map from type {type(obj)}."
-    #
-    # obj_id = obj.id
-    #
-    # succ = []
-    # id_attr = TYPE_MAP[type(obj)]["id"]
-    # for td_type in TYPE_MAP:
-    #     try:
-    #         hold = get
+    def get(self, tdapi, td_type, obj_id):
+        """ Return the object of `td_type` with `obj_id` using its getter."""
+        try:
+            return self.objs[obj_id]
+        except KeyError:
+            pass
+        obj = getattr(tdapi, TYPE_MAP[td_type]["getter"])(obj_id)
+        self.objs[obj_id] = obj
+        return obj
+
+    def get_all(self, tdapi, td_type, **filters):
+        """ Return objects of `td_type` matching `filters` using its getser."""
+        key = (TYPE_MAP[td_type]["getser"], tuple(sorted(filters.items())))
+        try:
+            return self.queries[key]
+        except KeyError:
+            pass
+        result = getattr(tdapi, TYPE_MAP[td_type]["getser"])(**filters)
+        self.queries[key] = result
+        for obj in result:
+            self.objs[obj.id] = obj
+        return result
+
+
+@traced()
+def build_local_graph(tdapi, obj, k=None, cache=None):
+    """ Build the graph around `obj` without loading the whole workspace.
+
+    The graph holds the ancestors, siblings and descendants of `obj`.
+    Subtasks and sections always share their project, so the project's
+    tasks and sections arrive in two filtered requests. Parent projects
+    cost one request per level.
+
+    Parameters:
+        tdapi: A TodoistAPI instance.
+        obj: A todoist Task, Section or Project, or a task id.
+        k: Number of levels of ancestors and descendants to keep.
+            Default `None` keeps all of them.
+        cache: A `TdCache` shared across calls in one run.
+
+    Returns:
+        DiGraph in the shape made by `td_iter_to_graph`.
+    """
+    if cache is None:
+        cache = TdCache()
+    if isinstance(obj, str):
+        obj = cache.get(tdapi, Task, obj)
+    if type(obj) not in TYPE_MAP:
+        raise TypeError(f"Cannot build local graph from type {type(obj)}.")
+
+    project_key = TYPE_MAP[Project]["id"]
+    if isinstance(obj, Project):
+        project_id = obj.id
+        cache.objs[obj.id] = obj
+    else:
+        project_id = getattr(obj, project_key)
+
+    objs = list(cache.get_all(tdapi, Task, **{project_key: project_id}))
+    objs += cache.get_all(tdapi, Section, **{project_key: project_id})
+    project = cache.get(tdapi, Project, project_id)
+    objs.append(project)
+    while project.parent_id is not None:
+        project = cache.get(tdapi, Project, project.parent_id)
+        objs.append(project)
+
+    index = AncestorIndex.from_objects(objs)
+    ancestors = index.ancestors(obj.id)
+    if k is not None:
+        ancestors = ancestors[:k]
+    keep = {obj.id, *ancestors}
+    parent = index.parent(obj.id)
+    if parent is not None:
+        keep.update(index.children(parent))
+    depth = index.depth(obj.id)
+    for n in index.descendants(obj.id):
+        if k is None or index.depth(n) - depth <= k:
+            keep.add(n)
+
+    return td_iter_to_graph(index.objs[n] for n in index if n in keep)
 
 
 # class ThrottledApi(TodoistAPI):
@@ -81,75 +174,245 @@ def build_local_graph(tdapi, obj):
 #         print("Update Rate Here.")
 
 
-PROJECT_KEYS = ["color",
-                "comment_count",
-                "id",
-                "is_favorite",
-                "is_inbox_project",
-                "is_shared",
-                "is_team_inbox",
-                "name",
-                "order",
-                "parent_id",
-                "url",
-                "view_style"]
-
-TASK_KEYS = [
-    "id",
-    "content",
-    "description",
-    "comment_count",
-    "is_completed",
-    "order",
-    "priority",
-    "project_id",
-    "labels",
-    "due",
-    "section_id",
-    "parent_id",
-    "creator_id",
-    "created_at",
-    "assignee_id",
-    "assigner_id",
-    "duration",
-    "url"]
+ITEMKINDS = {"projects": Project, "sections": Section, "tasks": Task}
+
+
+def _workspace():
+    """ Return the workspace, loading it on first use in this run."""
+    if state["workspace"] is None:
+        # One concurrent load costs about the latency of the slowest request.
+        state["workspace"] = state["client"].load()
+    return state["workspace"]
+
+
+def _graph():
+    """ Return the task graph, building it on first use in this run."""
+    if state["graph"] is None:
+        ws = _workspace()
+        state["graph"] = td_iter_to_graph(ws["projects"] + ws["sections"] +
+                                          ws["tasks"])
+    return state["graph"]
+
+
+def _index():
+    """ Return an AncestorIndex of the graph, rebuilt only after edits."""
+    if state["index"] is None:
+        state["index"] = AncestorIndex.from_graph(_graph())
+    return state["index"]
+
+
+def _table():
+    """ Return a TaskTable of the loaded tasks, built on first use."""
+    if state["table"] is None:
+        state["table"] = TaskTable.from_objects(_workspace()["tasks"])
+    return state["table"]
+
+
+def _selection():
+    """ Return the selected node ids, defaulting to every task."""
+    if state["selection"] is None:
+        state["selection"] = [t.id for t in _workspace()["tasks"]]
+    return state["selection"]
 
 
 @ app.command()
+@ traced()
 def show(itemkind: str):
-    api = state["api"]
+    """ Select all items of a kind for the following commands."""
     print(f"Showing: {itemkind.lower()}")
-    match itemkind.lower():
-        case "projects":
-            result = api.get_projects()
+    if itemkind.lower() == "labels":
+        for label in _workspace()["labels"]:
+            print(label.name)
+        return
+
+    try:
+        td_type = ITEMKINDS[itemkind.lower()]
+    except KeyError:
+        raise typer.BadParameter(f"{itemkind} not one of "
+                                 f"{list(ITEMKINDS) + ['labels']}.")
+    g = _graph()
+    state["selection"] = [n for n, d in g.nodes(data=True)
+                          if isinstance(d.get("obj"), td_type)]
+    print(f"{len(state['selection'])} {itemkind.lower()}")
+
+
+def _ids_by_name(objs, names, option):
+    """ Return the ids of the objects with `names`, all of which must exist."""
+    ids = [o.id for o in objs if o.name in names]
+    unknown = set(names) - {o.name for o in objs}
+    if unknown:
+        raise typer.BadParameter(f"No match for {sorted(unknown)}.",
+                                 param_hint=option)
+    return ids
+
+
+@ app.command("filter")
+@ traced("filter")
+def filter_(project: Annotated[list[str], typer.Option()] = None,
+            section: Annotated[list[str], typer.Option()] = None,
+            label: Annotated[list[str], typer.Option()] = None,
+            priority: Annotated[list[int], typer.Option()] = None,
+            due_after: Annotated[str, typer.Option()] = None,
+            due_before: Annotated[str, typer.Option()] = None,
+            completed: Annotated[bool, typer.Option(
+                "--completed/--open")] = None,
+            has_parent: Annotated[bool, typer.Option(
+                "--subtasks/--top-level")] = None):
+    """ Narrow the selection to tasks matching every option."""
+    ws = _workspace()
+    if project:
+        project = _ids_by_name(ws["projects"], project, "--project")
+    if section:
+        section = _ids_by_name(ws["sections"], section, "--section")
+    query = Query(project=project or None, section=section or None,
+                  label=label or None, priority=priority or None,
+                  due_after=due_after, due_before=due_before,
+                  completed=completed, has_parent=has_parent)
+
+    table = _table()
+    mask = query.mask(table)
+    selected = [table.row_of[n] for n in _selection() if n in table.row_of]
+    keep = np.zeros(len(table), dtype=bool)
+    keep[selected] = True
+    state["selection"] = list(table.take(mask & keep))
+    print(f"{len(state['selection'])} selected")
 
-        case "tasks":
-            result = api.get_tasks()
 
-        case "labels":
-            result = api.get_labels()
+@ app.command()
+@ traced()
+def relink(dry_run: Annotated[bool, typer.Option()] = False,
+           workers: Annotated[int, typer.Option()] = 4,
+           checkpoint: Annotated[str, typer.Option()] = None):
+    """ Update supertask headers on the selected tasks."""
+    g = _graph()
+    tasks = [g.nodes[n]["obj"] for n in _selection()
+             if isinstance(g.nodes[n].get("obj"), Task)]
+    changes = relink_diff(state["api"], tasks, index=_index())
+    for change in changes:
+        print(change["content"])
+    if dry_run:
+        print(f"{len(changes)} tasks to relink")
+        return
+
+    summary = apply_relinks(state["api"], changes, max_workers=workers,
+                            limiter=state["client"].limiter,
+                            checkpoint=checkpoint)
+    failed = {n for n, _ in summary["failed"]}
+    # Keep the loaded graph current instead of fetching again.
+    for change in changes:
+        if change["id"] not in failed:
+            g.nodes[change["id"]]["obj"].content = change["content"]
+    state["labels"] = None
+    state["table"] = None
+    print(f"{summary['applied']} relinked, {summary['skipped']} already "
+          f"done, {len(failed)} failed of {summary['total']}")
 
-    graph, failed = add_to_graph(result)
-    link_to_parents(graph)
-    return graph
+
+@ app.command()
+@ traced()
+def render(depth: Annotated[int, typer.Option()] = None,
+           collapse: Annotated[list[str], typer.Option()] = None):
+    """ Print the selection as a tree with its ancestors."""
+    g = _graph()
+    index = _index()
+    keep = set()
+    for n in _selection():
+        if n in index:
+            keep.update(index.path_to_root(n))
+    if state["labels"] is None:
+        state["labels"] = label_column(g)
+    td_stream_tree(g.subgraph(keep), labels=state["labels"],
+                   max_depth=depth, collapsed=collapse or ())
 
 
 @ app.command()
-def add(itemkind: str):
+@ traced()
+def export(path: str):
+    """ Write the selected tasks to an Aeon Timeline CSV file."""
+    g = _graph()
+    tasks = (g.nodes[n]["obj"] for n in _selection()
+             if isinstance(g.nodes[n].get("obj"), Task))
+    projects = {p.id: p for p in _workspace()["projects"]}
+    with open(path, "w", newline="") as f:
+        n = write_aeon_csv(tasks, f, projects=projects)
+    print(f"{n} rows written to {path}")
+
+
+@ app.command()
+@ traced()
+def sync(taskdata: Annotated[str, typer.Option()] = None,
+         state_file: Annotated[str, typer.Option(
+             "--state")] = "tbdoist_sync.json",
+         prefer: Annotated[str, typer.Option()] = "todoist"):
+    """ Sync tasks both ways with Taskwarrior."""
+    if TaskwarriorStore is None:
+        raise typer.BadParameter("Syncing needs the tbtw package.")
+    client = TodoistSyncClient(os.environ.get("TODOIST_API_KEY"),
+                               limiter=state["client"].limiter,
+                               session=state["client"].session,
+                               trace=active_trace())
+    with SyncState(state_file) as sync_state:
+        summary = Syncer(client, TaskwarriorStore(taskdata), sync_state,
+                         prefer=prefer).sync()
+    print(f"{summary['todoist']} Todoist and {summary['taskwarrior']} "
+          f"Taskwarrior writes, {summary['conflicts']} conflicts, "
+          f"{len(summary['errors'])} errors")
+
+
+@ app.command()
+@ traced()
+def add(itemkind: str, content: str):
+    """ Add a task or project and put it in the loaded graph."""
     api = state["api"]
     print(f"Adding: {itemkind}")
+    match itemkind.lower():
+        case "task" | "tasks":
+            obj = api.add_task(content)
+            key = "tasks"
+        case "project" | "projects":
+            obj = api.add_project(content)
+            key = "projects"
+        case _:
+            raise typer.BadParameter(f"Cannot add {itemkind}.")
+
+    if state["workspace"] is not None:
+        state["workspace"][key].append(obj)
+    if state["graph"] is not None:
+        td_iter_to_graph([obj], g=state["graph"])
+        state["index"] = None
+        state["labels"] = None
+        state["table"] = None
+    if state["selection"] is not None:
+        state["selection"].append(obj.id)
 
 
 @ app.callback()
-def startup():
+def startup(ctx: typer.Context,
+            profile: Annotated[bool, typer.Option(
+                help="Print Todoist request counts and latencies "
+                     "per command at the end.")] = False):
     # I should be able to set up this to take it from the environment
     # or an argument, but it's taking the argument with the env variable
     # as the command.
     api_key = os.environ.get("TODOIST_API_KEY")
     print(api_key)
-    api = TodoistAPI(api_key)
-    state["api"] = api
-    return api
+    # Nothing loaded by an earlier run in this process is reused.
+    state.update(dict.fromkeys(state))
+    trace = None
+    if profile:
+        trace = start_trace()
+        ctx.call_on_close(lambda: print(stop_trace().table()))
+    client = AsyncTodoistClient(api_key, trace=trace)
+    state["client"] = client
+    # Synchronous calls share the client's pooled session.
+    state["api"] = client.api
+    return client.api
+
+
+def _nxutils():
+    if nxu is None:
+        raise ImportError("Task graphs need the nxutils package.")
+    return nxu
 
 
 def td_obj_to_node_and_edges(tdobj,
@@ -161,9 +424,10 @@ def td_obj_to_node_and_edges(tdobj,
                              **kwargs):
     """ A wrapper around nxutils.obj_to_node_and_edges to set todist defaults."""
 
-    return nxu.obj_to_node_and_edges(tdobj, "id",
-                                     parent_attr_list,
-                                     edge_attr_func=edge_attr_func, **kwargs)
+    return _nxutils().obj_to_node_and_edges(tdobj, "id",
+                                            parent_attr_list,
+                                            edge_attr_func=edge_attr_func,
+                                            **kwargs)
 
 
 def td_iter_to_graph(td_iter, g=None, **kwargs):
@@ -178,6 +442,43 @@ def td_iter_to_graph(td_iter, g=None, **kwargs):
 
     g.add_nodes_from(nodebunch)
     g.add_edges_from(edgebunch)
+    return g
+
+
+# Graphs with more nodes than this are drawn with WebGL.
+WEBGL_THRESHOLD = 1000
+
+
+def td_graph_to_traces(g, webgl=None, threshold=WEBGL_THRESHOLD, **kwargs):
+    """ A wrapper around nxutils.graph_to_traces for large graphs.
+
+    Above `threshold` nodes, or when `webgl` is True, the `Scatter`
+    traces become `Scattergl`. Coordinates are passed as float64 arrays,
+    which plotly sends binary encoded, with the `None` breaks between
+    edges as NaN.
+
+    Returns:
+        dict of plotly traces by name, as `nxutils.graph_to_traces`
+        gives them: "nodes", the node markers, "edges", one line per
+        edge between breaks, and "arrows", markers at the edge heads.
+        Add them with `fig.add_traces(list(traces.values()))`.
+    """
+    # Imported here so the CLI starts without plotly.
+    import plotly.graph_objects as go
+
+    traces = _nxutils().graph_to_traces(g, **kwargs)
+    if webgl is None:
+        webgl = len(g) > threshold
+    for name, trace in traces.items():
+        if not isinstance(trace, go.Scatter):
+            continue
+        data = trace.to_plotly_json()
+        data.pop("type", None)
+        for axis in ["x", "y"]:
+            if data.get(axis) is not None:
+                data[axis] = np.array(data[axis], dtype=np.float64)
+        traces[name] = go.Scattergl(data) if webgl else go.Scatter(data)
+    return traces
 
 
 def td_obj_to_nb_graph(tdapi, obj):
@@ -207,14 +508,12 @@ def is_in_section(obj):
 
 def td_g_filter_factory(g):
     def filter(u, v):
-        obj = g.nodes[u]["obj"]
-        parent_obj = g.nodes[v]["obj"]
+        obj = g.nodes[u].get("obj")
+        parent_obj = g.nodes[v].get("obj")
 
         if isinstance(obj, Task):
             if is_subtask(obj):
                 if isinstance(parent_obj, Task):
-                    print(
-                        f"keeping subtask {obj.content} of supertask {parent_obj.content}")
                     return True
                 else:
                     return False
@@ -258,7 +557,18 @@ def td_diGraph_to_richTree(g, **kwargs):
     # The filter needs the non-reversed view,
     # but diGraph_to_richTree needs the reversed view.
     rev = td_g_to_tree_view(g)
-    return nxu.diGraph_to_richTree(rev, label_func=td_g_label_func)
+    return _nxutils().diGraph_to_richTree(rev, label_func=td_g_label_func)
+
+
+def td_stream_tree(g, labels=None, **kwargs):
+    """ Write the tree view of `g` as it is walked.
+
+    Unlike `td_diGraph_to_richTree` nothing is built before the first line
+    is printed. Keywords are passed to `show.stream_tree`.
+    """
+    if labels is None:
+        labels = label_column(g)
+    return stream_tree(td_g_to_tree_view(g), labels=labels, **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+from .tinytd import SyncState
+
+__all__ = ["SyncState"]
@@ -0,0 +1,94 @@
+""" Local sync state kept in a TinyDB file.
+
+One document per linked pair of todoist item and Taskwarrior task holds
+their ids, the last record both sides agreed on and its hash. A second
+table holds the Todoist sync token and the time of the last Taskwarrior
+export. Everything is read into memory when the store is opened and
+written back in one go by `save`. TinyDB rewrites its whole file on each
+insert, so saving pair by pair would be slow.
+"""
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+
+__all__ = ["SyncState"]
+
+
+class SyncState:
+    """ Pairs of linked tasks and the markers of the last sync.
+
+    Parameters:
+        path: TinyDB JSON file. `None` keeps the state in memory.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            self.db = TinyDB(storage=MemoryStorage)
+        else:
+            self.db = TinyDB(path)
+        self.pairs = {}
+        self.by_uuid = {}
+        for doc in self.db.table("pairs").all():
+            self._link(dict(doc))
+        meta = self.db.table("meta").all()
+        self.meta = dict(meta[0]) if meta else {}
+        self.dirty = False
+
+    def _link(self, pair):
+        self.pairs[pair["todoist_id"]] = pair
+        self.by_uuid[pair["uuid"]] = pair
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def get(self, todoist_id=None, uuid=None):
+        """ Return the pair for either id, or None."""
+        if todoist_id is not None:
+            return self.pairs.get(todoist_id)
+        return self.by_uuid.get(uuid)
+
+    def put(self, todoist_id, uuid, record, digest):
+        """ Link `todoist_id` and `uuid` and record what they agree on."""
+        old = self.pairs.get(todoist_id)
+        if old is not None and old["uuid"] != uuid:
+            self.by_uuid.pop(old["uuid"], None)
+        self._link({"todoist_id": todoist_id, "uuid": uuid,
+                    "record": record, "hash": digest})
+        self.dirty = True
+
+    def drop(self, pair):
+        """ Forget a pair after both sides are deleted."""
+        self.pairs.pop(pair["todoist_id"], None)
+        self.by_uuid.pop(pair["uuid"], None)
+        self.dirty = True
+
+    def set_meta(self, **values):
+        if any(self.meta.get(k) != v for k, v in values.items()):
+            self.meta.update(values)
+            self.dirty = True
+
+    def save(self):
+        """ Write the state back if anything changed."""
+        if not self.dirty:
+            return
+        pairs = self.db.table("pairs")
+        pairs.truncate()
+        pairs.insert_multiple(self.pairs.values())
+        meta = self.db.table("meta")
+        meta.truncate()
+        meta.insert(self.meta)
+        self.dirty = False
+
+    def close(self):
+        self.save()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # A sync that failed part way must not record what it did not do.
+        if exc_type is None:
+            self.close()
+        else:
+            self.db.close()
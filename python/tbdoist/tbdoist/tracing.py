@@ -0,0 +1,246 @@
+""" Count and time the requests tbdoist makes to Todoist.
+
+A `RequestTrace` records each API call by method name. For every call it
+keeps a count, a latency histogram, the urllib3 retries, and the bytes
+sent and received. Each call is filed under the scope that was open when
+it ran: the CLI command, or a library function wrapped with `traced`.
+A `get_task` counted once per task under one scope is an N+1 pattern
+worth batching.
+
+Calls are only traced on a client given the trace, or on an API wrapped
+with `RequestTrace.wrap`. `traced` functions check one dict entry when
+no trace is active.
+
+    >>> trace = start_trace()
+    >>> client = AsyncTodoistClient(token, trace=trace)
+    >>> print(trace.table())
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlparse
+
+from rich.table import Table
+
+from .client import REQUEST_LIMIT
+
+
+__all__ = ["BUCKETS", "RequestTrace", "TracedApi", "start_trace",
+           "stop_trace", "active_trace", "traced"]
+
+
+# Upper bounds of the latency histogram buckets, in milliseconds. A call
+# of exactly 25 ms goes in the "<50" bucket, as the labels say.
+BUCKETS = (25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+_BUCKET_LABELS = [f"<{b:g}" for b in BUCKETS[:-1]] + [f">{BUCKETS[-2]:g}"]
+
+_active = {"trace": None}
+
+
+def _size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        # Streamed bodies have no length.
+        return 0
+
+
+class TracedApi:
+    """ A `TodoistAPI` whose method calls are recorded in a trace."""
+
+    def __init__(self, api, trace):
+        self._api = api
+        self._trace = trace
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with self._trace.call(name):
+                return attr(*args, **kwargs)
+        return call
+
+
+class RequestTrace:
+    """ Per scope and method request counts, latencies, retries and bytes.
+
+    Safe to share between the worker threads of one run. Open scopes are
+    kept in a context variable, so threads and asyncio tasks each see
+    their own. `asyncio.to_thread` runs its worker in a copy of the
+    caller's context; pool tasks get the same by being submitted through
+    `contextvars.copy_context().run`, as `relink.apply_relinks` does.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._scopes = contextvars.ContextVar("scopes", default=())
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def scope(self, name):
+        """ File the calls made inside the block under `name`."""
+        token = self._scopes.set(self._scopes.get() + (name,))
+        try:
+            yield
+        finally:
+            self._scopes.reset(token)
+
+    @property
+    def current_scope(self):
+        return " > ".join(self._scopes.get()) or "-"
+
+    @contextmanager
+    def call(self, name):
+        """ Record the block as one call of `name`.
+
+        Retries and bytes of the HTTP responses seen on this thread while
+        the block runs are added to the call.
+        """
+        outer = getattr(self._local, "call", None)
+        extra = self._local.call = {"retries": 0, "sent": 0, "received": 0}
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._local.call = outer
+            self.record(name, time.perf_counter() - t0, failed=failed,
+                        **extra)
+
+    def record(self, name, seconds, retries=0, sent=0, received=0,
+               failed=False):
+        key = (self.current_scope, name)
+        with self._lock:
+            try:
+                stat = self.stats[key]
+            except KeyError:
+                stat = self.stats[key] = {"count": 0, "seconds": 0.0,
+                                          "max": 0.0, "retries": 0,
+                                          "failed": 0, "sent": 0,
+                                          "received": 0,
+                                          "histogram": [0] * len(BUCKETS)}
+            stat["count"] += 1
+            stat["seconds"] += seconds
+            stat["max"] = max(stat["max"], seconds)
+            stat["retries"] += retries
+            stat["failed"] += failed
+            stat["sent"] += sent
+            stat["received"] += received
+            stat["histogram"][bisect_right(BUCKETS, seconds * 1000)] += 1
+
+    def _on_response(self, response, *args, **kwargs):
+        retries = getattr(getattr(response.raw, "retries", None), "history",
+                          ())
+        sent = _size(response.request.body)
+        received = len(response.content)
+        extra = getattr(self._local, "call", None)
+        if extra is None:
+            # A request made straight on the session.
+            path = urlparse(response.request.url).path
+            self.record(f"{response.request.method} {path}",
+                        response.elapsed.total_seconds(), len(retries), sent,
+                        received, not response.ok)
+        else:
+            extra["retries"] += len(retries)
+            extra["sent"] += sent
+            extra["received"] += received
+
+    def watch(self, session):
+        """ Add retries and bytes from `session`'s responses to the trace."""
+        if self._on_response not in session.hooks["response"]:
+            session.hooks["response"].append(self._on_response)
+        return session
+
+    def wrap(self, api):
+        """ Return `api` with every method call recorded."""
+        if isinstance(api, TracedApi):
+            return api
+        return TracedApi(api, self)
+
+    def summary(self):
+        """ Return one dict per scope and call, busiest first."""
+        with self._lock:
+            rows = [{"scope": scope, "call": name, **stat,
+                     "histogram": list(stat["histogram"])}
+                    for (scope, name), stat in self.stats.items()]
+        rows.sort(key=lambda r: (-r["count"], r["scope"], r["call"]))
+        return rows
+
+    def total(self):
+        with self._lock:
+            return sum(s["count"] for s in self.stats.values())
+
+    def table(self):
+        """ Return the summary as a `rich.table.Table`."""
+        total = self.total()
+        budget = REQUEST_LIMIT * 15 * 60
+        table = Table(title="Todoist requests",
+                      caption=f"{total} requests, {total / budget:.0%} of "
+                              f"the 15 minute budget")
+        for column in ["scope", "call", "count", "mean ms", "max ms",
+                       "retries", "failed", "sent", "received"]:
+            table.add_column(column, justify="left" if column in (
+                "scope", "call") else "right")
+        table.add_column("histogram (ms)")
+        for row in self.summary():
+            histogram = " ".join(f"{label}:{n}" for label, n in zip(
+                _BUCKET_LABELS, row["histogram"]) if n)
+            table.add_row(row["scope"], row["call"], str(row["count"]),
+                          f"{row['seconds'] / row['count'] * 1000:.0f}",
+                          f"{row['max'] * 1000:.0f}", str(row["retries"]),
+                          str(row["failed"]), str(row["sent"]),
+                          str(row["received"]), histogram)
+        return table
+
+
+def start_trace(trace=None):
+    """ Make `trace`, or a new `RequestTrace`, the one `traced` files into."""
+    if trace is None:
+        trace = RequestTrace()
+    _active["trace"] = trace
+    return trace
+
+
+def stop_trace():
+    """ Stop filing scopes and return the trace that was active."""
+    trace = _active["trace"]
+    _active["trace"] = None
+    return trace
+
+
+def active_trace():
+    return _active["trace"]
+
+
+def traced(name=None):
+    """ Decorator opening a scope of the active trace around a function.
+
+    Parameters:
+        name: scope name. Default is the function name.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _active["trace"]
+            if trace is None:
+                return func(*args, **kwargs)
+            with trace.scope(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
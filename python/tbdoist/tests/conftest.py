@@ -0,0 +1,172 @@
+""" A fake Todoist server for the tests. Nothing here goes online.
+
+`FakeTodoist` is mounted on the pooled `requests.Session` in place of the
+HTTP adapter. It answers the REST v2 calls `TodoistAPI` makes, and Sync
+API posts, from plain dicts, and records every request.
+
+`nxutils` is a local path dependency. `fake_nxutils` stands in for the
+parts of it that turn objects into graph nodes and edges, and graphs
+into plotly traces.
+"""
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import plotly.graph_objects as go
+import pytest
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+
+from tbdoist import client
+
+
+def task_json(id, content="task", project_id="p1", **fields):
+    task = {"id": id, "content": content, "project_id": project_id,
+            "section_id": None, "parent_id": None, "order": 1,
+            "priority": 1, "labels": [], "is_completed": False,
+            "comment_count": 0, "created_at": "2024-01-01T00:00:00Z",
+            "creator_id": "u1", "description": "", "due": None,
+            "duration": None, "url": f"https://todoist.com/t/{id}",
+            "assignee_id": None, "assigner_id": None}
+    task.update(fields)
+    return task
+
+
+def project_json(id, name, parent_id=None):
+    return {"id": id, "name": name, "color": "grey", "comment_count": 0,
+            "is_favorite": False, "is_inbox_project": False,
+            "is_shared": False, "is_team_inbox": False,
+            "can_assign_tasks": False, "order": 1, "parent_id": parent_id,
+            "url": f"https://todoist.com/p/{id}", "view_style": "list"}
+
+
+def section_json(id, name, project_id):
+    return {"id": id, "name": name, "order": 1, "project_id": project_id}
+
+
+class FakeTodoist(HTTPAdapter):
+    """ An adapter answering Todoist requests from memory.
+
+    Parameters:
+        tasks, projects, sections, labels: lists of API dicts.
+        sync: callable taking the posted form and returning the Sync API
+            response dict.
+        statuses: status codes to answer with, in order, before the
+            normal answers, e.g. `[429]`.
+    """
+
+    def __init__(self, tasks=(), projects=(), sections=(), labels=(),
+                 sync=None, statuses=()):
+        super().__init__()
+        self.data = {"tasks": list(tasks), "projects": list(projects),
+                     "sections": list(sections), "labels": list(labels)}
+        self.sync = sync
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def _answer(self, request):
+        url = urlparse(request.url)
+        if url.path.startswith("/sync/"):
+            return self.sync(parse_qs(request.body))
+        kind, _, rest = url.path.removeprefix("/rest/v2/").partition("/")
+        if request.method == "POST":
+            obj = {"tasks": task_json, "projects": project_json}[kind](
+                str(len(self.data[kind]) + 100), **_named(request.body))
+            self.data[kind].append(obj)
+            return obj
+        if rest:
+            return next(o for o in self.data[kind] if o["id"] == rest)
+        query = parse_qs(url.query)
+        if "ids" in query:
+            ids = query.pop("ids")[0].split(",")
+            query["id"] = ids
+        return [o for o in self.data[kind]
+                if all(str(o.get(k)) in v for k, v in query.items())]
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.elapsed = timedelta(milliseconds=1)
+        response.headers["Content-Type"] = "application/json"
+        if self.statuses:
+            response.status_code = self.statuses.pop(0)
+            response._content = b"{}"
+        else:
+            response.status_code = 200
+            response._content = json.dumps(self._answer(request)).encode()
+        return response
+
+
+def _named(body):
+    data = json.loads(body)
+    if "name" in data:
+        return {"name": data["name"]}
+    return {"content": data["content"]}
+
+
+@pytest.fixture
+def workspace():
+    """ Two projects, a section, nested tasks and a label."""
+    return {"projects": [project_json("p1", "Home"),
+                         project_json("p2", "Work")],
+            "sections": [section_json("s1", "Garden", "p1")],
+            "tasks": [task_json("t1", "mow", "p1", section_id="s1"),
+                      task_json("t2", "edge", "p1", section_id="s1",
+                                parent_id="t1"),
+                      task_json("t3", "report", "p2", priority=4),
+                      task_json("t4", "email", "p2", labels=["quick"])],
+            "labels": [{"id": "l1", "name": "quick", "color": "red",
+                        "order": 1, "is_favorite": False}]}
+
+
+@pytest.fixture
+def fake_todoist(monkeypatch, workspace):
+    """ Route every pooled session to a `FakeTodoist` of `workspace`."""
+    fake = FakeTodoist(**workspace)
+    pooled = client.pooled_session
+
+    def session(*args, **kwargs):
+        s = pooled(*args, **kwargs)
+        s.mount("https://", fake)
+        return s
+
+    monkeypatch.setattr(client, "pooled_session", session)
+    return fake
+
+
+def _obj_to_node_and_edges(obj, id_attr, parent_attr_list,
+                           edge_attr_func=None, **kwargs):
+    """ Node `(id, {"obj": obj})` and an edge to each parent attribute."""
+    node_id = getattr(obj, id_attr)
+    edges = [(node_id, parent, edge_attr_func(obj) if edge_attr_func
+              else {})
+             for parent in (getattr(obj, a, None) for a in parent_attr_list)
+             if parent is not None]
+    return (node_id, {"obj": obj}), edges
+
+
+def _graph_to_traces(g, **kwargs):
+    """ "nodes", "edges" and "arrows" traces, laid out on a line."""
+    x = {n: float(i) for i, n in enumerate(g)}
+    edge_x = [v for u, w in g.edges for v in (x[u], x[w], None)]
+    return {"nodes": go.Scatter(x=list(x.values()), y=[0] * len(x),
+                                mode="markers", name="nodes", **kwargs),
+            "edges": go.Scatter(x=edge_x, y=[0 if v is not None else None
+                                             for v in edge_x],
+                                mode="lines", name="edges"),
+            "arrows": go.Scattergl(x=[x[w] for _, w in g.edges],
+                                   y=[0] * len(g.edges), mode="markers",
+                                   name="arrows")}
+
+
+@pytest.fixture
+def fake_nxutils(monkeypatch):
+    """ Install a stand-in for `nxutils` in the CLI module."""
+    from tbdoist import tbdoist
+    nxu = SimpleNamespace(obj_to_node_and_edges=_obj_to_node_and_edges,
+                          graph_to_traces=_graph_to_traces)
+    monkeypatch.setattr(tbdoist, "nxu", nxu)
+    return nxu
@@ -0,0 +1,141 @@
+import csv
+import io
+import random
+
+import pytest
+
+from tbdoist.aeon import AEON_COLUMNS, aeon_rows, write_aeon_csv
+
+from .conftest import task_json
+
+
+def _tree(n, seed=0):
+    """ `n` tasks in a random forest, each labelled by its id."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(n):
+        parent = f"t{rng.randrange(i)}" if i and rng.random() < .7 else None
+        tasks.append(task_json(f"t{i}", f"t{i}", parent_id=parent))
+    return tasks
+
+
+def _check_order(rows, tasks):
+    """ Every row once, and after its parent when it names one."""
+    seen = {}
+    for i, r in enumerate(rows):
+        assert r["Label"] not in seen
+        seen[r["Label"]] = i
+        if r["Parent"]:
+            assert seen[r["Parent"]] < i
+    assert len(seen) == len(tasks)
+    return seen
+
+
+@pytest.mark.parametrize("max_waiting", [0, 3, 10_000])
+def test_out_of_order_parents(max_waiting):
+    tasks = _tree(300)
+    shuffled = random.Random(1).sample(tasks, len(tasks))
+    rows = list(aeon_rows(shuffled, max_waiting=max_waiting))
+    _check_order(rows, tasks)
+    parents = {t["id"]: t["parent_id"] for t in tasks}
+    # No link is lost: every exported parent is named.
+    assert all(r["Parent"] == (parents[r["Label"]] or "") for r in rows)
+
+
+def test_children_first():
+    tasks = [task_json("c", "grandchild", parent_id="b"),
+             task_json("b", "child", parent_id="a"),
+             task_json("a", "parent")]
+    rows = list(aeon_rows(tasks))
+    assert [(r["Label"], r["Parent"]) for r in rows] == [
+        ("parent", ""), ("child", "parent"), ("grandchild", "child")]
+
+
+@pytest.mark.parametrize("max_waiting", [0, 10_000])
+def test_missing_parents(max_waiting):
+    # "x" is never exported; its descendants still come out in order.
+    tasks = [task_json("c", "c", parent_id="b"),
+             task_json("d", "d", parent_id="x"),
+             task_json("b", "b", parent_id="x"),
+             task_json("e", "e", parent_id="c")]
+    rows = list(aeon_rows(tasks, max_waiting=max_waiting))
+    seen = _check_order(rows, tasks)
+    parents = {r["Label"]: r["Parent"] for r in rows}
+    assert parents == {"b": "", "d": "", "c": "b", "e": "c"}
+    assert seen["b"] < seen["c"] < seen["e"]
+
+
+def test_cycle_is_cut():
+    tasks = [task_json("a", "a", parent_id="b"),
+             task_json("b", "b", parent_id="a")]
+    assert len(list(aeon_rows(tasks))) == 2
+
+
+def test_fields():
+    tasks = [task_json("a", "[`p`](u) :: write", priority=4,
+                       labels=["x", "y"], is_completed=True,
+                       due={"date": "2024-05-01",
+                            "datetime": "2024-05-01T13:00:00Z",
+                            "timezone": "America/New_York"},
+                       duration={"amount": 90, "unit": "minute"}),
+             task_json("b", "trip", due={"date": "2024-06-01"},
+                       duration={"amount": 2, "unit": "day"}),
+             task_json("c", "undated")]
+    a, b, c = aeon_rows(tasks)
+    assert a["Label"] == "write"
+    assert a["Start Date"] == "2024-05-01 09:00"
+    assert a["End Date"] == "2024-05-01 10:30"
+    assert a["Duration"] == "90 minutes"
+    assert a["Tags"] == "x\ny"
+    assert (a["Status"], a["Priority"]) == ("Completed", "Urgent")
+    assert (b["Start Date"], b["End Date"]) == ("2024-06-01",
+                                                 "2024-06-03 00:00")
+    assert c["Start Date"] == c["End Date"] == ""
+
+
+def _deps(rows):
+    return {r["Label"]: (r["Blocked by"], r["Blocks"]) for r in rows}
+
+
+def test_no_dependencies():
+    rows = list(aeon_rows(_tree(10)))
+    assert set(_deps(rows).values()) == {("", "")}
+
+
+def test_dependencies():
+    tasks = [task_json("a", "design"), task_json("b", "build"),
+             task_json("c", "test"), task_json("d", "ship")]
+    deps = [("a", "b"), ("b", "c"), ("a", "c"), ("x", "d")]
+    rows = list(aeon_rows(tasks, dependencies=deps))
+    # A row waits until every task it names has been seen, or the end:
+    # "design" and "build" name "test", "ship" names "x".
+    assert [r["Label"] for r in rows] == ["test", "design", "build", "ship"]
+    assert _deps(rows) == {"design": ("", "build\ntest"),
+                           "build": ("design", "test"),
+                           "test": ("build\ndesign", ""),
+                           # "x" was never exported.
+                           "ship": ("", "")}
+
+
+@pytest.mark.parametrize("max_waiting", [0, 10_000])
+def test_dependency_on_a_later_task(max_waiting):
+    tasks = [task_json("b", "build"), task_json("b1", "solder",
+                                                parent_id="b"),
+             task_json("z", "other"), task_json("a", "design")]
+    rows = list(aeon_rows(tasks, dependencies=[("a", "b")],
+                          max_waiting=max_waiting))
+    # "build" waits for the label of "design", and its child with it.
+    assert [(r["Label"], r["Parent"]) for r in rows] == [
+        ("other", ""), ("design", ""), ("build", ""), ("solder", "build")]
+    assert _deps(rows)["build"] == ("design", "")
+    assert _deps(rows)["design"] == ("", "build")
+
+
+def test_write_aeon_csv():
+    f = io.StringIO()
+    tasks = _tree(20)
+    assert write_aeon_csv(reversed(tasks), f) == 20
+    f.seek(0)
+    reader = csv.DictReader(f)
+    assert reader.fieldnames == AEON_COLUMNS
+    _check_order(list(reader), tasks)
@@ -0,0 +1,110 @@
+import pytest
+from todoist_api_python.models import Task
+
+from tbdoist.ancestry import AncestorIndex, DIVIDER, strip_header, task_link
+from tbdoist.modify import manage_supertask_link
+
+from .conftest import task_json
+
+
+def _task(id, content, parent_id=None):
+    return Task.from_dict(task_json(id, content, parent_id=parent_id))
+
+
+@pytest.mark.parametrize("title", ["plain", "run `make`", "a`b`c", "back\\",
+                                   "back\\`tick", "x] (y) :: z"])
+def test_header_round_trip(title):
+    link = task_link(_task("1", title))
+    content = DIVIDER.join([link, link, "body"])
+    assert strip_header(content) == "body"
+    assert strip_header("body") == "body"
+
+
+def test_relink_does_not_stack():
+    root = _task("1", "fix `parse()`")
+    child = _task("2", "write test", parent_id="1")
+    index = AncestorIndex.from_objects([root, child])
+    first = manage_supertask_link(None, child, update=False, index=index)
+    assert first["content"].endswith(DIVIDER + "write test")
+    child.content = first["content"]
+    # The header is current, so nothing changes the second time.
+    assert manage_supertask_link(None, child, update=False,
+                                 index=index) is None
+    root.content = "fix `parse()` again"
+    index = AncestorIndex.from_objects([root, child])
+    again = manage_supertask_link(None, child, update=False, index=index)
+    assert again["content"].count(DIVIDER) == 1
+    assert strip_header(again["content"]) == "write test"
+
+
+LEGACY = ("[`[`gp`](https://todoist.com/t/1) :: parent`]"
+          "(https://todoist.com/t/2) :: child")
+
+
+def test_strip_legacy_header():
+    # Links written before titles were escaped nest the parent's header.
+    assert strip_header(LEGACY) == "child"
+    assert strip_header("[`gp`](https://todoist.com/t/1) :: " + LEGACY) == \
+        "child"
+    # A link that is the whole content is not a header.
+    assert strip_header("[`gp`](https://todoist.com/t/1)") == \
+        "[`gp`](https://todoist.com/t/1)"
+
+
+def test_relink_legacy_header():
+    gp = _task("1", "gp")
+    parent = _task("2", "[`gp`](https://todoist.com/t/1) :: parent", "1")
+    child = _task("3", LEGACY, parent_id="2")
+    index = AncestorIndex.from_objects([gp, parent, child])
+    result = manage_supertask_link(None, child, update=False, index=index)
+    assert result["content"] == DIVIDER.join(
+        ["[`gp`](https://todoist.com/t/1)",
+         "[`parent`](https://todoist.com/t/2)", "child"])
+
+
+@pytest.fixture
+def index():
+    #  1 - 2 - 3
+    #    \ 4
+    #  5 - 6
+    tasks = [_task("1", "a"), _task("2", "b", "1"), _task("3", "c", "2"),
+             _task("4", "d", "1"), _task("5", "e"), _task("6", "f", "5")]
+    return AncestorIndex.from_objects(tasks)
+
+
+def test_paths(index):
+    assert index.path_to_root("3") == ("3", "2", "1")
+    assert index.path_to_root("1") == ("1",)
+    assert index.ancestors("6") == ("5",)
+    assert index.descendants("1") == ["2", "3", "4"]
+    assert index.descendants("3") == []
+    assert index.roots == ["1", "5"]
+    assert [index.depth(n) for n in "123456"] == [0, 1, 2, 1, 0, 1]
+
+
+def test_is_ancestor(index):
+    assert index.is_ancestor("1", "3")
+    assert index.is_ancestor("3", "3")
+    assert not index.is_ancestor("3", "1")
+    assert not index.is_ancestor("4", "3")
+    assert not index.is_ancestor("5", "3")
+
+
+def test_lca(index):
+    assert index.lca("3", "4") == "1"
+    assert index.lca("3", "2") == "2"
+    assert index.lca("3", "3") == "3"
+    assert index.lca("3", "6") is None
+
+
+def test_headers(index):
+    a, b = index.objs["1"], index.objs["2"]
+    assert index.header("3") == DIVIDER.join([task_link(a), task_link(b)])
+    assert index.header("4") == task_link(a)
+    assert index.header("1") is None
+
+
+def test_cycle_becomes_root():
+    index = AncestorIndex({"a": "b", "b": "a", "c": None})
+    assert index.roots == ["c", "a"]
+    assert index.path_to_root("b") == ("b", "a")
@@ -0,0 +1,70 @@
+import pytest
+from typer.testing import CliRunner
+
+from tbdoist import tbdoist as cli
+
+
+@pytest.fixture
+def run(fake_todoist):
+    runner = CliRunner()
+
+    def run(*args):
+        result = runner.invoke(cli.app, list(args))
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    return run
+
+
+def test_help():
+    result = CliRunner().invoke(cli.app, ["--help"])
+    assert result.exit_code == 0
+    for command in ["show", "filter", "relink", "render", "export", "sync",
+                    "add"]:
+        assert command in result.output
+
+
+def test_show_labels(run):
+    assert "quick" in run("show", "labels")
+
+
+def test_chained_filter(run):
+    output = run("filter", "--project", "Work", "filter", "--priority", "4")
+    assert "2 selected" in output
+    assert "1 selected" in output
+    assert cli.state["selection"] == ["t3"]
+
+
+def test_add_task(run, fake_todoist):
+    run("add", "task", "water plants")
+    assert fake_todoist.data["tasks"][-1]["content"] == "water plants"
+    assert cli.state["workspace"] is None
+
+
+def test_profile(run, fake_todoist):
+    output = run("--profile", "show", "labels")
+    assert "Todoist requests" in output
+    assert len(fake_todoist.requests) == 4
+
+
+def test_runs_do_not_share_state(run):
+    run("filter", "--project", "Work")
+    assert cli.state["selection"] == ["t3", "t4"]
+    run("show", "labels")
+    assert cli.state["selection"] is None
+
+
+def test_filter_unknown_name(fake_todoist):
+    runner = CliRunner()
+    result = runner.invoke(cli.app, ["filter", "--project", "Wrok"])
+    assert result.exit_code != 0
+    assert "Wrok" in result.output
+    result = runner.invoke(cli.app, ["filter", "--section", "Garden",
+                                     "--section", "Gardn"])
+    assert result.exit_code != 0
+    assert "Gardn" in result.output
+
+
+def test_filter_section(run):
+    run("filter", "--section", "Garden")
+    assert cli.state["selection"] == ["t1", "t2"]
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from tbdoist.client import (AsyncTodoistClient, RateLimiter, SYNC_BATCH,
+                            TodoistSyncClient, pooled_session)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+class Test_RateLimiter:
+    def test_burst_then_rate(self, clock):
+        limiter = RateLimiter(rate=10, burst=2)
+        assert [limiter._reserve() for _ in range(2)] == [0, 0]
+        # Later calls queue behind each other, one token per 0.1 s.
+        assert limiter._reserve() == pytest.approx(.1)
+        assert limiter._reserve() == pytest.approx(.2)
+
+    def test_refill(self, clock):
+        limiter = RateLimiter(rate=10, burst=2)
+        for _ in range(2):
+            limiter._reserve()
+        clock.now += .1
+        assert limiter._reserve() == pytest.approx(0)
+        assert limiter._reserve() == pytest.approx(.1)
+        # The bucket never holds more than `burst`.
+        clock.now += 60
+        assert [limiter._reserve() for _ in range(3)] == pytest.approx(
+            [0, 0, .1])
+
+    def test_shared_by_threads(self, clock):
+        limiter = RateLimiter(rate=1, burst=5)
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(
+            limiter._reserve())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(waits) == pytest.approx([0] * 5 + [1, 2, 3])
+
+    def test_acquire_async(self, monkeypatch):
+        slept = []
+
+        async def sleep(seconds):
+            slept.append(seconds)
+
+        monkeypatch.setattr(asyncio, "sleep", sleep)
+        limiter = RateLimiter(rate=1e-3, burst=1)
+
+        async def twice():
+            await limiter.acquire_async()
+            await limiter.acquire_async()
+
+        asyncio.run(twice())
+        assert slept[0] == 0
+        assert slept[1] == pytest.approx(1000, rel=1e-3)
+
+
+class Server:
+    """ A local HTTP server answering with queued statuses, then 200."""
+
+    def __init__(self, statuses=(), answer=None):
+        self.statuses = list(statuses)
+        self.answer = answer or (lambda form: {})
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode()
+                server.requests.append((self.command, body))
+                status = server.statuses.pop(0) if server.statuses else 200
+                data = json.dumps(server.answer(parse_qs(body))
+                                  if status == 200 else {}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/sync"
+        threading.Thread(target=self.httpd.serve_forever, args=(.01,),
+                         daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(*args, **kwargs):
+        servers.append(Server(*args, **kwargs))
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.close()
+
+
+def _fast():
+    return RateLimiter(rate=1e9, burst=1e9)
+
+
+class Test_pooled_session:
+    def test_retries_get_on_429(self, server):
+        s = server(statuses=[429, 503])
+        response = pooled_session().get(s.url)
+        assert response.status_code == 200
+        assert len(s.requests) == 3
+
+    def test_gives_up(self, server):
+        s = server(statuses=[429] * 5)
+        with pytest.raises(Exception):
+            pooled_session(retries=1).get(s.url).raise_for_status()
+        assert len(s.requests) == 2
+
+    def test_post_is_not_retried(self, server):
+        # Writes are not idempotent in general, so a 429 is surfaced.
+        s = server(statuses=[429])
+        assert pooled_session().post(s.url).status_code == 429
+        assert len(s.requests) == 1
+
+
+class Test_TodoistSyncClient:
+    def test_push_batches(self, server):
+        def answer(form):
+            commands = json.loads(form["commands"][0])
+            return {"temp_id_mapping": {c["temp_id"]: f"id-{c['temp_id']}"
+                                        for c in commands},
+                    "sync_status": {c["uuid"]: "ok" if c["args"]["n"] % 50
+                                    else {"error": "bad"}
+                                    for c in commands}}
+
+        s = server(answer=answer)
+        sync = TodoistSyncClient("token", url=s.url, limiter=_fast())
+        commands = [sync.command("item_add", {"n": i}, temp_id=str(i))
+                    for i in range(2 * SYNC_BATCH + 5)]
+        mapping, errors = sync.push(commands)
+        sizes = [len(json.loads(parse_qs(body)["commands"][0]))
+                 for _, body in s.requests]
+        assert sizes == [SYNC_BATCH, SYNC_BATCH, 5]
+        assert len(mapping) == len(commands)
+        assert mapping["7"] == "id-7"
+        assert set(errors) == {commands[i]["uuid"] for i in [0, 50, 100,
+                                                             150, 200]}
+
+    def test_pull_advances_token(self, server):
+        tokens = iter(["t1", "t2"])
+        s = server(answer=lambda form: {"sync_token": next(tokens),
+                                        "full_sync": form["sync_token"] ==
+                                        ["*"], "items": []})
+        sync = TodoistSyncClient("token", url=s.url, limiter=_fast())
+        assert sync.pull()["full_sync"]
+        assert sync.sync_token == "t1"
+        assert not sync.pull()["full_sync"]
+        assert sync.sync_token == "t2"
+
+    def test_every_request_takes_a_token(self, server, clock, monkeypatch):
+        s = server(answer=lambda form: {"sync_token": "t"})
+        slept = []
+        monkeypatch.setattr(time, "sleep", slept.append)
+        sync = TodoistSyncClient("token", url=s.url,
+                                 limiter=RateLimiter(rate=1, burst=2))
+        for _ in range(3):
+            sync.pull()
+        assert slept == pytest.approx([0, 0, 1])
+
+
+class Test_AsyncTodoistClient:
+    def test_load(self, fake_todoist, workspace):
+        with AsyncTodoistClient("token", limiter=_fast()) as td:
+            ws = td.load()
+        assert [t.id for t in ws["tasks"]] == ["t1", "t2", "t3", "t4"]
+        assert [p.name for p in ws["projects"]] == ["Home", "Work"]
+        assert len(fake_todoist.requests) == 4
+
+    def test_concurrency_is_bounded(self, fake_todoist):
+        td = AsyncTodoistClient("token", max_connections=2,
+                                limiter=_fast())
+        running = []
+        peak = []
+        get_tasks = td.api.get_tasks
+
+        def slow(**kwargs):
+            running.append(1)
+            peak.append(len(running))
+            time.sleep(.02)
+            running.pop()
+            return get_tasks(**kwargs)
+
+        td.api.get_tasks = slow
+
+        async def many():
+            return await asyncio.gather(*(td.get_tasks() for _ in range(6)))
+
+        assert len(asyncio.run(many())) == 6
+        assert max(peak) <= 2
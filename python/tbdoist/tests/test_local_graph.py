@@ -0,0 +1,98 @@
+import pytest
+from todoist_api_python.api import TodoistAPI
+from todoist_api_python.models import Project, Section
+
+from tbdoist import client
+from tbdoist.tbdoist import TdCache, build_local_graph
+
+from .conftest import project_json, section_json, task_json
+
+
+@pytest.fixture
+def workspace():
+    #  Root > Home > Garden > a > b > c > d
+    #                           > e
+    #         Home > f
+    #  Work > g
+    return {"projects": [project_json("P0", "Root"),
+                         project_json("P1", "Home", parent_id="P0"),
+                         project_json("P2", "Work")],
+            "sections": [section_json("S1", "Garden", "P1")],
+            "tasks": [task_json("a", "a", "P1", section_id="S1"),
+                      task_json("b", "b", "P1", section_id="S1",
+                                parent_id="a"),
+                      task_json("c", "c", "P1", section_id="S1",
+                                parent_id="b"),
+                      task_json("d", "d", "P1", section_id="S1",
+                                parent_id="c"),
+                      task_json("e", "e", "P1", section_id="S1",
+                                parent_id="a"),
+                      task_json("f", "f", "P1"),
+                      task_json("g", "g", "P2")],
+            "labels": []}
+
+
+@pytest.fixture
+def api(fake_todoist, fake_nxutils):
+    return TodoistAPI("token", session=client.pooled_session())
+
+
+def _kept(g):
+    """ Return the nodes kept; their parents also show up as edge ends."""
+    return {n for n, data in g.nodes(data=True) if "obj" in data}
+
+
+def _paths(fake_todoist):
+    return [r.path_url for r in fake_todoist.requests]
+
+
+def test_neighbourhood(api, fake_todoist):
+    g = build_local_graph(api, "b")
+    assert _kept(g) == {"b", "a", "e", "c", "d", "S1", "P1", "P0"}
+    assert g.edges["b", "a"] == {"type": "Task"}
+    # The task, the project's tasks and sections, and one request per
+    # project level.
+    assert _paths(fake_todoist) == ["/rest/v2/tasks/b",
+                                    "/rest/v2/tasks?project_id=P1",
+                                    "/rest/v2/sections?project_id=P1",
+                                    "/rest/v2/projects/P1",
+                                    "/rest/v2/projects/P0"]
+
+
+def test_depth_limit(api):
+    assert _kept(build_local_graph(api, "b", k=1)) == {"b", "a", "e", "c"}
+    assert _kept(build_local_graph(api, "b", k=0)) == {"b", "e"}
+
+
+def test_siblings(api):
+    # f hangs from the project, beside the section.
+    assert _kept(build_local_graph(api, "f", k=1)) == {"f", "S1", "P1"}
+
+
+def test_section(api, fake_todoist):
+    section = Section.from_dict(section_json("S1", "Garden", "P1"))
+    g = build_local_graph(api, section)
+    assert _kept(g) == {"S1", "f", "a", "b", "c", "d", "e", "P1", "P0"}
+    assert len(fake_todoist.requests) == 4
+
+
+def test_project(api, fake_todoist):
+    project = Project.from_dict(project_json("P1", "Home", parent_id="P0"))
+    g = build_local_graph(api, project, k=1)
+    assert _kept(g) == {"P1", "P0", "S1", "f"}
+    # The project given is not fetched again.
+    assert "/rest/v2/projects/P1" not in _paths(fake_todoist)
+
+
+def test_cache_reuse(api, fake_todoist):
+    cache = TdCache()
+    build_local_graph(api, "b", cache=cache)
+    n = len(fake_todoist.requests)
+    g = build_local_graph(api, "e", k=1, cache=cache)
+    assert _kept(g) == {"e", "b", "a"}
+    assert len(fake_todoist.requests) == n
+
+
+def test_bad_type(api):
+    with pytest.raises(TypeError):
+        build_local_graph(api, 42)
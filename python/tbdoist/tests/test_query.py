@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from tbdoist.query import Query
+from tbdoist.table import TaskTable
+
+from .conftest import task_json
+
+
+@pytest.fixture
+def table():
+    return TaskTable.from_objects([
+        task_json("a", project_id="p1", priority=4, labels=["home"],
+                  due={"date": "2024-05-01", "is_recurring": False,
+                       "string": "May 1"}),
+        task_json("b", project_id="p1", parent_id="a", section_id="s1",
+                  labels=["home", "quick"]),
+        task_json("c", project_id="p2", is_completed=True,
+                  due={"date": "2024-07-01",
+                       "datetime": "2024-07-01T09:00:00Z",
+                       "is_recurring": True, "string": "every July"},
+                  duration={"amount": 2, "unit": "day"}),
+        {"id": "p3", "name": "not a task"}])
+
+
+class Test_TaskTable:
+    def test_columns(self, table):
+        assert len(table) == 3
+        assert list(table.id) == ["a", "b", "c"]
+        assert list(table.parent) == [-1, 0, -1]
+        assert table.row_of == {"a": 0, "b": 1, "c": 2}
+        assert table.due_date[0] == np.datetime64("2024-05-01")
+        assert np.isnat(table.due_date[1])
+        assert table.due_datetime[2] == np.datetime64("2024-07-01T09:00:00")
+        assert table.duration[2] == 2 * 24 * 60
+        assert np.isnan(table.duration[0])
+
+    def test_row(self, table):
+        row = table.row(1)
+        assert row["project"] == "p1"
+        assert row["section"] == "s1"
+        assert row["parent"] == "a"
+        assert row["labels"] == ["home", "quick"]
+        assert table.row(2)["section"] is None
+
+    def test_to_dataframe(self, table):
+        df = table.to_dataframe()
+        assert list(df["project_id"]) == ["p1", "p1", "p2"]
+        assert list(df["parent_id"].isna()) == [True, False, True]
+        assert df["parent_id"][1] == "a"
+
+
+class Test_Query:
+    def test_predicates(self, table):
+        assert list(Query(project="p1").ids(table)) == ["a", "b"]
+        assert list(Query(section=[None]).ids(table)) == ["a", "c"]
+        assert list(Query(label="quick").ids(table)) == ["b"]
+        assert list(Query(label=["home", "quick"]).ids(table)) == ["a", "b"]
+        assert list(Query(priority=4).ids(table)) == ["a"]
+        assert list(Query(completed=False).ids(table)) == ["a", "b"]
+        assert list(Query(has_parent=True).ids(table)) == ["b"]
+        assert list(Query(due_after="2024-06-01").ids(table)) == ["c"]
+        assert list(Query(due_before="2024-06-01").ids(table)) == ["a"]
+
+    def test_unknown_values_match_nothing(self, table):
+        assert len(Query(project=[]).ids(table)) == 0
+        assert len(Query(project="p9").ids(table)) == 0
+        assert len(Query(label="nope").ids(table)) == 0
+
+    def test_and(self, table):
+        q = Query(project="p1") & Query(has_parent=False)
+        assert list(q.rows(table)) == [0]
+        with pytest.raises(ValueError):
+            q & Query(project="p2")
+        with pytest.raises(TypeError):
+            Query(colour="red")
+
+    def test_none_is_no_predicate(self, table):
+        assert Query(project=None).predicates == {}
+        assert Query().mask(table).all()
@@ -0,0 +1,111 @@
+import pytest
+from requests.exceptions import HTTPError
+from todoist_api_python.models import Task
+
+from tbdoist import client
+from tbdoist.ancestry import AncestorIndex, DIVIDER, task_link
+from tbdoist.modify import manage_supertask_links
+from tbdoist.relink import Checkpoint, apply_relinks, relink_diff
+
+from .conftest import task_json
+
+
+class FakeApi:
+    """ `get_tasks` and `update_task` over a dict, failing for `broken`."""
+
+    def __init__(self, tasks, broken=()):
+        self.tasks = {t.id: t for t in tasks}
+        self.broken = set(broken)
+        self.updated = []
+
+    def get_tasks(self, ids=None, **filters):
+        return [self.tasks[i] for i in ids]
+
+    def get_task(self, task_id):
+        return self.tasks[task_id]
+
+    def update_task(self, task_id, content=None):
+        if task_id in self.broken:
+            raise HTTPError(f"{task_id} is broken")
+        self.updated.append(task_id)
+        self.tasks[task_id].content = content
+        return self.tasks[task_id]
+
+
+@pytest.fixture
+def tasks():
+    root = Task.from_dict(task_json("r", "root"))
+    return [root] + [Task.from_dict(task_json(f"c{i}", f"child {i}",
+                                              parent_id="r"))
+                     for i in range(6)]
+
+
+def _fast():
+    return client.RateLimiter(rate=1e9, burst=1e9)
+
+
+def test_diff(tasks):
+    changes = relink_diff(None, tasks, index=AncestorIndex.from_objects(tasks))
+    assert [c["id"] for c in changes] == [f"c{i}" for i in range(6)]
+    assert changes[0]["content"] == DIVIDER.join([task_link(tasks[0]),
+                                                  "child 0"])
+
+
+def test_checkpoint_resume(tasks, tmp_path):
+    path = tmp_path / "relink.jsonl"
+    changes = relink_diff(None, tasks, index=AncestorIndex.from_objects(tasks))
+    api = FakeApi(tasks, broken={"c2", "c4"})
+    summary = apply_relinks(api, changes, max_workers=3, limiter=_fast(),
+                            checkpoint=str(path))
+    assert summary["applied"] == 4
+    assert sorted(i for i, _ in summary["failed"]) == ["c2", "c4"]
+    assert len(Checkpoint(path)) == 4
+
+    # A run killed mid-write leaves a partial line; it is ignored.
+    with open(path, "a") as f:
+        f.write('{"id": "c2", "cont')
+    api = FakeApi(tasks)
+    summary = apply_relinks(api, changes, limiter=_fast(),
+                            checkpoint=str(path))
+    assert summary["skipped"] == 4
+    assert sorted(api.updated) == ["c2", "c4"]
+
+    # A change whose content moved on since is applied again.
+    moved = dict(changes[0], content="other" + changes[0]["content"])
+    api = FakeApi(tasks)
+    summary = apply_relinks(api, changes + [moved], limiter=_fast(),
+                            checkpoint=str(path))
+    assert summary["skipped"] == len(changes)
+    assert api.updated == ["c0"]
+
+
+def test_default_limiter_is_shared(tasks, monkeypatch):
+    acquired = []
+    monkeypatch.setattr(client.shared_limiter(), "acquire",
+                        lambda: acquired.append(1))
+    changes = relink_diff(None, tasks, index=AncestorIndex.from_objects(tasks))
+    apply_relinks(FakeApi(tasks), changes)
+    assert len(acquired) == len(changes)
+    assert client.AsyncTodoistClient("t").limiter is client.shared_limiter()
+
+
+def test_manage_supertask_links_results(tasks):
+    api = FakeApi(tasks)
+    index = AncestorIndex.from_objects(tasks)
+    results = manage_supertask_links(api, tasks, index=index,
+                                     limiter=_fast())
+    assert results[0] is None
+    assert [r.id for r in results[1:]] == [f"c{i}" for i in range(6)]
+    # Everything is current now.
+    assert manage_supertask_links(api, tasks, index=index,
+                                  limiter=_fast()) == [None] * 7
+    assert manage_supertask_links(api, tasks, update=False,
+                                  index=index) == [None] * 7
+
+
+def test_manage_supertask_links_raises(tasks):
+    api = FakeApi(tasks, broken={"c3"})
+    with pytest.raises(HTTPError):
+        manage_supertask_links(api, tasks, limiter=_fast(),
+                               index=AncestorIndex.from_objects(tasks))
+    assert len(api.updated) == 5
@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+import pytest
+
+from tbdoist.schedule import Schedule
+
+
+@pytest.fixture
+def plan():
+    #   a(3) -> b(2) -> d(4)
+    #   a(3) -> c(1) -> d(4)
+    #   e(1), unrelated
+    return Schedule("abcde", [3, 2, 1, 4, 1],
+                    [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+
+
+def _same(s, fresh):
+    for k in ["es", "ef", "ls", "lf", "slack"]:
+        np.testing.assert_allclose(getattr(s, k), getattr(fresh, k),
+                                   err_msg=k)
+    assert s.end == fresh.end
+
+
+def _fresh(s):
+    return Schedule(s.ids, s.duration,
+                    [(s.ids[a], s.ids[b]) for a, b in s._edges])
+
+
+def test_passes(plan):
+    np.testing.assert_array_equal(plan.es, [0, 3, 3, 5, 0])
+    np.testing.assert_array_equal(plan.ef, [3, 5, 4, 9, 1])
+    assert plan.end == 9
+    np.testing.assert_array_equal(plan.lf, [3, 5, 5, 9, 9])
+    np.testing.assert_array_equal(plan.ls, [0, 3, 4, 5, 8])
+    np.testing.assert_array_equal(plan.slack, [0, 0, 1, 0, 8])
+    assert plan.times("c") == {"es": 3, "ef": 4, "ls": 4, "lf": 5,
+                               "slack": 1}
+
+
+def test_critical_path(plan):
+    assert plan.critical_path() == ["a", "b", "d"]
+    assert list(plan.critical()) == [True, True, False, True, False]
+    assert Schedule([], []).critical_path() == []
+
+
+def test_nan_duration():
+    s = Schedule("ab", [np.nan, 2], [("a", "b")])
+    assert s.end == 2
+
+
+def test_cycle():
+    with pytest.raises(ValueError):
+        Schedule("ab", [1, 1], [("a", "b"), ("b", "a")])
+
+
+def test_set_duration(plan):
+    plan.set_duration("c", 5)
+    _same(plan, _fresh(plan))
+    assert plan.critical_path() == ["a", "c", "d"]
+    plan.set_duration("d", 0)
+    _same(plan, _fresh(plan))
+
+
+def test_add_dependency(plan):
+    plan.add_dependency("e", "a")
+    _same(plan, _fresh(plan))
+    assert plan.critical_path() == ["e", "a", "b", "d"]
+
+
+def test_add_dependency_cycle(plan):
+    before = {k: getattr(plan, k).copy() for k in ["es", "ls", "pos"]}
+    with pytest.raises(ValueError):
+        plan.add_dependency("d", "a")
+    with pytest.raises(ValueError):
+        plan.add_dependency("b", "b")
+    for k, v in before.items():
+        np.testing.assert_array_equal(getattr(plan, k), v)
+    assert ("d", "a") not in [(plan.ids[a], plan.ids[b])
+                              for a, b in plan._edges]
+
+
+def test_remove_dependency(plan):
+    plan.remove_dependency("b", "d")
+    _same(plan, _fresh(plan))
+    assert plan.critical_path() == ["a", "c", "d"]
+    plan.remove_dependency("b", "d")
+
+
+def test_recompute_after_edits(plan):
+    plan.add_dependency("d", "e")
+    plan.remove_dependency("a", "c")
+    fresh = _fresh(plan)
+    plan.recompute()
+    _same(plan, fresh)
+    np.testing.assert_array_equal(plan.level, fresh.level)
+
+
+def test_random_edits():
+    rng = random.Random(7)
+    n = 40
+    s = Schedule(range(n), [rng.randint(0, 9) for _ in range(n)])
+    for _ in range(300):
+        a, b = rng.sample(range(n), 2)
+        if rng.random() < .3 and s._edges:
+            a, b = rng.choice(sorted(s._edges))
+            s.remove_dependency(a, b)
+        elif rng.random() < .2:
+            s.set_duration(a, rng.randint(0, 9))
+        else:
+            try:
+                s.add_dependency(a, b)
+            except ValueError:
+                pass
+        # Positions stay a topological order.
+        assert all(s.pos[a] < s.pos[b] for a, b in s._edges)
+        _same(s, _fresh(s))
@@ -0,0 +1,236 @@
+import pytest
+
+from tbdoist.client import TodoistSyncClient
+from tbdoist.sync import Syncer, UDA, merge, td_record, tw_record
+from tbdoist.tinytd import SyncState
+
+
+def record(**fields):
+    r = {"content": "mow", "completed": False, "deleted": False,
+         "due": None, "priority": 1, "labels": [], "project": None}
+    r.update(fields)
+    return r
+
+
+class Test_merge:
+    def test_one_side(self):
+        base = record()
+        merged, conflicts = merge(base, record(content="mow lawn"),
+                                  record(priority=4))
+        assert merged == record(content="mow lawn", priority=4)
+        assert conflicts == []
+
+    def test_same_change(self):
+        base = record()
+        merged, conflicts = merge(base, record(due="2024-05-01"),
+                                  record(due="2024-05-01"))
+        assert merged == record(due="2024-05-01")
+        assert conflicts == []
+
+    @pytest.mark.parametrize("prefer, content", [("todoist", "a"),
+                                                 ("taskwarrior", "b")])
+    def test_conflict(self, prefer, content):
+        merged, conflicts = merge(record(), record(content="a", priority=2),
+                                  record(content="b"), prefer)
+        assert merged == record(content=content, priority=2)
+        assert conflicts == ["content"]
+
+    def test_no_base(self):
+        merged, conflicts = merge(None, record(content="a"),
+                                  record(content="b"), "taskwarrior")
+        assert merged["content"] == "b"
+        assert conflicts == ["content"]
+
+
+def item(id, content="mow", project_id="p0", **fields):
+    return {"id": id, "content": content, "project_id": project_id,
+            "checked": False, "is_deleted": False, "due": None,
+            "priority": 1, "labels": [], **fields}
+
+
+class FakeSync:
+    """ Stands in for `TodoistSyncClient`, holding items in memory."""
+
+    command = staticmethod(TodoistSyncClient.command)
+
+    def __init__(self, items=(), projects=()):
+        self.sync_token = "*"
+        self.changed = list(items)
+        self.projects = [{"id": "p0", "name": "Inbox",
+                          "inbox_project": True}, *projects]
+        self.pushed = []
+        self.n = 0
+
+    def pull(self):
+        full = self.sync_token == "*"
+        pulled = {"sync_token": "t", "full_sync": full,
+                  "items": self.changed,
+                  "projects": self.projects if full else []}
+        self.sync_token = "t"
+        self.changed = []
+        return pulled
+
+    def push(self, commands):
+        commands = list(commands)
+        self.pushed.extend(commands)
+        mapping = {}
+        for cmd in commands:
+            if "temp_id" in cmd:
+                self.n += 1
+                mapping[cmd["temp_id"]] = f"new{self.n}"
+        return mapping, {}
+
+    def sent(self, type_):
+        return [c["args"] for c in self.pushed if c["type"] == type_]
+
+
+class FakeStore:
+    """ Stands in for `tbtw.TaskwarriorStore`, holding tasks in memory."""
+
+    def __init__(self, tasks=()):
+        self.tasks = {t["uuid"]: t for t in tasks}
+        self.modified = set(self.tasks)
+        self.imported = []
+
+    def edit(self, uuid, **fields):
+        self.tasks[uuid].update(fields)
+        self.modified.add(uuid)
+
+    def iter_export(self, *filters):
+        if filters and filters[0].startswith("modified.after:"):
+            uuids, self.modified = self.modified, set()
+        elif filters:
+            uuids = filters
+        else:
+            uuids = list(self.tasks)
+        return (dict(self.tasks[u]) for u in uuids if u in self.tasks)
+
+    def import_tasks(self, tasks):
+        tasks = list(tasks)
+        self.imported.extend(tasks)
+        for task in tasks:
+            self.tasks[task["uuid"]] = dict(task)
+            # Taskwarrior sees its own imports as modified.
+            self.modified.add(task["uuid"])
+        return len(tasks)
+
+
+def sync(client, store, state, **kwargs):
+    return Syncer(client, store, state, **kwargs).sync()
+
+
+@pytest.fixture
+def linked():
+    """ One item synced to Taskwarrior, then nothing pending."""
+    client = FakeSync([item("i1")])
+    store = FakeStore()
+    state = SyncState()
+    sync(client, store, state)
+    store.imported.clear()
+    client.pushed.clear()
+    (tw_uuid,) = store.tasks
+    return client, store, state, tw_uuid
+
+
+def test_first_sync(linked):
+    client, store, state, tw_uuid = linked
+    task = store.tasks[tw_uuid]
+    assert task["description"] == "mow"
+    assert task[UDA] == "i1"
+    assert "project" not in task
+    assert state.get(todoist_id="i1")["record"] == record()
+
+
+def test_echo_is_dropped(linked):
+    client, store, state, tw_uuid = linked
+    summary = sync(client, store, state)
+    assert summary["todoist"] == summary["taskwarrior"] == 0
+    assert client.pushed == store.imported == []
+
+
+def test_both_sides_merge(linked):
+    client, store, state, tw_uuid = linked
+    client.changed = [item("i1", priority=4)]
+    store.edit(tw_uuid, description="mow lawn")
+    summary = sync(client, store, state)
+    assert summary["conflicts"] == 0
+    assert client.sent("item_update") == [{"id": "i1",
+                                           "content": "mow lawn"}]
+    assert store.tasks[tw_uuid]["priority"] == "H"
+    assert store.tasks[tw_uuid]["description"] == "mow lawn"
+    assert state.get(uuid=tw_uuid)["record"] == record(content="mow lawn",
+                                                       priority=4)
+
+
+@pytest.mark.parametrize("prefer, content", [("todoist", "td"),
+                                             ("taskwarrior", "tw")])
+def test_conflict(linked, prefer, content):
+    client, store, state, tw_uuid = linked
+    client.changed = [item("i1", "td")]
+    store.edit(tw_uuid, description="tw")
+    summary = sync(client, store, state, prefer=prefer)
+    assert summary["conflicts"] == 1
+    assert store.tasks[tw_uuid]["description"] == content
+    assert client.sent("item_update") == (
+        [] if prefer == "todoist" else [{"id": "i1", "content": "tw"}])
+
+
+def test_new_taskwarrior_task_and_project():
+    client = FakeSync(projects=[{"id": "p1", "name": "Work"}])
+    store = FakeStore([{"uuid": "u1", "description": "plan",
+                        "status": "pending", "project": "Work.Later"}])
+    state = SyncState()
+    sync(client, store, state)
+    assert client.sent("project_add") == [{"name": "Later",
+                                           "parent_id": "p1"}]
+    (add,) = client.sent("item_add")
+    assert add["project_id"] == "new1"
+    assert store.tasks["u1"][UDA] == "new2"
+    assert state.get(todoist_id="new2")["uuid"] == "u1"
+
+
+def test_pair_without_base_or_task():
+    # Linked by its UDA on a run that then failed: no record yet, and the
+    # Taskwarrior task is not exported any more.
+    client = FakeSync([item("i1", priority=3)])
+    store = FakeStore()
+    state = SyncState()
+    state.put("i1", "u1", None, None)
+    sync(client, store, state)
+    assert store.tasks["u1"]["priority"] == "M"
+    assert state.get(uuid="u1")["record"] == record(priority=3)
+
+
+def test_move_to_unknown_project(linked):
+    client, store, state, tw_uuid = linked
+    syncer = Syncer(client, store, state)
+    syncer.sync()
+    commands = syncer._td_commands("i1", record(), record(project="Home"))
+    assert client.sent("project_add") == [{"name": "Home"}]
+    assert commands[-1]["args"] == {"id": "i1", "project_id": "new1"}
+
+
+def test_records_agree():
+    task = {"uuid": "u1", "description": "mow", "status": "completed",
+            "due": "20240501T000000Z", "priority": "H", "tags": ["b", "a"],
+            "project": "Home.Garden"}
+    paths = {"p2": "Home.Garden"}
+    td = item("i1", project_id="p2", checked=True, priority=4,
+              labels=["a", "b"], due={"date": "2024-05-01"})
+    assert td_record(td, paths) == tw_record(task)
+
+
+class Test_SyncState:
+    def test_saved_on_success(self, tmp_path):
+        path = tmp_path / "state.json"
+        with SyncState(path) as state:
+            state.put("i1", "u1", record(), "h")
+        assert SyncState(path).get(todoist_id="i1")["uuid"] == "u1"
+
+    def test_not_saved_on_error(self, tmp_path):
+        path = tmp_path / "state.json"
+        with pytest.raises(RuntimeError):
+            with SyncState(path) as state:
+                state.put("i1", "u1", record(), "h")
+                raise RuntimeError("push failed")
+        assert len(SyncState(path)) == 0
@@ -0,0 +1,49 @@
+import networkx as nx
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+from tbdoist.tbdoist import WEBGL_THRESHOLD, td_graph_to_traces
+
+
+def _path(n):
+    return nx.path_graph(n, create_using=nx.DiGraph)
+
+
+@pytest.mark.parametrize("n, gl", [(WEBGL_THRESHOLD, False),
+                                   (WEBGL_THRESHOLD + 1, True)])
+def test_webgl_threshold(fake_nxutils, n, gl):
+    traces = td_graph_to_traces(_path(n))
+    assert list(traces) == ["nodes", "edges", "arrows"]
+    kind = go.Scattergl if gl else go.Scatter
+    assert type(traces["nodes"]) is kind
+    assert type(traces["edges"]) is kind
+    assert len(traces["nodes"].x) == n
+
+
+@pytest.mark.parametrize("webgl, kind", [(True, go.Scattergl),
+                                         (False, go.Scatter)])
+def test_forced(fake_nxutils, webgl, kind):
+    traces = td_graph_to_traces(_path(5), webgl=webgl, threshold=2)
+    assert type(traces["nodes"]) is kind
+
+
+def test_float_coordinates(fake_nxutils):
+    traces = td_graph_to_traces(_path(3), threshold=1,
+                                marker={"color": "green"})
+    edges = traces["edges"]
+    assert edges.x.dtype == np.float64
+    # The None breaks between edges become NaN.
+    np.testing.assert_array_equal(edges.x, [0, 1, np.nan, 1, 2, np.nan])
+    assert (edges.mode, edges.name) == ("lines", "edges")
+    # Keyword arguments reach nxutils, and the traces keep them.
+    assert traces["nodes"].marker.color == "green"
+    # Traces that are not `Scatter` are left alone.
+    assert list(traces["arrows"].x) == [1, 2]
+
+
+def test_needs_nxutils(monkeypatch):
+    from tbdoist import tbdoist
+    monkeypatch.setattr(tbdoist, "nxu", None)
+    with pytest.raises(ImportError):
+        td_graph_to_traces(_path(2))
@@ -0,0 +1,163 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from todoist_api_python.models import Task
+
+from tbdoist.client import AsyncTodoistClient, RateLimiter
+from tbdoist.relink import apply_relinks
+from tbdoist.tracing import (BUCKETS, RequestTrace, active_trace,
+                             start_trace, stop_trace, traced)
+
+from .conftest import task_json
+
+
+@pytest.fixture
+def trace():
+    yield start_trace()
+    stop_trace()
+
+
+def _stats(trace):
+    return {(r["scope"], r["call"]): r for r in trace.summary()}
+
+
+def test_record(trace):
+    trace.record("get_task", .010)
+    trace.record("get_task", .030, retries=2, sent=5, received=7)
+    trace.record("get_tasks", .020, failed=True)
+    with trace.scope("show"):
+        trace.record("get_task", .040)
+    stats = _stats(trace)
+    assert {k: r["count"] for k, r in stats.items()} == {
+        ("-", "get_task"): 2, ("-", "get_tasks"): 1, ("show", "get_task"): 1}
+    get_task = stats["-", "get_task"]
+    assert get_task["seconds"] == pytest.approx(.040)
+    assert get_task["max"] == pytest.approx(.030)
+    assert (get_task["retries"], get_task["sent"], get_task["received"]) == (
+        2, 5, 7)
+    assert stats["-", "get_tasks"]["failed"] == 1
+    assert trace.total() == 4
+    # Busiest first.
+    assert trace.summary()[0]["call"] == "get_task"
+    assert trace.table().row_count == 3
+
+
+@pytest.mark.parametrize("ms, bucket", [
+    (0, 0), (24.9, 0), (25, 1), (49.9, 1), (50, 2), (2499, 6), (2500, 7),
+    (60_000, 7)])
+def test_histogram_edges(ms, bucket):
+    trace = RequestTrace()
+    trace.record("get_task", ms / 1000)
+    (row,) = trace.summary()
+    expected = [0] * len(BUCKETS)
+    expected[bucket] = 1
+    assert row["histogram"] == expected
+
+
+class Retried(HTTPAdapter):
+    """ Answers every request, as if urllib3 had retried it twice."""
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response._content = b"[]"
+        response.raw = SimpleNamespace(retries=SimpleNamespace(
+            history=("429", "503")))
+        return response
+
+
+def test_retries_from_response_hook():
+    trace = RequestTrace()
+    session = trace.watch(requests.Session())
+    # Watching twice does not count twice.
+    trace.watch(session)
+    session.mount("https://", Retried())
+    with trace.call("get_tasks"):
+        session.post("https://api.todoist.com/rest/v2/tasks", data="abc")
+    # Outside a call the request is filed under its method and path.
+    session.get("https://api.todoist.com/rest/v2/projects")
+    stats = _stats(trace)
+    assert (stats["-", "get_tasks"]["retries"],
+            stats["-", "get_tasks"]["sent"],
+            stats["-", "get_tasks"]["received"]) == (2, 3, 2)
+    assert stats["-", "GET /rest/v2/projects"]["retries"] == 2
+    assert trace.total() == 2
+
+
+def test_scopes_per_thread(trace):
+    # Both workers hold their scope open at once.
+    barrier = threading.Barrier(2)
+
+    def work(name):
+        with trace.scope(name):
+            barrier.wait()
+            trace.record("get_task", .01)
+            barrier.wait()
+
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(work, ["a", "b"]))
+    assert set(_stats(trace)) == {("a", "get_task"), ("b", "get_task")}
+
+
+def test_pool_tasks_carry_the_scope(trace):
+    with ThreadPoolExecutor(2) as pool, trace.scope("sync"):
+        pool.submit(contextvars.copy_context().run, trace.record, "get_task",
+                    .01).result()
+        pool.submit(trace.record, "get_tasks", .01).result()
+    assert set(_stats(trace)) == {("sync", "get_task"), ("-", "get_tasks")}
+
+
+class FakeApi:
+    def update_task(self, task_id, content=None):
+        return Task.from_dict(task_json(task_id, content))
+
+
+def test_relink_pool_scope(trace):
+    changes = [{"id": f"t{i}", "content": "x"} for i in range(5)]
+    with trace.scope("relink"):
+        apply_relinks(trace.wrap(FakeApi()), changes, max_workers=3,
+                      limiter=RateLimiter(rate=1e9, burst=1e9))
+    assert {k: r["count"] for k, r in _stats(trace).items()} == {
+        ("relink > apply_relinks", "update_task"): 5}
+
+
+def test_async_client_scope(trace, fake_todoist):
+    with trace.scope("load"), AsyncTodoistClient(
+            "token", limiter=RateLimiter(rate=1e9, burst=1e9),
+            trace=trace) as td:
+        td.load()
+    assert {scope for scope, _ in _stats(trace)} == {"load"}
+    assert trace.total() == 4
+
+
+def test_start_stop_and_nesting():
+    @traced()
+    def outer():
+        return inner()
+
+    @traced("inner step")
+    def inner():
+        trace = active_trace()
+        if trace is not None:
+            trace.record("get_task", .01)
+        return trace
+
+    assert active_trace() is None
+    # Without an active trace nothing is filed.
+    assert outer() is None
+    given = RequestTrace()
+    assert start_trace(given) is given
+    assert outer() is given
+    assert stop_trace() is given
+    assert active_trace() is None
+    assert outer() is None
+    assert list(_stats(given)) == [("outer > inner step", "get_task")]
+    assert given.current_scope == "-"
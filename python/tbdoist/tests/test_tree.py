@@ -0,0 +1,110 @@
+import io
+from types import SimpleNamespace
+
+import networkx as nx
+import pytest
+
+from tbdoist.show import label_column, stream_tree
+from tbdoist.show.tree import ASCII_GUIDES
+
+
+@pytest.fixture
+def tree():
+    #  r
+    #  ├── a
+    #  │   ├── a1
+    #  │   └── a2
+    #  │       └── a21
+    #  └── b
+    #      └── b1
+    #  s
+    g = nx.DiGraph([("r", "a"), ("a", "a1"), ("a", "a2"), ("a2", "a21"),
+                    ("r", "b"), ("b", "b1")])
+    g.add_node("s")
+    return g
+
+
+def _lines(tree, **kwargs):
+    f = io.StringIO()
+    n = stream_tree(tree, file=f, **kwargs)
+    lines = f.getvalue().splitlines()
+    assert n == len(lines)
+    return lines
+
+
+def test_whole_tree(tree):
+    assert _lines(tree) == ["r",
+                            "├── a",
+                            "│   ├── a1",
+                            "│   └── a2",
+                            "│       └── a21",
+                            "└── b",
+                            "    └── b1",
+                            "s"]
+
+
+def test_ascii_and_roots(tree):
+    assert _lines(tree, roots=["a"], guides=ASCII_GUIDES) == [
+        "a",
+        "|-- a1",
+        "`-- a2",
+        "    `-- a21"]
+
+
+def test_max_depth(tree):
+    assert _lines(tree, max_depth=1) == ["r", "├── a …", "└── b …", "s"]
+    assert _lines(tree, max_depth=0) == ["r …", "s"]
+
+
+def test_collapsed(tree):
+    # Leaves get no marker, there is nothing hidden under them.
+    assert _lines(tree, collapsed=["a", "b1"], more=" +") == [
+        "r", "├── a +", "└── b", "    └── b1", "s"]
+
+
+def test_labels(tree):
+    tree.nodes["a"]["content"] = "task a"
+    tree.nodes["b"]["obj"] = SimpleNamespace(name="project b")
+    labels = label_column(tree)
+    assert labels["a"] == "task a"
+    assert labels["b"] == "project b"
+    assert labels["b1"] == "b1"
+    assert _lines(tree, roots=["r"], max_depth=1, labels=labels) == [
+        "r", "├── task a …", "└── project b …"]
+
+
+class Lazy:
+    """ A tree that logs when it is walked, next to the lines written."""
+
+    def __init__(self, g, log):
+        self.g = g
+        self.log = log
+
+    def __iter__(self):
+        return iter(self.g)
+
+    def in_degree(self, n):
+        return self.g.in_degree(n)
+
+    def successors(self, n):
+        for child in self.g.successors(n):
+            self.log.append(f"visit {child}")
+            yield child
+
+
+def test_streams_in_order(tree):
+    log = []
+
+    class File:
+        def write(self, text):
+            log.append("write " + text.strip().lstrip("│├└─ "))
+
+    stream_tree(Lazy(tree, log), roots=["r"], labels={n: n for n in tree},
+                file=File())
+    # A line goes out once its node and the node after it (to pick the
+    # branch guide) are known, before the rest of the tree is walked.
+    assert log == ["write r",
+                   "visit a", "visit b", "write a",
+                   "visit a1", "visit a2", "write a1",
+                   "write a2", "visit a21", "write a21",
+                   "write b", "visit b1", "write b1"]
@@ -0,0 +1,3 @@
+from .backend import TaskwarriorStore, iter_json_objects
+
+__all__ = ["TaskwarriorStore", "iter_json_objects"]
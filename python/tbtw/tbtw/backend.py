@@ -0,0 +1,179 @@
+""" Bulk access to Taskwarrior data.
+
+tasklib runs the `task` binary once per task it saves or loads. Here the
+whole task list is read with a single `task export`, parsed object by
+object as the JSON streams in, and written back with batched
+`task import` calls. `TaskwarriorStore.to_graph` puts the tasks into the
+networkx shape that `tbdoist.td_iter_to_graph` makes for todoist.
+"""
+import json
+import os
+import subprocess
+import tempfile
+
+import networkx as nx
+
+
+__all__ = ["TaskwarriorStore", "iter_json_objects"]
+
+
+# Flags that keep `task` from prompting, hooking or printing extra text.
+QUIET = ["rc.confirmation=off", "rc.verbose=nothing", "rc.hooks=off",
+         "rc.json.array=on", "rc.recurrence.confirmation=no"]
+
+
+def iter_json_objects(stream, chunk_size=1 << 16):
+    """ Yield JSON objects from a text stream one at a time.
+
+    Accepts a JSON array of objects or objects separated by whitespace or
+    newlines, as `task export` writes with `rc.json.array` on or off.
+    Only the object being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    while True:
+        # Skip array punctuation and whitespace between objects.
+        while pos < len(buf) and buf[pos] in "[], \t\r\n":
+            pos += 1
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                pos = end
+                continue
+        if eof:
+            return
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+class TaskwarriorStore:
+    """ A Taskwarrior data directory read and written in bulk.
+
+    Parameters:
+        data_location: TASKDATA directory. Default is Taskwarrior's own.
+        taskrc: TASKRC file. Default is Taskwarrior's own. Use
+            `os.devnull` for a bare configuration.
+        command: the Taskwarrior executable.
+    """
+
+    def __init__(self, data_location=None, taskrc=None, command="task"):
+        self.data_location = data_location
+        self.taskrc = taskrc
+        self.command = command
+
+    def _env(self):
+        env = dict(os.environ)
+        if self.data_location is not None:
+            env["TASKDATA"] = str(self.data_location)
+        if self.taskrc is not None:
+            env["TASKRC"] = str(self.taskrc)
+        return env
+
+    def _args(self, *args):
+        return [self.command, *QUIET, *args]
+
+    def iter_export(self, *filters):
+        """ Yield task dicts from one `task export` as they are parsed.
+
+        Closing the generator early stops `task`.
+        """
+        # stderr goes to a file so a chatty `task` cannot fill a pipe
+        # nobody reads until stdout is done.
+        with tempfile.TemporaryFile("w+") as err:
+            proc = subprocess.Popen(self._args(*filters, "export"),
+                                    stdout=subprocess.PIPE, stderr=err,
+                                    env=self._env(), text=True)
+            finished = False
+            try:
+                yield from iter_json_objects(proc.stdout)
+                finished = True
+            finally:
+                if not finished:
+                    proc.terminate()
+                proc.stdout.close()
+                returncode = proc.wait()
+            if returncode != 0:
+                err.seek(0)
+                raise RuntimeError(f"task export failed: {err.read().strip()}")
+
+    def export(self, *filters):
+        """ Return a list of task dicts matching `filters`."""
+        return list(self.iter_export(*filters))
+
+    def import_tasks(self, tasks, batch_size=1000):
+        """ Add or update `tasks` with one `task import` per batch.
+
+        Tasks with a `uuid` that already exists are updated in place.
+        Returns the number of tasks sent.
+        """
+        n = 0
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if len(batch) >= batch_size:
+                self._import(batch)
+                n += len(batch)
+                batch = []
+        if batch:
+            self._import(batch)
+            n += len(batch)
+        return n
+
+    def _import(self, batch):
+        result = subprocess.run(self._args("import", "-"),
+                                input=json.dumps(batch),
+                                capture_output=True, text=True,
+                                env=self._env())
+        if result.returncode != 0:
+            raise RuntimeError(f"task import failed: {result.stderr.strip()}")
+
+    def to_graph(self, tasks=None, g=None):
+        """ Return tasks as a DiGraph shaped like `td_iter_to_graph` output.
+
+        Nodes are task uuids with the task dict as `"obj"` and the
+        description as `"content"`. Each dotted project level is a node
+        `"project:<name>"` with `"name"`. Edges run from child to parent
+        with a `"type"` attribute of "Task" or "Project".
+        """
+        if tasks is None:
+            tasks = self.iter_export()
+        if g is None:
+            g = nx.DiGraph()
+        nodebunch = []
+        edgebunch = []
+        projects = set()
+        for task in tasks:
+            nodebunch.append((task["uuid"], {"obj": task,
+                                             "content": task.get("description")}))
+            project = task.get("project")
+            if project:
+                edgebunch.append((task["uuid"], f"project:{project}",
+                                  {"type": "Task"}))
+                projects.add(project)
+
+        for project in list(projects):
+            parts = project.split(".")
+            for i in range(1, len(parts)):
+                projects.add(".".join(parts[:i]))
+        for project in projects:
+            name = project.rsplit(".", 1)[-1]
+            nodebunch.append((f"project:{project}", {"obj": {"project": project},
+                                                     "name": name}))
+            if "." in project:
+                parent = project.rsplit(".", 1)[0]
+                edgebunch.append((f"project:{project}", f"project:{parent}",
+                                  {"type": "Project"}))
+
+        g.add_nodes_from(nodebunch)
+        g.add_edges_from(edgebunch)
+        return g
@@ -0,0 +1,70 @@
+""" A fake `task` executable for the tests. Taskwarrior is not needed.
+
+The fake writes the JSON list in `$FAKE_TASKS` for `export`, repeated
+forever if `$FAKE_FOREVER` is set, after `$FAKE_STDERR` characters of
+noise on stderr. `import` appends the number of tasks read from stdin to
+`$FAKE_LOG`. `$FAKE_EXIT` is the exit status.
+"""
+import json
+import sys
+import textwrap
+
+import pytest
+
+from tbtw.backend import TaskwarriorStore
+
+
+SCRIPT = """\
+import json, os, sys
+
+args = sys.argv[1:]
+sys.stderr.write("x" * int(os.environ.get("FAKE_STDERR", 0)))
+sys.stderr.flush()
+if "export" in args:
+    tasks = json.load(open(os.environ["FAKE_TASKS"]))
+    while True:
+        for task in tasks:
+            sys.stdout.write(json.dumps(task) + "\\n")
+            sys.stdout.flush()
+        if not os.environ.get("FAKE_FOREVER"):
+            break
+elif "import" in args:
+    with open(os.environ["FAKE_LOG"], "a") as log:
+        log.write(f"{len(json.load(sys.stdin))}\\n")
+sys.exit(int(os.environ.get("FAKE_EXIT", 0)))
+"""
+
+
+def task_json(uuid, description="task", **fields):
+    return {"uuid": uuid, "description": description, "status": "pending",
+            **fields}
+
+
+@pytest.fixture
+def fake_task(tmp_path, monkeypatch):
+    """ Return a function storing tasks for a `TaskwarriorStore` to export."""
+    command = tmp_path / "task"
+    command.write_text(f"#!{sys.executable}\n" + textwrap.dedent(SCRIPT))
+    command.chmod(0o755)
+    monkeypatch.setenv("FAKE_LOG", str(tmp_path / "log"))
+
+    def store(tasks=()):
+        path = tmp_path / "tasks.json"
+        path.write_text(json.dumps(list(tasks)))
+        monkeypatch.setenv("FAKE_TASKS", str(path))
+        return TaskwarriorStore(data_location=tmp_path, taskrc=tmp_path,
+                                command=str(command))
+
+    return store
+
+
+@pytest.fixture
+def import_log(tmp_path):
+    """ Return a function listing the sizes of the imported batches."""
+    def sizes():
+        log = tmp_path / "log"
+        if not log.exists():
+            return []
+        return [int(line) for line in log.read_text().split()]
+
+    return sizes
@@ -0,0 +1,102 @@
+import io
+import json
+import threading
+
+import pytest
+
+from tbtw.backend import iter_json_objects
+
+from .conftest import task_json
+
+
+class Test_iter_json_objects:
+    @pytest.mark.parametrize("text", [
+        '[{"a": 1}, {"a": 2}, {"a": 3}]',
+        '{"a": 1}\n{"a": 2}\n{"a": 3}\n',
+        ' [ {"a": 1} ,\n{"a": 2},{"a": 3} ] ',
+    ])
+    def test_layouts(self, text):
+        assert list(iter_json_objects(io.StringIO(text))) == [
+            {"a": 1}, {"a": 2}, {"a": 3}]
+
+    def test_objects_across_chunks(self):
+        objs = [{"n": i, "text": "x" * i, "nested": {"list": [i, "]"]}}
+                for i in range(50)]
+        text = json.dumps(objs)
+        assert list(iter_json_objects(io.StringIO(text), chunk_size=7)) == \
+            objs
+
+    def test_empty(self):
+        assert list(iter_json_objects(io.StringIO(""))) == []
+        assert list(iter_json_objects(io.StringIO("[]"))) == []
+
+    def test_truncated(self):
+        with pytest.raises(ValueError):
+            list(iter_json_objects(io.StringIO('[{"a": 1}, {"a": ')))
+
+
+class Test_export:
+    def test_export(self, fake_task):
+        tasks = [task_json("u1"), task_json("u2")]
+        assert fake_task(tasks).export() == tasks
+
+    def test_stderr_does_not_block(self, fake_task, monkeypatch):
+        # Far more than a pipe buffer, written before any stdout.
+        monkeypatch.setenv("FAKE_STDERR", str(1 << 20))
+        store = fake_task([task_json("u1")])
+        result = []
+        t = threading.Thread(target=lambda: result.append(store.export()),
+                             daemon=True)
+        t.start()
+        t.join(30)
+        assert not t.is_alive()
+        assert result == [[task_json("u1")]]
+
+    def test_failure(self, fake_task, monkeypatch):
+        monkeypatch.setenv("FAKE_EXIT", "2")
+        monkeypatch.setenv("FAKE_STDERR", "5")
+        with pytest.raises(RuntimeError, match="xxxxx"):
+            fake_task([task_json("u1")]).export()
+
+    def test_close_early(self, fake_task, monkeypatch):
+        monkeypatch.setenv("FAKE_FOREVER", "1")
+        tasks = fake_task([task_json("u1")]).iter_export()
+        assert next(tasks)["uuid"] == "u1"
+        # Stops the endless export instead of waiting or raising.
+        tasks.close()
+
+
+def test_import_batches(fake_task, import_log):
+    store = fake_task()
+    tasks = (task_json(f"u{i}") for i in range(25))
+    assert store.import_tasks(tasks, batch_size=10) == 25
+    assert import_log() == [10, 10, 5]
+    assert store.import_tasks([], batch_size=10) == 0
+    assert import_log() == [10, 10, 5]
+
+
+def test_import_failure(fake_task, monkeypatch):
+    monkeypatch.setenv("FAKE_EXIT", "1")
+    with pytest.raises(RuntimeError):
+        fake_task().import_tasks([task_json("u1")])
+
+
+def test_to_graph(fake_task):
+    tasks = [task_json("u1", "mow", project="home.garden"),
+             task_json("u2", "file", project="work"),
+             task_json("u3", "loose")]
+    g = fake_task(tasks).to_graph()
+    assert set(g) == {"u1", "u2", "u3", "project:home",
+                      "project:home.garden", "project:work"}
+    assert g.nodes["u1"]["content"] == "mow"
+    assert g.nodes["u1"]["obj"] == tasks[0]
+    assert g.nodes["project:home.garden"]["name"] == "garden"
+    assert dict(g.edges) == {
+        ("u1", "project:home.garden"): {"type": "Task"},
+        ("u2", "project:work"): {"type": "Task"},
+        ("project:home.garden", "project:home"): {"type": "Project"}}
+
+
+def test_to_graph_given_tasks(fake_task):
+    g = fake_task().to_graph([task_json("u1")])
+    assert list(g) == ["u1"]
@@ -0,0 +1,90 @@
+""" The backend against a real `task` binary in a scratch TASKDATA.
+
+Skipped when Taskwarrior is not installed.
+"""
+import shutil
+import uuid
+
+import pytest
+
+from tbtw.backend import TaskwarriorStore
+
+from .conftest import task_json
+
+
+pytestmark = pytest.mark.skipif(shutil.which("task") is None,
+                                reason="needs the Taskwarrior binary")
+
+
+@pytest.fixture
+def store(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    taskrc = tmp_path / "taskrc"
+    # The UDA tbdoist syncs with, and no news prompt from Taskwarrior 3.
+    taskrc.write_text("uda.todoistid.type=string\n"
+                      "uda.todoistid.label=Todoist\n"
+                      "news.version=99.99.99\n")
+    return TaskwarriorStore(data_location=data, taskrc=taskrc)
+
+
+def _task(description="task", **fields):
+    return task_json(str(uuid.uuid4()), description,
+                     entry="20240101T120000Z", **fields)
+
+
+def _by_uuid(tasks):
+    return {t["uuid"]: t for t in tasks}
+
+
+def test_round_trip(store):
+    task = _task("mow", project="home.garden", tags=["quick", "out"],
+                 due="20240501T000000Z", priority="H", todoistid="123",
+                 annotations=[{"entry": "20240102T080000Z",
+                               "description": "front and back"}])
+    assert store.import_tasks([task]) == 1
+    (out,) = store.export()
+    assert out["uuid"] == task["uuid"]
+    for key in ["description", "status", "project", "due", "priority",
+                "todoistid"]:
+        assert out[key] == task[key], key
+    assert sorted(out["tags"]) == ["out", "quick"]
+    assert [(a["entry"], a["description"]) for a in out["annotations"]] == [
+        ("20240102T080000Z", "front and back")]
+
+
+def test_import_updates_by_uuid(store):
+    task = _task("mow")
+    store.import_tasks([task])
+    store.import_tasks([dict(task, description="mow lawn",
+                             status="completed", end="20240103T000000Z")])
+    (out,) = store.export()
+    assert out["description"] == "mow lawn"
+    assert out["status"] == "completed"
+
+
+def test_batches_and_filters(store):
+    tasks = [_task(f"t{i}", project="work" if i % 2 else "home")
+             for i in range(25)]
+    assert store.import_tasks(tasks, batch_size=10) == 25
+    assert _by_uuid(store.export()).keys() == _by_uuid(tasks).keys()
+    work = store.export("project:work")
+    assert len(work) == 12
+    assert {t["project"] for t in work} == {"work"}
+    one = tasks[3]["uuid"]
+    assert [t["uuid"] for t in store.export(one)] == [one]
+
+
+def test_close_early(store):
+    store.import_tasks([_task(f"t{i}") for i in range(200)])
+    tasks = store.iter_export()
+    assert "uuid" in next(tasks)
+    tasks.close()
+
+
+def test_to_graph(store):
+    task = _task("mow", project="home.garden")
+    store.import_tasks([task])
+    g = store.to_graph()
+    assert g.has_edge(task["uuid"], "project:home.garden")
+    assert g.has_edge("project:home.garden", "project:home")
@@ -0,0 +1,194 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from timeline.sync import (apply_diff, changed_events, diff, event_row,
+                           load_base, read_aeon, save_base, write_changes)
+
+
+HEADER = ["Type", "Label", "Internal ID", "Summary", "Start Date",
+          "End Date", "Tags", "gcal_id"]
+
+
+def event(id, summary="walk", start="2024-05-01T10:00:00-04:00",
+          end="2024-05-01T11:00:00-04:00", **fields):
+    if isinstance(start, str):
+        start, end = {"dateTime": start}, {"dateTime": end}
+    return {"id": id, "summary": summary, "description": "",
+            "start": start, "end": end, **fields}
+
+
+def row(id, label="walk", start="2024-05-01 10:00", end="2024-05-01 11:00",
+        **fields):
+    r = dict.fromkeys(HEADER, "")
+    r.update({"Type": "Event", "Label": label, "Internal ID": id,
+              "Start Date": start, "End Date": end, "gcal_id": id,
+              "Tags": "Home"})
+    r.update(fields)
+    return r
+
+
+HOME = {"calid": "home@example.com", "summary": "Home", "bg_color": "#fff"}
+
+
+class FakeGcal:
+    """ Answers `service.events().list(...).execute()` from pages."""
+
+    def __init__(self, pages):
+        self.pages = {calid: list(p) for calid, p in pages.items()}
+        self.requests = []
+        self.service = self
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(dict(params))
+        pages = self.pages[params["calendarId"]]
+        self.page = pages[int(params.get("pageToken", 0))]
+        return self
+
+    def execute(self):
+        return self.page
+
+
+def test_event_row():
+    r = event_row(event("e1"), HOME)
+    assert r["Start Date"] == "2024-05-01 10:00"
+    assert r["Tags"] == "Home"
+    assert event_row(event("e1", status="cancelled")) is None
+    all_day = event("e2", start={"date": "2024-05-02"},
+                    end={"date": "2024-05-03"})
+    assert event_row(all_day)["End Date"] == "2024-05-03"
+
+
+def test_event_row_zone():
+    e = event("e1", start="2024-05-01T14:00:00Z")
+    e["start"]["timeZone"] = "Europe/London"
+    assert event_row(e)["Start Date"] == "2024-05-01 10:00"
+
+
+class Test_diff:
+    def test_added_and_unchanged(self):
+        changes = diff([row("e1")], [(event("e1"), HOME),
+                                     (event("e2", "swim"), HOME)])
+        assert [r["Label"] for r in changes["added"]] == ["swim"]
+        assert changes["changed"] == changes["removed"] == []
+        assert changes["updates"] == []
+
+    def test_each_side_against_base(self):
+        base = {"e1": {"Label": "walk", "Summary": "",
+                       "Start Date": "2024-05-01 10:00",
+                       "End Date": "2024-05-01 11:00"}}
+        rows = [row("e1", Summary="bring water")]
+        events = [(event("e1", "long walk"), HOME)]
+        changes = diff(rows, events, base)
+        (changed,) = changes["changed"]
+        assert changed["Label"] == "long walk"
+        assert changed["Summary"] == "bring water"
+        assert changes["updates"] == [("e1", {"Summary": "bring water"})]
+
+    @pytest.mark.parametrize("prefer", ["gcal", "aeon"])
+    def test_conflict(self, prefer):
+        changes = diff([row("e1", "aeon")], [(event("e1", "gcal"), HOME)],
+                       prefer=prefer)
+        if prefer == "gcal":
+            assert changes["changed"][0]["Label"] == "gcal"
+            assert changes["updates"] == []
+        else:
+            assert changes["changed"] == []
+            assert changes["updates"] == [("e1", {"Label": "aeon"})]
+
+    def test_bad_prefer(self):
+        with pytest.raises(ValueError):
+            diff([], [], prefer="both")
+
+    def test_removed(self):
+        rows = [row("e1"), row("e2"), row("e3", Tags="Work"),
+                row("a1", gcal_id="")]
+        events = [(event("e1"), HOME)]
+        changes = diff(rows, events, calendars={"Home"})
+        # Rows of other calendars and rows Aeon made itself stay.
+        assert changes["removed"] == ["e2"]
+
+    def test_incomplete(self):
+        events = [(event("e2", status="cancelled"), HOME)]
+        changes = diff([row("e1"), row("e2")], events, complete=False)
+        assert changes["removed"] == ["e2"]
+
+    def test_full_dump_rows_get_gcal_id(self):
+        changes = diff([row("e1", gcal_id="")], [(event("e1"), HOME)])
+        assert changes["changed"][0]["gcal_id"] == "e1"
+
+
+def test_apply_diff():
+    rows = [row("e1"), row("e2"), row("a1", gcal_id="", **{
+        "Internal ID": "a1"})]
+    changes = {"added": [{"Label": "swim", "gcal_id": "e3",
+                          "Links": "not a column"}],
+               "changed": [row("e1", "long walk")],
+               "removed": ["e2"], "updates": []}
+    out = list(apply_diff(HEADER, rows, changes))
+    assert [r["Label"] for r in out] == ["long walk", "walk", "swim"]
+    assert list(out[-1]) == HEADER
+    assert out[-1]["Type"] == ""
+
+
+def test_write_and_read(tmp_path):
+    changes = diff([row("e1", "old")], [(event("e1", "new"), HOME),
+                                        (event("e2", "swim"), HOME)])
+    f = io.StringIO()
+    assert write_changes(f, HEADER, changes) == 2
+    path = tmp_path / "changes.csv"
+    path.write_text(f.getvalue())
+    header, rows = read_aeon(path)
+    assert header == HEADER
+    assert [r["Label"] for r in rows] == ["swim", "new"]
+
+
+def test_base_round_trip(tmp_path):
+    path = tmp_path / "base.json"
+    assert load_base(path) == {}
+    save_base(path, [row("e1"), row("a1", gcal_id="", **{
+        "Internal ID": ""})])
+    base = load_base(path)
+    assert list(base) == ["e1"]
+    # With the base, an unchanged Aeon row takes the calendar's edit.
+    changes = diff([row("e1")], [(event("e1", "run"), HOME)], base,
+                   prefer="aeon")
+    assert changes["changed"][0]["Label"] == "run"
+
+
+class Test_changed_events:
+    def test_no_time_window(self):
+        since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        gcal = FakeGcal({"home@example.com": [{"items": [event("e1")]}]})
+        assert list(changed_events(gcal, [HOME], since)) == [
+            (event("e1"), HOME)]
+        (params,) = gcal.requests
+        assert params == {"calendarId": "home@example.com",
+                          "updatedMin": "2024-05-01T00:00:00+00:00",
+                          "showDeleted": True}
+
+    def test_pages_and_calendars(self):
+        work = {"calid": "work@example.com", "summary": "Work"}
+        gcal = FakeGcal({
+            "home@example.com": [{"items": [event("e1")],
+                                  "nextPageToken": "1"},
+                                 {"items": [event("e2")]}],
+            "work@example.com": [{}]})
+        since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        events = list(changed_events(gcal, [HOME, work], since))
+        assert [e["id"] for e, _ in events] == ["e1", "e2"]
+        assert [p.get("pageToken") for p in gcal.requests] == [None, "1",
+                                                               None]
+
+    def test_feeds_diff(self):
+        gcal = FakeGcal({"home@example.com": [{"items": [
+            event("e1", "run"), event("e2", status="cancelled")]}]})
+        since = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        changes = diff([row("e1"), row("e2"), row("e3")],
+                       changed_events(gcal, [HOME], since), complete=False)
+        assert changes["changed"][0]["Label"] == "run"
+        assert changes["removed"] == ["e2"]
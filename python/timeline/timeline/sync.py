@@ -0,0 +1,312 @@
+""" Keep an Aeon Timeline CSV in step with Google Calendar.
+
+Rows and events are matched by `gcal_id`, or by `Internal ID` for rows
+written by the full dump in `gcal_to_timeline.ipynb`, which put the
+event id there. `diff` compares only the synced columns (`SYNCED`) and
+returns the rows to add, change and remove plus the edits made in Aeon
+that should go back to the calendar. Every other Aeon column of an
+existing row is left as it is.
+
+With `changed_events` only the events updated since the last run are
+fetched, cancelled ones included, so a weekly refresh sends and compares
+only what moved.
+
+A side's edit is told apart from the other side's by the `base`, the
+synced columns as they were at the end of the last sync. `save_base`
+and `load_base` keep it in a JSON file next to the CSV.
+"""
+import csv
+import json
+from datetime import date, datetime
+
+import pandas as pd
+from gcsa.serializers.event_serializer import EventSerializer
+
+
+__all__ = ["SYNCED", "TZ", "event_row", "read_aeon", "diff", "apply_diff",
+           "write_changes", "changed_events", "push_edits", "load_base",
+           "save_base"]
+
+
+TZ = "America/Indiana/Indianapolis"
+# Aeon column to event field, for the columns kept in sync both ways.
+SYNCED = {"Label": "summary",
+          "Summary": "description",
+          "Start Date": "start",
+          "End Date": "end"}
+AEON_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def _key(row):
+    return row.get("gcal_id") or row.get("Internal ID") or None
+
+
+def _moment(value, tz=TZ):
+    """ Return an event start/end dict or a pandas Timestamp as Aeon text."""
+    if isinstance(value, dict):
+        if "dateTime" in value:
+            # API dateTimes carry an offset; timeZone is optional.
+            moment = pd.Timestamp(value["dateTime"])
+            if moment.tzinfo is None:
+                moment = moment.tz_localize(value.get("timeZone") or tz)
+            value = moment
+        else:
+            return value["date"]
+    if isinstance(value, datetime):
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert(tz)
+        return ts.strftime(AEON_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value or ""
+
+
+def _normal(column, value):
+    """ Put Aeon and calendar text in one form before comparing."""
+    value = value or ""
+    if column in ("Start Date", "End Date") and value:
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            # Aeon writes partial dates like "2024-01" as they were typed.
+            return value
+        if len(value) == 10:
+            return moment.date().isoformat()
+        return moment.strftime(AEON_FORMAT)
+    return value
+
+
+def event_row(event, calendar=None, tz=TZ):
+    """ Return the Aeon columns for one event.
+
+    Parameters:
+        event: a gcsa `Event` or an event dict from the Calendar API.
+        calendar: dict with "summary" and "bg_color", as built in
+            `gcal_to_timeline.ipynb`, filling Tags and Color.
+        tz: zone that timed events are shown in.
+
+    Returns:
+        dict of Aeon column to text, or `None` for a cancelled event.
+    """
+    if not isinstance(event, dict):
+        event = EventSerializer.to_json(event)
+    if event.get("status") == "cancelled" or not event.get("start"):
+        return None
+    row = {"Type": "Event",
+           "Label": event.get("summary") or "",
+           "Internal ID": event["id"],
+           "Summary": event.get("description") or "",
+           "Start Date": _moment(event["start"], tz),
+           "End Date": _moment(event.get("end") or event["start"], tz),
+           "Links": event.get("htmlLink") or "",
+           "gcal_id": event["id"]}
+    if calendar is not None:
+        row["Tags"] = calendar.get("summary") or ""
+        row["Color"] = calendar.get("bg_color") or ""
+    return row
+
+
+def read_aeon(path):
+    """ Return `(header, rows)` of an Aeon CSV, rows as a list of dicts."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        return list(reader.fieldnames), list(reader)
+
+
+def _synced(row):
+    return {c: _normal(c, row.get(c)) for c in SYNCED}
+
+
+def diff(rows, events, base=None, complete=True, prefer="gcal",
+         calendars=None, tz=TZ):
+    """ Work out what to change on each side.
+
+    Parameters:
+        rows: Aeon rows from `read_aeon`.
+        events: iterable of `(event, calendar)` pairs as taken by
+            `event_row`. Cancelled events remove their row.
+        base: synced columns by key from the last sync (`load_base`).
+            Without it every difference is resolved by `prefer`.
+        complete: True if `events` is every current event, so a linked
+            row with no event is removed. False for `changed_events`
+            output.
+        prefer: "gcal" or "aeon", the side that wins a column both
+            sides changed.
+        calendars: if given, only rows tagged with one of these
+            calendars can be removed by `complete`.
+
+    Returns:
+        dict with "added" and "changed", lists of rows; "removed", a
+        list of keys; and "updates", a list of `(key, {column: text})`
+        Aeon edits to send to the calendar.
+    """
+    if prefer not in ("gcal", "aeon"):
+        raise ValueError(f"prefer must be gcal or aeon, not {prefer}.")
+    base = base or {}
+    by_key = {}
+    for row in rows:
+        key = _key(row)
+        if key is not None:
+            by_key[key] = row
+
+    added, changed, removed, updates = [], [], [], []
+    seen = set()
+    for event, calendar in events:
+        new = event_row(event, calendar, tz)
+        if new is None:
+            if not isinstance(event, dict):
+                event = EventSerializer.to_json(event)
+            if event["id"] in by_key:
+                removed.append(event["id"])
+            seen.add(event["id"])
+            continue
+        key = new["gcal_id"]
+        seen.add(key)
+        old = by_key.get(key)
+        if old is None:
+            added.append(new)
+            continue
+        g, a, b = _synced(new), _synced(old), base.get(key)
+        to_aeon, to_gcal = {}, {}
+        for column in SYNCED:
+            if g[column] == a[column]:
+                continue
+            if b is not None and a[column] == b.get(column):
+                to_aeon[column] = new[column]
+            elif b is not None and g[column] == b.get(column):
+                to_gcal[column] = old[column]
+            elif prefer == "gcal":
+                to_aeon[column] = new[column]
+            else:
+                to_gcal[column] = old[column]
+        if not old.get("gcal_id"):
+            # Rows from the full dump only carried the id as Internal ID.
+            to_aeon["gcal_id"] = key
+        if to_aeon:
+            changed.append({**old, **to_aeon})
+        if to_gcal:
+            updates.append((key, to_gcal))
+
+    if complete:
+        for key, row in by_key.items():
+            if key in seen or not row.get("gcal_id"):
+                # Rows not linked to an event belong to Aeon alone.
+                continue
+            if calendars is not None and row.get("Tags") not in calendars:
+                continue
+            removed.append(key)
+    return {"added": added, "changed": changed, "removed": removed,
+            "updates": updates}
+
+
+def apply_diff(header, rows, changes):
+    """ Yield `rows` with `changes` from `diff` applied, in order.
+
+    Changed rows replace their originals, removed rows are dropped and
+    added rows come last.
+    """
+    changed = {_key(r): r for r in changes["changed"]}
+    removed = set(changes["removed"])
+    for row in rows:
+        key = _key(row)
+        if key in removed:
+            continue
+        yield changed.get(key, row)
+    for row in changes["added"]:
+        yield {c: row.get(c, "") for c in header}
+
+
+def write_changes(file, header, changes):
+    """ Write only the added and changed rows to the open text `file`.
+
+    Returns the number of rows written.
+    """
+    writer = csv.DictWriter(file, fieldnames=header, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for row in changes["added"] + changes["changed"]:
+        writer.writerow(row)
+        n += 1
+    return n
+
+
+def changed_events(gcal, calendars, since):
+    """ Yield `(event, calendar)` for events updated after `since`.
+
+    Cancelled events are included so their rows can be removed. Pass the
+    result to `diff` with `complete=False`.
+
+    Events are listed through the Calendar API service directly, since
+    `GoogleCalendar.get_events` always limits them to a time window,
+    by default the coming year. An edit to an event outside it would
+    never be seen. Events are yielded as API dicts.
+
+    Parameters:
+        gcal: a gcsa `GoogleCalendar`.
+        calendars: iterable of calendar dicts with "calid", as built in
+            `gcal_to_timeline.ipynb`.
+        since: timezone aware datetime of the last sync.
+    """
+    for calendar in calendars:
+        params = {"calendarId": calendar["calid"],
+                  "updatedMin": since.isoformat(),
+                  "showDeleted": True}
+        while True:
+            page = gcal.service.events().list(**params).execute()
+            for event in page.get("items", []):
+                yield event, calendar
+            if not page.get("nextPageToken"):
+                break
+            params["pageToken"] = page["nextPageToken"]
+
+
+def _from_aeon(text, tz=TZ):
+    moment = datetime.fromisoformat(text)
+    if len(text) == 10:
+        return moment.date()
+    return pd.Timestamp(moment, tz=tz).to_pydatetime()
+
+
+def push_edits(gcal, updates, calendar_of, tz=TZ):
+    """ Send Aeon edits from `diff` to the calendar.
+
+    Parameters:
+        gcal: a gcsa `GoogleCalendar`.
+        updates: the "updates" list from `diff`.
+        calendar_of: mapping of event id to calendar id.
+
+    Returns the number of events updated.
+    """
+    n = 0
+    for key, columns in updates:
+        calendar_id = calendar_of[key]
+        event = gcal.get_event(key, calendar_id=calendar_id)
+        for column, text in columns.items():
+            field = SYNCED[column]
+            if field in ("start", "end"):
+                text = _from_aeon(text, tz)
+            setattr(event, field, text)
+        gcal.update_event(event, calendar_id=calendar_id)
+        n += 1
+    return n
+
+
+def load_base(path):
+    """ Return the base saved by `save_base`, or `{}` if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_base(path, rows):
+    """ Save the synced columns of every linked row as the next base."""
+    base = {}
+    for row in rows:
+        key = _key(row)
+        if key is not None:
+            base[key] = _synced(row)
+    with open(path, "w") as f:
+        json.dump(base, f)